@@ -0,0 +1,353 @@
+"""
+Admission control for CPU-bound prediction traffic
+
+Requests to the guarded paths are admitted only while the worker has a free
+in-flight slot; otherwise they wait in a bounded FIFO queue for a limited
+time. Each user additionally has a token bucket, keyed on the JWT subject.
+Requests that cannot be admitted are rejected before their body is read,
+with 429 (user over their rate) or 503 (worker saturated) and a Retry-After
+header, so latency stays bounded under overload instead of growing with the
+queue. Requests without a valid bearer token are rejected with 401 before
+admission, so unauthenticated clients cannot take slots or queue places.
+Paths outside the guarded prefixes, such as /health and /login, are
+never held back. Streaming uploads are charged against the user's rate but
+do not take an in-flight slot, which they would hold for the whole upload;
+their model calls are bounded by the inference executor chunk by chunk.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from core.config import (
+    ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS,
+    ADMISSION_RETRY_AFTER_SECONDS, USER_RATE_LIMIT_PER_SECOND, USER_RATE_LIMIT_BURST
+)
+from core.metrics import registry
+
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total",
+    "Requests rejected by admission control, by reason",
+    ("reason",)
+)
+ADMISSION_QUEUE_WAIT = registry.histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests waited for an in-flight slot"
+)
+
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to burst requests"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            0.0 if a token was taken, otherwise the seconds until one is available
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    In-flight limit with a bounded wait queue, plus per-user rate limits.
+
+    A released slot is handed directly to the longest waiting request, so
+    waiting requests are served in arrival order and new arrivals cannot
+    overtake them. One controller guards one worker process.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 0,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        user_rate: float = 0.0,
+        user_burst: float = 0.0,
+        retry_after: float = 1.0,
+        max_users: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_in_flight: Requests handled at once (0 for no limit)
+            max_queue: Requests allowed to wait for a slot when all are taken
+            queue_timeout: Longest time in seconds a request waits for a slot
+            user_rate: Requests per second allowed per user (0 for no limit)
+            user_burst: Requests a user can make at once (at least 1)
+            retry_after: Retry-After in seconds sent when the worker is saturated
+            max_users: Token buckets kept; the least recently seen users are dropped
+            clock: Monotonic time source
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate
+        self.user_burst = max(1.0, user_burst)
+        self.retry_after = retry_after
+        self.max_users = max_users
+        self._clock = clock
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._buckets_lock = threading.Lock()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any limit is configured"""
+        return self.max_in_flight > 0 or self.user_rate > 0
+
+    @property
+    def waiting(self) -> int:
+        """Requests waiting for an in-flight slot"""
+        return len(self._waiters)
+
+    def _reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(reason=reason)
+
+    def check_rate(self, user: Optional[str]) -> float:
+        """
+        Charge one request to a user's token bucket.
+
+        Args:
+            user: JWT subject, or None to skip the check
+
+        Returns:
+            0.0 if the request is within the user's rate, otherwise the
+            seconds until the user may send another request
+        """
+        if self.user_rate <= 0 or user is None:
+            return 0.0
+
+        now = self._clock()
+        with self._buckets_lock:
+            bucket = self._buckets.get(user)
+            if bucket is None:
+                bucket = self._buckets[user] = TokenBucket(self.user_rate, self.user_burst, now)
+                if len(self._buckets) > self.max_users:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(user)
+            wait = bucket.take(now)
+
+        if wait > 0:
+            self._reject("rate_limited")
+        return wait
+
+    async def acquire(self) -> float:
+        """
+        Take an in-flight slot, waiting in the queue if all are taken.
+
+        Returns:
+            0.0 once a slot is held (release it with release()), otherwise
+            the Retry-After seconds for a request that was not admitted
+        """
+        if self.max_in_flight <= 0:
+            self.admitted += 1
+            return 0.0
+
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+            return self.retry_after
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = self._clock()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the wait timed out: keep it
+                pass
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self._reject("queue_timeout")
+                return self.retry_after
+        except asyncio.CancelledError:
+            # The client went away; pass on a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+
+        ADMISSION_QUEUE_WAIT.observe(self._clock() - start)
+        self.admitted += 1
+        return 0.0
+
+    def release(self) -> None:
+        """Give up an in-flight slot, handing it to the longest waiting request"""
+        if self.max_in_flight <= 0:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot changes hands; in_flight stays the same
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the limits, current load and counters"""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "user_rate_per_second": self.user_rate,
+            "user_burst": self.user_burst,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "tracked_users": len(self._buckets)
+        }
+
+
+def _bearer_token(scope: Dict[str, Any]) -> Optional[str]:
+    """Token of the request's Authorization: Bearer header, if any"""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    return None
+
+
+def _retry_after_header(retry_after: float) -> List[Tuple[bytes, bytes]]:
+    """Retry-After header in whole seconds"""
+    return [(b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1"))]
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to requests under the
+    given path prefixes.
+
+    Requests whose bearer token does not resolve to a user get 401 before
+    they are admitted. Rejections are sent as JSON errors in the same shape
+    as FastAPI's HTTPException responses, without calling the application.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        controller: AdmissionController,
+        path_prefixes: Sequence[str],
+        resolve_user: Callable[[str], Optional[str]],
+        stream_prefixes: Sequence[str] = ()
+    ):
+        """
+        Args:
+            app: ASGI application
+            controller: Admission controller of this worker
+            path_prefixes: Paths to guard, e.g. ("/predict",)
+            resolve_user: Returns the subject of a valid JWT, or None
+            stream_prefixes: Paths of long-running uploads, e.g. ("/predict/stream",),
+                which are rate limited but do not take an in-flight slot
+        """
+        self.app = app
+        self.controller = controller
+        self.path_prefixes: Tuple[str, ...] = tuple(path_prefixes)
+        self.stream_prefixes: Tuple[str, ...] = tuple(stream_prefixes)
+        self.resolve_user = resolve_user
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        is_stream = path.startswith(self.stream_prefixes)
+        if not is_stream and not path.startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        token = _bearer_token(scope)
+        user = self.resolve_user(token) if token is not None else None
+        if user is None:
+            await self._reject(
+                send, 401, "Could not validate credentials", [(b"www-authenticate", b"Bearer")]
+            )
+            return
+
+        retry_after = self.controller.check_rate(user)
+        if retry_after > 0:
+            await self._reject(send, 429, "Rate limit exceeded", _retry_after_header(retry_after))
+            return
+
+        if is_stream:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self.controller.acquire()
+        if retry_after > 0:
+            await self._reject(send, 503, "Server is busy, please retry later", _retry_after_header(retry_after))
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    @staticmethod
+    async def _reject(
+        send: Callable, status_code: int, detail: str, headers: Sequence[Tuple[bytes, bytes]]
+    ) -> None:
+        """Send an error response with the given extra headers"""
+        body = ('{"detail":"' + detail + '"}').encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                *headers
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global admission controller of this worker
+admission_controller = AdmissionController(
+    max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    user_rate=USER_RATE_LIMIT_PER_SECOND,
+    user_burst=USER_RATE_LIMIT_BURST,
+    retry_after=ADMISSION_RETRY_AFTER_SECONDS
+)
+registry.gauge(
+    "admission_in_flight",
+    "Requests holding an admission slot",
+    callback=lambda: admission_controller.in_flight
+)
+registry.gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot",
+    callback=lambda: admission_controller.waiting
+)
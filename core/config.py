@@ -13,13 +13,129 @@ API_HOST = "0.0.0.0"
 API_PORT = 8000
 
 # Model Configuration
-MODEL_PATH = Path("trained_model/random_forest_rental_price_model_v1_31.pkl")
+MODEL_PATH = Path(os.getenv("MODEL_PATH", "trained_model/random_forest_rental_price_model_v1_31.pkl"))
 EXPECTED_FEATURES = 165
 
+# Memory-map the model's numpy arrays on load ("r", "r+" or "c"; unset to disable).
+# Pages are only shared for compacted model directories (scripts/compact_model.py):
+# sklearn copies a pickled forest's node arrays into the heap when it is loaded.
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE") or None
+
+# Hot reload: synthetic rows predicted with a new model before it is swapped
+# in, and how often to check MODEL_PATH for changes (0 disables watching)
+MODEL_WARMUP_ROWS = int(os.getenv("MODEL_WARMUP_ROWS", "64"))
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "0"))
+
+# Predictions sent through the full request path on startup before /ready
+# reports ready (0 makes the service ready as soon as the model is loaded)
+WARMUP_PREDICTIONS = int(os.getenv("WARMUP_PREDICTIONS", "20"))
+
+# Users allowed to call the admin endpoints (comma-separated)
+ADMIN_USERS = {name.strip() for name in os.getenv("ADMIN_USERS", "fiap").split(",") if name.strip()}
+
+# Comparable listings: reference dataset (see scripts/build_reference_listings.py),
+# memory-mapped on load, and how size and bedrooms weigh against distance
+REFERENCE_LISTINGS_PATH = Path(os.getenv("REFERENCE_LISTINGS_PATH", "data/reference_listings.npy"))
+REFERENCE_LISTINGS_MMAP_MODE = os.getenv("REFERENCE_LISTINGS_MMAP_MODE", "r") or None
+COMPARABLES_DEFAULT_K = int(os.getenv("COMPARABLES_DEFAULT_K", "5"))
+COMPARABLES_MAX_K = int(os.getenv("COMPARABLES_MAX_K", "50"))
+COMPARABLES_SIZE_SCALE_M2 = float(os.getenv("COMPARABLES_SIZE_SCALE_M2", "50"))
+COMPARABLES_BEDROOM_KM = float(os.getenv("COMPARABLES_BEDROOM_KM", "1"))
+
+# Whether /predict accepts intervals and deadline_ms, which evaluate the forest
+# tree by tree. With the sklearn engine this packs a second copy of the model
+# when it is loaded; disable to save that memory
+PER_TREE_PREDICTIONS_ENABLED = os.getenv("PER_TREE_PREDICTIONS_ENABLED", "true").lower() == "true"
+
+# Quantiles of the per-tree predictions returned with intervals=true (comma-separated)
+PREDICTION_INTERVAL_QUANTILES = tuple(
+    float(q) for q in os.getenv("PREDICTION_INTERVAL_QUANTILES", "0.05,0.95").split(",") if q.strip()
+)
+
+# Whether /predict echoes the validated request as input_data unless the
+# request says otherwise (include_input=false gives lean responses)
+PREDICTION_INCLUDE_INPUT = os.getenv("PREDICTION_INCLUDE_INPUT", "true").lower() == "true"
+
+# Batch Prediction Configuration
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "5000"))
+
+# Streaming bulk scoring: rows per model call and longest accepted input line
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(64 * 1024)))
+
+# Inference engine: "sklearn" (model.predict) or "flat" (packed node arrays)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn").lower()
+
+# Inference executor: "thread", "process" or "inline" (on the event loop)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or None
+INFERENCE_MAX_IN_FLIGHT = int(os.getenv("INFERENCE_MAX_IN_FLIGHT", "0")) or None
+
+# Prediction cache (size 0 disables it)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "300"))
+
+# User store: "memory" (seed users only) or "sqlite" (persisted in USER_DB_PATH)
+USER_STORE = os.getenv("USER_STORE", "memory").lower()
+USER_DB_PATH = Path(os.getenv("USER_DB_PATH", "data/users.db"))
+USER_DB_POOL_SIZE = int(os.getenv("USER_DB_POOL_SIZE", "4"))
+# Seconds a SQLite user is served from memory before it is read again, which
+# bounds how long other processes' changes (e.g. deactivations) take to apply
+USER_INDEX_TTL_SECONDS = float(os.getenv("USER_INDEX_TTL_SECONDS", "5"))
+
+# Password verification runs on its own thread pool, with a limit on
+# concurrent verifications per username and on pending verifications overall
+# (logins beyond it get 503; 0 means 16 per worker thread)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_VERIFY_MAX_PER_USER = int(os.getenv("PASSWORD_VERIFY_MAX_PER_USER", "2"))
+PASSWORD_VERIFY_MAX_PENDING = int(os.getenv("PASSWORD_VERIFY_MAX_PENDING", "0")) or 16 * max(PASSWORD_HASH_WORKERS, 1)
+
+# Cache of verified access tokens (size 0 disables it)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+# Micro-batching of concurrent single predictions (opt-in)
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+MICRO_BATCH_WINDOW_MS = float(os.getenv("MICRO_BATCH_WINDOW_MS", "2.0"))
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+
+# Per-request stage durations in a Server-Timing response header (opt-in)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# On-demand profiling: requests carrying X-Profile-Token with this value are
+# profiled, as is a random fraction of all requests (both off by default)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+
+# Admission control of prediction traffic, per worker process: at most
+# ADMISSION_MAX_IN_FLIGHT requests run at once and up to ADMISSION_MAX_QUEUE
+# wait for a slot (0 disables the limit); each user (JWT subject) may send
+# USER_RATE_LIMIT_PER_SECOND requests per second on average (0 disables it).
+# Streaming uploads count against the rate limit only: an in-flight slot would
+# be held for the whole upload
+ADMISSION_PATHS = tuple(
+    p.strip() for p in os.getenv("ADMISSION_PATHS", "/predict,/comparables").split(",") if p.strip()
+)
+ADMISSION_STREAM_PATHS = tuple(
+    p.strip() for p in os.getenv("ADMISSION_STREAM_PATHS", "/predict/stream").split(",") if p.strip()
+)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "1000"))
+ADMISSION_RETRY_AFTER_SECONDS = float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+USER_RATE_LIMIT_PER_SECOND = float(os.getenv("USER_RATE_LIMIT_PER_SECOND", "0"))
+USER_RATE_LIMIT_BURST = float(os.getenv("USER_RATE_LIMIT_BURST", "20"))
+
 # Default Coordinates (Vancouver, BC)
 DEFAULT_LONGITUDE = -123.1207
 DEFAULT_LATITUDE = 49.2827
 
+# Gazetteer used to look up coordinates from city/state or postal code, and
+# city/state from coordinates (nearest place within the maximum distance)
+GAZETTEER_PATH = Path(os.getenv("GAZETTEER_PATH", "data/gazetteer.csv"))
+GAZETTEER_MAX_DISTANCE_KM = float(os.getenv("GAZETTEER_MAX_DISTANCE_KM", "100"))
+GAZETTEER_CACHE_SIZE = int(os.getenv("GAZETTEER_CACHE_SIZE", "4096"))
+
 # Default Values for Missing Data
 DEFAULT_VALUES = {
     'neighborhood': 'unknown',
@@ -0,0 +1,199 @@
+"""
+Local gazetteer for coordinate lookup
+
+Places (city, state, postal code prefixes and coordinates) are read from a
+bundled CSV file into memory once. City/state and postal code lookups are
+hash map lookups; nearest-place lookups search a regular latitude/longitude
+grid ring by ring around the query point, so only nearby places are
+compared.
+"""
+
+import csv
+import math
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+class Place(NamedTuple):
+    """A named place with its coordinates"""
+    city: str
+    state: str
+    longitude: float
+    latitude: float
+
+
+def normalize_name(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a place name ("Saint-Jérôme" -> "saint jerome")"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    ascii_name = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join("".join(char if char.isalnum() else " " for char in ascii_name.casefold()).split())
+
+
+def normalize_postal_code(postal_code: str) -> str:
+    """Upper-case postal code without spaces or dashes ("v6b 1a1" -> "V6B1A1")"""
+    return "".join(char for char in postal_code.upper() if char.isalnum())
+
+
+def haversine_km(longitude1: float, latitude1: float, longitude2: float, latitude2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(longitude2 - longitude1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Gazetteer:
+    """
+    In-memory index of places.
+
+    Postal codes are matched on their longest known prefix, so a full code
+    ("V6B 1A1"), its forward sortation area ("V6B") or a shorter prefix
+    ("M" for Toronto) all resolve.
+    """
+
+    def __init__(self, places: Iterable[Tuple[Place, Iterable[str]]] = (), cell_degrees: float = 1.0):
+        """
+        Build the indexes.
+
+        Args:
+            places: Places with their postal code prefixes
+            cell_degrees: Size of a nearest-lookup grid cell in degrees
+        """
+        self.cell_degrees = cell_degrees
+        self.places: List[Place] = []
+        self._by_name: Dict[Tuple[str, str], Place] = {}
+        self._by_postal_prefix: Dict[str, Place] = {}
+        self._grid: Dict[Tuple[int, int], List[Place]] = {}
+        self._max_prefix_length = 0
+        self._max_abs_latitude = 0.0
+
+        for place, postal_prefixes in places:
+            self.places.append(place)
+            self._by_name[(normalize_name(place.city), place.state.strip().upper())] = place
+            for prefix in postal_prefixes:
+                prefix = normalize_postal_code(prefix)
+                if prefix:
+                    self._by_postal_prefix[prefix] = place
+                    self._max_prefix_length = max(self._max_prefix_length, len(prefix))
+            self._grid.setdefault(self._cell(place.longitude, place.latitude), []).append(place)
+            self._max_abs_latitude = max(self._max_abs_latitude, abs(place.latitude))
+
+        # Grid extent, bounding the ring search
+        cells = list(self._grid)
+        self._cell_bounds = (
+            min(row for row, _ in cells), max(row for row, _ in cells),
+            min(col for _, col in cells), max(col for _, col in cells)
+        ) if cells else None
+
+    @classmethod
+    def from_csv(cls, path: Path, cell_degrees: float = 1.0) -> "Gazetteer":
+        """
+        Load places from a CSV file with the columns city, state,
+        postal_prefixes (space-separated), longitude and latitude.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If a row has invalid coordinates
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+        places = []
+        for row in rows:
+            place = Place(
+                city=row["city"].strip(),
+                state=row["state"].strip().upper(),
+                longitude=float(row["longitude"]),
+                latitude=float(row["latitude"])
+            )
+            places.append((place, (row.get("postal_prefixes") or "").split()))
+        return cls(places, cell_degrees)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _cell(self, longitude: float, latitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def lookup(self, city: str, state: str) -> Optional[Place]:
+        """Exact (normalized) city and state lookup"""
+        return self._by_name.get((normalize_name(city), state.strip().upper()))
+
+    def lookup_postal_code(self, postal_code: str) -> Optional[Place]:
+        """Place of the longest known prefix of a postal code"""
+        code = normalize_postal_code(postal_code)
+        for length in range(min(len(code), self._max_prefix_length), 0, -1):
+            place = self._by_postal_prefix.get(code[:length])
+            if place is not None:
+                return place
+        return None
+
+    def nearest(
+        self,
+        longitude: float,
+        latitude: float,
+        max_distance_km: Optional[float] = None
+    ) -> Optional[Tuple[Place, float]]:
+        """
+        Find the place closest to a point.
+
+        Grid cells are searched in square rings of growing radius around
+        the query cell. Every place outside ring r is more than r cells away
+        in latitude or longitude, so the search stops as soon as the best
+        distance found is below that bound.
+
+        Args:
+            longitude: Longitude of the point
+            latitude: Latitude of the point
+            max_distance_km: Ignore places further away than this
+
+        Returns:
+            Tuple of (place, distance in km), or None if no place qualifies
+        """
+        if self._cell_bounds is None:
+            return None
+
+        min_row, max_row, min_col, max_col = self._cell_bounds
+        row, col = self._cell(longitude, latitude)
+        max_ring = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+        # A degree of longitude is shortest at the highest latitude of any place
+        km_per_cell = self.cell_degrees * KM_PER_DEGREE * math.cos(
+            math.radians(min(max(self._max_abs_latitude, abs(latitude)), 89.0))
+        )
+
+        best: Optional[Place] = None
+        best_km = math.inf
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(row, col, ring):
+                for place in self._grid.get(cell, ()):
+                    distance = haversine_km(longitude, latitude, place.longitude, place.latitude)
+                    if distance < best_km:
+                        best, best_km = place, distance
+            if best_km <= ring * km_per_cell:
+                break
+            if max_distance_km is not None and ring * km_per_cell > max_distance_km:
+                break
+
+        if best is None or (max_distance_km is not None and best_km > max_distance_km):
+            return None
+        return best, best_km
+
+    @staticmethod
+    def _ring_cells(row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+        """Cells on the border of the square of the given radius around a cell"""
+        if ring == 0:
+            yield row, col
+            return
+        for d in range(-ring, ring + 1):
+            yield row - ring, col + d
+            yield row + ring, col + d
+        for d in range(-ring + 1, ring):
+            yield row + d, col - ring
+            yield row + d, col + ring
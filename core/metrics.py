@@ -0,0 +1,474 @@
+"""
+Lightweight Prometheus-style metrics for the Rental Price Prediction API
+
+Counters, gauges and histograms are kept in process memory and rendered in
+the Prometheus text exposition format by the /metrics endpoint. Recording is
+a dict lookup, a bisect and an addition under a lock, cheap enough to leave
+on for every request.
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds, from 50 microseconds to 10 seconds
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    """Render a label set as {name="value",...}"""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """Base class of a metric family with optional labels"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        """Label values in label name order"""
+        return tuple([labels.get(name, "") for name in self.labelnames])
+
+    def samples(self) -> List[str]:
+        """Exposition lines of the metric's samples"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Exposition lines including the HELP and TYPE headers"""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+            *self.samples()
+        ]
+
+
+class _ScalarMetric(Metric):
+    """Metric holding one value per label set, or read from a callback at render time"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Optional[float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the value"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current value"""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if self._callback is not None:
+            value = self._callback()
+            return [] if value is None else [f"{self.name} {_format_value(float(value))}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Counter(_ScalarMetric):
+    """Monotonically increasing count"""
+
+    metric_type = "counter"
+
+
+class Gauge(_ScalarMetric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the value"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrease the value"""
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation"""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        """Number of observations"""
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def sum(self, **labels: str) -> float:
+        """Sum of observations"""
+        entry = self._values.get(self._key(labels))
+        return entry[1][0] if entry else 0.0
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of a block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric, returning the already registered one of the same name if any"""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Optional[float]]] = None
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Optional[float]]] = None
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics shared across modules
+registry = Registry()
+
+STAGE_DURATION = registry.histogram(
+    "prediction_stage_duration_seconds",
+    "Time spent in each stage of request handling",
+    ["stage"]
+)
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total",
+    "HTTP requests handled, by route and status code",
+    ["method", "route", "status"]
+)
+HTTP_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the end of its response",
+    ["method", "route"]
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+
+
+def register_cache_metrics(prefix: str, cache: Any, description: str) -> None:
+    """
+    Expose a cache's size and hit, miss, eviction, expiration and invalidation counters.
+
+    Args:
+        prefix: Metric name prefix, e.g. "prediction_cache"
+        cache: Cache with __len__ and the counters as attributes
+        description: Name of the cache used in the help texts, e.g. "Prediction cache"
+    """
+    registry.gauge(f"{prefix}_size", f"Entries in the {description.lower()}", callback=lambda: len(cache))
+    for name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        registry.counter(
+            f"{prefix}_{name}_total", f"{description} {name}",
+            callback=lambda name=name: getattr(cache, name)
+        )
+
+
+class RequestTimings:
+    """Stage durations and marks of the request being handled"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Accumulate time spent in a stage"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def mark(self, name: str) -> None:
+        """Remember when a point of the request lifecycle was reached"""
+        self.marks[name] = time.perf_counter()
+
+    def lifecycle_stages(self) -> Dict[str, float]:
+        """Durations of the stages delimited by marks rather than timed directly"""
+        marks = self.marks
+        stages = {}
+        if "auth_end" in marks and "handler_start" in marks:
+            stages["validation"] = marks["handler_start"] - marks["auth_end"]
+        if "handler_end" in marks and "response_start" in marks:
+            stages["serialization"] = marks["response_start"] - marks["handler_end"]
+        return stages
+
+
+# Timings of the current request; set by the metrics middleware
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration in the histogram and the current request's timings"""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+class stage_timer:
+    """Context manager timing a block as a request handling stage"""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "stage_timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        record_stage(self.stage, time.perf_counter() - self.start)
+
+
+def request_start() -> float:
+    """time.perf_counter() value at which the current request arrived (now outside of a request)"""
+    timings = current_timings.get()
+    return timings.start if timings is not None else time.perf_counter()
+
+
+def mark(name: str) -> None:
+    """Mark a point of the current request's lifecycle"""
+    timings = current_timings.get()
+    if timings is not None:
+        timings.mark(name)
+
+
+def instrument_handler(handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Mark the start and end of an endpoint function.
+
+    Request validation is the time between the end of authentication and the
+    start of the handler; response serialization is the time between the end
+    of the handler and the start of the response.
+    """
+    @functools.wraps(handler)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        mark("handler_start")
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            mark("handler_end")
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, durations and stage timings.
+
+    Implemented as plain ASGI rather than with BaseHTTPMiddleware so that it
+    adds no task or body buffering to the request path.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        status_code = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timings.mark("response_start")
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            current_timings.reset(token)
+            self._record(scope, timings, status_code)
+
+    @staticmethod
+    def _record(scope: Dict[str, Any], timings: RequestTimings, status_code: int) -> None:
+        """Record the request's metrics once its response is complete"""
+        route = scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        method = scope.get("method", "")
+
+        HTTP_REQUESTS.inc(method=method, route=route_path, status=str(status_code))
+        HTTP_DURATION.observe(time.perf_counter() - timings.start, method=method, route=route_path)
+
+        for stage, seconds in timings.lifecycle_stages().items():
+            STAGE_DURATION.observe(seconds, stage=stage)
+
+
+# Server-Timing entries and the stages each one adds up
+SERVER_TIMING_STAGES = (
+    ("auth", ("jwt_decode", "user_lookup")),
+    ("validate", ("validation",)),
+    ("preprocess", ("encode",)),
+    ("queue", ("executor_wait",)),
+    ("predict", ("inference",)),
+    ("serialize", ("serialization",))
+)
+
+
+def format_server_timing(timings: RequestTimings) -> str:
+    """Render a request's stage durations as a Server-Timing header value (milliseconds)"""
+    stages = {**timings.stages, **timings.lifecycle_stages()}
+    entries = []
+    for name, parts in SERVER_TIMING_STAGES:
+        durations = [stages[part] for part in parts if part in stages]
+        if durations:
+            entries.append(f"{name};dur={1000.0 * sum(durations):.3f}")
+    entries.append(f"total;dur={1000.0 * (time.perf_counter() - timings.start):.3f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header with the request's stage durations.
+
+    Browsers' developer tools and most HTTP clients display the header, which
+    makes it easy to see where a single slow request spent its time.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = current_timings.get()
+        token = None
+        if timings is None:
+            timings = RequestTimings()
+            token = current_timings.set(timings)
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                timings.mark("response_start")
+                header = format_server_timing(timings).encode("latin-1")
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                current_timings.reset(token)
@@ -0,0 +1,188 @@
+"""
+On-demand profiling of individual requests
+
+A request is profiled when it carries an X-Profile-Token header matching the
+PROFILING_TOKEN setting, or when it is picked by random sampling
+(PROFILE_SAMPLE_RATE). Profiles are kept in a bounded in-memory store and
+the response carries an X-Profile-Id header to fetch them with.
+
+pyinstrument (pip install pyinstrument) is used when installed: it is a
+sampling profiler that follows the request across awaits. Otherwise the
+standard library's cProfile is used, which is deterministic, slower and also
+records whatever else the event loop runs while the request is in progress.
+"""
+
+import cProfile
+import hmac
+import io
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from core.config import PROFILE_MAX_STORED
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+
+# Set while a request is being profiled. Profilers only see the thread they
+# were started on, so the inference executor runs such requests inline.
+profiling_request: ContextVar[bool] = ContextVar("profiling_request", default=False)
+
+
+class RequestProfiler:
+    """Profiler for one request, using pyinstrument if available and cProfile otherwise"""
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            self.kind = "cprofile"
+            self._profiler = cProfile.Profile()
+        else:
+            self.kind = "pyinstrument"
+            self._profiler = Profiler(async_mode="enabled")
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def report(self) -> str:
+        """Text report of the profile"""
+        if self.kind == "pyinstrument":
+            return self._profiler.output_text(unicode=True, color=False)
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(40)
+        return stream.getvalue()
+
+
+class ProfileStore:
+    """Bounded store of the most recent request profiles"""
+
+    def __init__(self, max_size: int = 50):
+        self.max_size = max_size
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        profile_id: str,
+        method: str,
+        path: str,
+        status_code: int,
+        duration_ms: float,
+        profiler: str,
+        report: str
+    ) -> None:
+        """Store a profile, evicting the oldest one when full"""
+        with self._lock:
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "method": method,
+                "path": path,
+                "status_code": status_code,
+                "duration_ms": duration_ms,
+                "profiler": profiler,
+                "report": report
+            }
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored profile, or None if unknown or already evicted"""
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first"""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [
+            {key: value for key, value in profile.items() if key != "report"}
+            for profile in reversed(profiles)
+        ]
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests selected by token or by sampling.
+
+    Only add it when profiling is configured; requests that are not selected
+    pay for one header lookup and one random number. One request is profiled
+    at a time: profilers hook the whole interpreter thread, so requests
+    selected while another one is being profiled run unprofiled.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        store: ProfileStore,
+        token: Optional[str] = None,
+        sample_rate: float = 0.0
+    ):
+        self.app = app
+        self.store = store
+        self.token = token.encode("utf-8") if token else None
+        self.sample_rate = sample_rate
+        self._active = False
+
+    def _selected(self, scope: Dict[str, Any]) -> bool:
+        """Whether the request asked for, or was sampled for, profiling"""
+        if self.token is not None:
+            for name, value in scope.get("headers", []):
+                if name == PROFILE_TOKEN_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or self._active or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        token = profiling_request.set(True)
+        profiler = RequestProfiler()
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode("ascii"))]
+            await send(message)
+
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            profiling_request.reset(token)
+            self._active = False
+            self.store.add(
+                profile_id,
+                scope.get("method", ""),
+                scope.get("path", ""),
+                status_code,
+                1000.0 * (time.perf_counter() - start),
+                profiler.kind,
+                profiler.report()
+            )
+
+
+# Profiles collected by the profiling middleware
+profile_store = ProfileStore(PROFILE_MAX_STORED)
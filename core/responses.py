@@ -0,0 +1,36 @@
+"""
+Fast JSON responses for the prediction endpoints
+
+orjson is an optional dependency: it encodes JSON several times faster than
+the standard library. Without it, responses are encoded like FastAPI's
+default JSONResponse, with the same output.
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson when it is installed.
+
+    Like FastAPI's ORJSONResponse, but falls back to the standard JSON
+    encoder instead of failing when orjson is missing. Both produce compact
+    UTF-8 JSON.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def json_encoder_name() -> str:
+    """Name of the encoder used by FastJSONResponse"""
+    return "orjson" if orjson is not None else "json"
@@ -0,0 +1,64 @@
+"""
+Startup timing report
+
+Records how long each phase of bringing a worker up takes: importing the
+application, loading the model, loading the authentication backends and
+warming up the prediction path, so startup regressions show up in /stats
+and in the benchmarks. Import this module before anything heavy, since its
+import time is the reference point.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+
+class StartupReport:
+    """Durations of the startup phases of this process"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.first_prediction_seconds: Optional[float] = None
+        self.time_to_ready_seconds: Optional[float] = None
+
+    def elapsed(self) -> float:
+        """Seconds since the report was created"""
+        return time.perf_counter() - self.started
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Record the duration of a startup phase"""
+        self.phases[phase] = seconds
+
+    def record_warm_up(self, warmup_stats: Dict[str, Any]) -> None:
+        """
+        Record a completed warm-up and mark the process as ready.
+
+        Args:
+            warmup_stats: Statistics returned by MLService.warm_up_serving
+        """
+        self.record("warm_up", warmup_stats["seconds"])
+        if warmup_stats["first_prediction_ms"] is not None:
+            self.first_prediction_seconds = warmup_stats["first_prediction_ms"] / 1000.0
+        self.time_to_ready_seconds = self.elapsed()
+        print(f"Startup report: {self.format()}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the report as a JSON-serializable dict"""
+        return {
+            "phases": dict(self.phases),
+            "first_prediction_seconds": self.first_prediction_seconds,
+            "time_to_ready_seconds": self.time_to_ready_seconds
+        }
+
+    def format(self) -> str:
+        """One-line summary of the report"""
+        parts = [f"{phase}={seconds:.3f}s" for phase, seconds in self.phases.items()]
+        if self.first_prediction_seconds is not None:
+            parts.append(f"first_prediction={self.first_prediction_seconds:.3f}s")
+        if self.time_to_ready_seconds is not None:
+            parts.append(f"time_to_ready={self.time_to_ready_seconds:.3f}s")
+        return ", ".join(parts)
+
+
+# Created when first imported; main.py imports it first
+startup_report = StartupReport()
@@ -2,28 +2,92 @@
 Utility functions for the Rental Price Prediction API
 """
 
-from typing import Tuple
-from core.config import DEFAULT_LONGITUDE, DEFAULT_LATITUDE
+import functools
+from typing import Optional, Tuple
+from core.config import GAZETTEER_PATH, GAZETTEER_CACHE_SIZE, GAZETTEER_MAX_DISTANCE_KM
+from core.gazetteer import Gazetteer, Place
 
 
-def get_coordinates(city: str, state: str) -> Tuple[float, float]:
+@functools.lru_cache(maxsize=None)
+def get_gazetteer() -> Gazetteer:
     """
-    Get longitude and latitude for a given city and state.
+    Return the gazetteer, loading GAZETTEER_PATH on first use.
+    
+    Returns:
+        The gazetteer (empty if the data file cannot be read)
+    """
+    try:
+        gazetteer = Gazetteer.from_csv(GAZETTEER_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: gazetteer not available, coordinates must be sent with every request: {str(e)}")
+        return Gazetteer()
+    print(f"Gazetteer loaded: {len(gazetteer)} places from {GAZETTEER_PATH}")
+    return gazetteer
+
+
+@functools.lru_cache(maxsize=GAZETTEER_CACHE_SIZE)
+def find_place(
+    city: Optional[str],
+    state: Optional[str],
+    postal_code: Optional[str] = None
+) -> Optional[Place]:
+    """
+    Look up a place by postal code or by city and state.
     
     Args:
         city: City name
         state: State abbreviation
+        postal_code: Postal code or a prefix of it; takes precedence over city and state
         
     Returns:
-        Tuple of (longitude, latitude)
+        The place, or None if it is not in the gazetteer
+    """
+    gazetteer = get_gazetteer()
+    if postal_code:
+        place = gazetteer.lookup_postal_code(postal_code)
+        if place is not None:
+            return place
+    if city and state:
+        return gazetteer.lookup(city, state)
+    return None
+
+
+def get_coordinates(
+    city: Optional[str],
+    state: Optional[str],
+    postal_code: Optional[str] = None
+) -> Optional[Tuple[float, float]]:
+    """
+    Get longitude and latitude for a given city and state or postal code.
+    
+    Args:
+        city: City name
+        state: State abbreviation
+        postal_code: Postal code or a prefix of it; takes precedence over city and state
         
-    Note:
-        For now, returns default coordinates for Vancouver, BC. 
-        In the future, this should query a database or external API.
+    Returns:
+        Tuple of (longitude, latitude), or None if the place is not in the gazetteer
     """
-    # TODO: Replace with actual coordinate lookup from database
-    # For now, returning default coordinates for Vancouver, BC
-    return DEFAULT_LONGITUDE, DEFAULT_LATITUDE
+    place = find_place(city, state, postal_code)
+    if place is None:
+        return None
+    return place.longitude, place.latitude
+
+
+@functools.lru_cache(maxsize=GAZETTEER_CACHE_SIZE)
+def find_nearest_place(longitude: float, latitude: float) -> Optional[Place]:
+    """
+    Find the known place closest to a point.
+    
+    Args:
+        longitude: Longitude coordinate
+        latitude: Latitude coordinate
+        
+    Returns:
+        The nearest place, or None if there is none within GAZETTEER_MAX_DISTANCE_KM
+    """
+    result = get_gazetteer().nearest(longitude, latitude, max_distance_km=GAZETTEER_MAX_DISTANCE_KM)
+    return result[0] if result is not None else None
 
 
 def format_price(price: float) -> str:
@@ -51,3 +115,31 @@ def validate_model_file(model_path: str) -> bool:
     """
     import os
     return os.path.exists(model_path) and os.path.isfile(model_path)
+
+
+
+def get_resident_memory_mb() -> float:
+    """
+    Get the resident set size of the current process.
+    
+    Returns:
+        Resident memory in megabytes (peak resident memory where the current
+        value is not available, 0.0 where neither is)
+    """
+    import os
+    import sys
+    
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
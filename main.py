@@ -2,22 +2,68 @@
 Rental Price Prediction API - Main Application
 """
 
+# Imported first: the startup report measures app import time from here
+from core.startup import startup_report
+
+import functools
+import time
 from datetime import timedelta
-from fastapi import FastAPI, HTTPException, Depends, status
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import PlainTextResponse
 import uvicorn
 
-from core.config import API_TITLE, API_DESCRIPTION, API_VERSION, API_HOST, API_PORT
+from core.config import (
+    API_TITLE, API_DESCRIPTION, API_VERSION, API_HOST, API_PORT, MAX_BATCH_SIZE,
+    STREAM_CHUNK_SIZE, STREAM_MAX_LINE_BYTES, SERVER_TIMING_ENABLED,
+    PROFILING_TOKEN, PROFILE_SAMPLE_RATE, WARMUP_PREDICTIONS,
+    COMPARABLES_DEFAULT_K, COMPARABLES_MAX_K, PREDICTION_INTERVAL_QUANTILES, PREDICTION_INCLUDE_INPUT,
+    ADMISSION_PATHS, ADMISSION_STREAM_PATHS
+)
 from models.models import (
     RentalPredictionRequest, 
     RentalPredictionResponse, 
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    ComparablesResponse,
+    BatchComparablesItem,
+    BatchComparablesResponse,
     HealthResponse, 
+    ReadinessResponse,
+    ServiceStatsResponse,
+    ModelReloadRequest,
+    ModelReloadResponse,
+    ProfileSummary,
     ApiInfoResponse,
     LoginRequest,
     TokenResponse,
     User
 )
 from services.ml_service import ml_service
-from services.auth_service import auth_service, get_current_active_user
+from services.comparables_service import comparables_service
+from services.batch_service import (
+    STREAM_MEDIA_TYPES,
+    RequestBodyStreamingResponse,
+    stream_format,
+    stream_predictions,
+    validate_records
+)
+from services.auth_service import (
+    auth_service,
+    get_current_active_user,
+    get_current_admin_user,
+    load_auth_backends,
+    password_verifier,
+    VerifierBusyError
+)
+from services.model_reloader import ReloadInProgressError, model_reloader
+from core.admission import AdmissionMiddleware, admission_controller
+from core.metrics import MetricsMiddleware, ServerTimingMiddleware, instrument_handler, registry, request_start
+from core.profiling import ProfilingMiddleware, profile_store
+from core.responses import FastJSONResponse
+from core.utils import get_gazetteer
+
+startup_report.record("imports", startup_report.elapsed())
 
 
 # Initialize FastAPI app
@@ -43,24 +89,190 @@ app = FastAPI(
     ]
 )
 
+# Middleware added last runs first: metrics wrap everything else
+if PROFILING_TOKEN or PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        token=PROFILING_TOKEN,
+        sample_rate=PROFILE_SAMPLE_RATE
+    )
+if SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+# Admission control sheds excess prediction traffic before any other work;
+# /health, /login and the other system endpoints are never held back
+if admission_controller.enabled:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission_controller,
+        path_prefixes=ADMISSION_PATHS,
+        resolve_user=lambda token: getattr(auth_service.resolve_token(token), "username", None),
+        stream_prefixes=ADMISSION_STREAM_PATHS
+    )
+# Request counts, latencies and per-stage timings for /metrics
+app.add_middleware(MetricsMiddleware)
+
 
 @app.on_event("startup")
 async def startup_event():
     """Load model and pipeline on startup"""
+    start = time.perf_counter()
     success = ml_service.load_model()
+    startup_report.record("model_load", time.perf_counter() - start)
+    
+    # JWT and bcrypt libraries are imported lazily; load them before the first request
+    start = time.perf_counter()
+    load_auth_backends()
+    startup_report.record("auth_backends", time.perf_counter() - start)
+    
+    # Requests without coordinates look them up in the gazetteer
+    start = time.perf_counter()
+    get_gazetteer()
+    startup_report.record("gazetteer", time.perf_counter() - start)
+    
+    # Optional: /comparables answers 503 without reference listings
+    start = time.perf_counter()
+    comparables_service.load()
+    startup_report.record("comparables", time.perf_counter() - start)
+    
     if not success:
         print("Warning: Model failed to load. API will not function properly.")
+    # Warm up in the background: /health answers right away, /ready once done.
+    # Without a model, the warm-up runs once a model is reloaded
+    ml_service.start_warm_up(WARMUP_PREDICTIONS, on_complete=startup_report.record_warm_up)
+    model_reloader.start_watching()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background prediction workers"""
+    await ml_service.stop_warm_up()
+    await model_reloader.stop_watching()
+    if ml_service.batcher is not None:
+        await ml_service.batcher.close()
+    ml_service.executor.shutdown()
+    password_verifier.shutdown()
 
 
 @app.get("/health", response_model=HealthResponse, tags=["System"])
 async def health_check():
-    """Health check endpoint"""
+    """
+    Liveness check
+    
+    Answers as soon as the process is up, without touching the model; use
+    /ready to decide whether to route prediction traffic here.
+    """
     return HealthResponse(
         status="healthy",
-        model_loaded=ml_service.is_loaded
+        model_loaded=ml_service.is_loaded,
+        model_version=ml_service.model_version
     )
 
 
+@app.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    tags=["System"],
+    responses={503: {"model": ReadinessResponse, "description": "Not ready to serve predictions"}}
+)
+async def readiness_check(response: Response):
+    """
+    Readiness check
+    
+    Returns 200 once the model is loaded and the startup warm-up predictions
+    (WARMUP_PREDICTIONS) have gone through the full prediction path, and 503
+    until then.
+    """
+    ready = ml_service.is_ready
+    warmup = ml_service.warmup_stats
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    return ReadinessResponse(
+        status="ready" if ready else "not_ready",
+        model_loaded=ml_service.is_loaded,
+        warmed_up=warmup is not None and warmup["completed"],
+        model_version=ml_service.model_version,
+        warmup=warmup
+    )
+
+
+@app.get("/stats", response_model=ServiceStatsResponse, tags=["System"])
+async def service_stats():
+    """Runtime statistics of the prediction service"""
+    return ServiceStatsResponse(
+        **ml_service.get_stats(),
+        startup=startup_report.as_dict(),
+        comparables=comparables_service.get_stats(),
+        admission=admission_controller.get_stats() if admission_controller.enabled else None
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["System"])
+async def metrics():
+    """
+    Metrics in the Prometheus text exposition format
+    
+    Includes request counts and latencies per route, in-flight requests,
+    per-stage latency histograms (JWT decode, user lookup, validation,
+    encoding, inference, serialization), model load duration and the cache,
+    executor and micro-batching counters.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/reload-model", response_model=ModelReloadResponse, tags=["System"])
+async def reload_model(
+    reload_request: ModelReloadRequest,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Load a new model version without downtime
+    
+    The model file is loaded and warmed up with synthetic rows in the
+    background while the current model keeps serving, then swapped in.
+    Requests already in progress finish on the previous model. If loading
+    fails, the current model stays active. Requires an administrator
+    (ADMIN_USERS).
+    """
+    try:
+        model_path = model_reloader.resolve_path(reload_request.model_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return ModelReloadResponse(**await model_reloader.reload(model_path))
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed, current model kept: {str(e)}")
+
+
+@app.get("/profiles", response_model=List[ProfileSummary], tags=["System"])
+async def list_profiles(current_user: User = Depends(get_current_admin_user)):
+    """
+    List the stored request profiles, newest first
+    
+    Requests are profiled when they carry an X-Profile-Token header matching
+    the PROFILING_TOKEN setting, or when sampled (PROFILE_SAMPLE_RATE). The
+    response of a profiled request has an X-Profile-Id header. Reports
+    show internal call stacks and timings, so this requires an administrator
+    (see ADMIN_USERS).
+    """
+    return profile_store.list()
+
+
+@app.get("/profiles/{profile_id}", response_class=PlainTextResponse, tags=["System"])
+async def get_profile(profile_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Text report of a stored request profile. Administrators only."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile["report"])
+
+
 @app.post("/login", response_model=TokenResponse, tags=["Authentication"])
 async def login(login_request: LoginRequest):
     """
@@ -69,7 +281,14 @@ async def login(login_request: LoginRequest):
     This endpoint authenticates a user with username and password,
     and returns a JWT access token for subsequent API calls.
     """
-    user = auth_service.authenticate_user(login_request.username, login_request.password)
+    try:
+        user = await auth_service.authenticate_user_async(login_request.username, login_request.password)
+    except VerifierBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,9 +304,39 @@ async def login(login_request: LoginRequest):
     return TokenResponse(access_token=access_token, token_type="bearer")
 
 
-@app.post("/predict", response_model=RentalPredictionResponse, tags=["Prediction"])
+def interval_quantiles(
+    intervals: bool = Query(False, description="Also return the spread of the forest's per-tree predictions"),
+    quantiles: Optional[List[float]] = Query(
+        None,
+        description=f"Quantiles of the per-tree predictions to return (default {list(PREDICTION_INTERVAL_QUANTILES)}); implies intervals"
+    )
+) -> Optional[Tuple[float, ...]]:
+    """Quantiles requested for prediction intervals, or None if intervals were not requested"""
+    if quantiles:
+        if any(not 0.0 <= quantile <= 1.0 for quantile in quantiles):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Quantiles must be between 0 and 1"
+            )
+        return tuple(sorted(set(quantiles)))
+    return PREDICTION_INTERVAL_QUANTILES if intervals else None
+
+
+@app.post("/predict", response_model=RentalPredictionResponse, response_class=FastJSONResponse, tags=["Prediction"])
+@instrument_handler
 async def predict_rental_price(
     request: RentalPredictionRequest,
+    deadline_ms: Optional[float] = Query(
+        None,
+        gt=0,
+        le=60000,
+        description="Latency budget in milliseconds from request arrival; trees are averaged until it runs out"
+    ),
+    quantiles: Optional[Tuple[float, ...]] = Depends(interval_quantiles),
+    include_input: bool = Query(
+        PREDICTION_INCLUDE_INPUT,
+        description="Echo the validated request as input_data; false returns a lean response"
+    ),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -95,6 +344,17 @@ async def predict_rental_price(
     
     This endpoint takes property information and returns a predicted rental price
     using a trained machine learning model. Requires authentication.
+    
+    With deadline_ms, the forest's trees are evaluated in order until the budget
+    runs out and the average of the trees evaluated so far is returned, together
+    with how many trees contributed (trees_used and trees_total).
+    
+    With intervals (or quantiles), the response also carries the mean, standard
+    deviation and quantiles of the per-tree predictions, computed from a single
+    evaluation of all trees.
+    
+    With include_input=false the request is not echoed back, which roughly
+    halves the size of the response and the time spent encoding it.
     """
     try:
         if not ml_service.is_loaded:
@@ -104,18 +364,252 @@ async def predict_rental_price(
             )
         
         # Make prediction using the ML service
-        predicted_price = ml_service.predict(request.model_dump())
+        model_version = ml_service.model_version
+        request_data = request.model_dump()
+        extra: Dict[str, Any] = {}
+        if quantiles is not None:
+            if deadline_ms is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="deadline_ms cannot be combined with intervals"
+                )
+            try:
+                interval = (await ml_service.predict_intervals_async([request_data], quantiles))[0]
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Intervals are not supported by this model: {str(e)}")
+            predicted_price = interval["mean"]
+            extra["interval"] = interval
+        elif deadline_ms is None:
+            predicted_price = await ml_service.predict_async(request_data)
+        else:
+            try:
+                predicted_price, trees_used, trees_total = await ml_service.predict_until_async(
+                    request_data, request_start() + deadline_ms / 1000.0
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"deadline_ms is not supported by this model: {str(e)}")
+            extra["trees_used"] = trees_used
+            extra["trees_total"] = trees_total
+        
+        # Plain dict encoded directly: the values are already validated, so
+        # building and re-validating a RentalPredictionResponse is skipped
+        content: Dict[str, Any] = {"predicted_price": predicted_price}
+        if include_input:
+            content["input_data"] = request_data
+        content.update(extra)
+        return FastJSONResponse(content, headers={"X-Model-Version": model_version})
         
-        return RentalPredictionResponse(
-            predicted_price=predicted_price,
-            input_data=request.model_dump()
+    except HTTPException:
+        raise
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+@app.post(
+    "/predict/batch", response_model=BatchPredictionResponse, response_class=FastJSONResponse, tags=["Prediction"]
+)
+@instrument_handler
+async def predict_rental_price_batch(
+    request: BatchPredictionRequest,
+    quantiles: Optional[Tuple[float, ...]] = Depends(interval_quantiles),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Predict rental prices for several properties at once
+    
+    Items are validated individually and all valid items are scored with a
+    single model call. Results are returned in input order; invalid items
+    carry their validation errors instead of a price. With intervals (or
+    quantiles), every valid item also carries the spread of the per-tree
+    predictions. Requires authentication.
+    """
+    if len(request.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds the maximum of {MAX_BATCH_SIZE} items"
         )
+    
+    try:
+        if not ml_service.is_loaded:
+            raise HTTPException(
+                status_code=500, 
+                detail="Model not loaded. Please check server logs."
+            )
+        
+        valid_indices, valid_records, errors = validate_records(request.items)
         
+        # Make all predictions with a single model call
+        model_version = ml_service.model_version
+        if quantiles is None:
+            predicted_prices = await ml_service.predict_batch_async(valid_records)
+            intervals_by_index = {}
+        else:
+            try:
+                intervals = await ml_service.predict_intervals_async(valid_records, quantiles)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Intervals are not supported by this model: {str(e)}")
+            predicted_prices = [interval["mean"] for interval in intervals]
+            intervals_by_index = dict(zip(valid_indices, intervals))
+        prices_by_index = dict(zip(valid_indices, predicted_prices))
+        
+        # Items are built as plain dicts, in the BatchPredictionResponse layout
+        predictions = [
+            {
+                "index": index,
+                "predicted_price": prices_by_index.get(index),
+                "errors": errors.get(index),
+                "interval": intervals_by_index.get(index)
+            }
+            for index in range(len(request.items))
+        ]
+        
+        return FastJSONResponse(
+            {
+                "predictions": predictions,
+                "total": len(request.items),
+                "succeeded": len(valid_indices),
+                "failed": len(errors)
+            },
+            headers={"X-Model-Version": model_version}
+        )
+        
+    except HTTPException:
+        raise
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+
+@app.post(
+    "/predict/stream",
+    tags=["Prediction"],
+    response_class=RequestBodyStreamingResponse,
+    responses={
+        200: {
+            "description": "One result per input row, in input order",
+            "content": {media_type: {} for media_type in STREAM_MEDIA_TYPES.values()}
+        }
+    }
+)
+async def predict_rental_price_stream(
+    request: Request,
+    chunk_size: int = Query(
+        STREAM_CHUNK_SIZE, ge=1, le=MAX_BATCH_SIZE, description="Rows scored per model call"
+    ),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Score a large NDJSON or CSV upload as a stream
+    
+    Send one property per line, as JSON objects (Content-Type: application/x-ndjson)
+    or as CSV rows with a header line (Content-Type: text/csv). The body is read
+    and scored in chunks and results are streamed back in the same format, one
+    line per input row with its index, predicted price or validation errors, so
+    memory use does not grow with the size of the upload. Requires authentication.
+    """
+    fmt = stream_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type must be application/x-ndjson or text/csv"
+        )
+    
+    if not ml_service.is_loaded:
+        raise HTTPException(
+            status_code=500, 
+            detail="Model not loaded. Please check server logs."
+        )
+    
+    # Score the whole stream with the model current when it started; bulk
+    # rows bypass the prediction cache so they do not evict /predict entries
+    bundle = ml_service.bundle
+    
+    return RequestBodyStreamingResponse(
+        stream_predictions(
+            request.stream(),
+            fmt,
+            functools.partial(ml_service.predict_batch_async, bundle=bundle, use_cache=False),
+            chunk_size=chunk_size,
+            max_line_bytes=STREAM_MAX_LINE_BYTES
+        ),
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers={"X-Model-Version": bundle.version}
+    )
+
+
+@app.post("/comparables", response_model=ComparablesResponse, tags=["Prediction"])
+@instrument_handler
+async def find_comparables(
+    request: RentalPredictionRequest,
+    k: int = Query(COMPARABLES_DEFAULT_K, ge=1, le=COMPARABLES_MAX_K, description="Number of listings"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Find the reference listings most similar to a property
+    
+    Takes the same payload as /predict and returns the k nearest reference
+    listings by location, size and number of bedrooms, closest first.
+    Requires authentication.
+    """
+    if not comparables_service.is_loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Reference listings not loaded. Please check server logs."
+        )
+    
+    comparables = await comparables_service.find_async([request.model_dump()], k)
+    return ComparablesResponse(comparables=comparables[0])
+
+
+@app.post("/comparables/batch", response_model=BatchComparablesResponse, tags=["Prediction"])
+@instrument_handler
+async def find_comparables_batch(
+    request: BatchPredictionRequest,
+    k: int = Query(COMPARABLES_DEFAULT_K, ge=1, le=COMPARABLES_MAX_K, description="Number of listings per item"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Find comparable listings for several properties at once
+    
+    Takes the same payload as /predict/batch. Items are validated
+    individually and all valid items are looked up with a single tree
+    query; invalid items carry their validation errors. Requires
+    authentication.
+    """
+    if len(request.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds the maximum of {MAX_BATCH_SIZE} items"
+        )
+    
+    if not comparables_service.is_loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Reference listings not loaded. Please check server logs."
+        )
+    
+    valid_indices, valid_records, errors = validate_records(request.items)
+    comparables = await comparables_service.find_async(valid_records, k)
+    comparables_by_index = dict(zip(valid_indices, comparables))
+    
+    return BatchComparablesResponse(
+        results=[
+            BatchComparablesItem(
+                index=index,
+                comparables=comparables_by_index.get(index),
+                errors=errors.get(index)
+            )
+            for index in range(len(request.items))
+        ],
+        total=len(request.items),
+        succeeded=len(valid_indices),
+        failed=len(errors)
+    )
+
+
 @app.get("/me", response_model=User, tags=["Authentication"])
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     """
@@ -2,16 +2,36 @@
 Data models for the Rental Price Prediction API
 """
 
-from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, Any, Optional, List
+
+from core.utils import find_nearest_place, find_place
 
 
 class RentalPredictionRequest(BaseModel):
-    """Request model for rental price prediction"""
-    longitude: float = Field(..., description="Longitude coordinate", example=-79.416300)
-    latitude: float = Field(..., description="Latitude coordinate", example=43.700110)
-    city: str = Field(..., description="City name", example="vancouver")
-    state: str = Field(..., description="State abbreviation", example="BC")
+    """
+    Request model for rental price prediction
+    
+    The location can be given as coordinates, as city and state, or as a
+    postal code; missing parts are looked up in the gazetteer.
+    """
+    longitude: Optional[float] = Field(
+        default=None, description="Longitude coordinate; looked up from postal_code or city/state if omitted",
+        example=-79.416300
+    )
+    latitude: Optional[float] = Field(
+        default=None, description="Latitude coordinate; looked up from postal_code or city/state if omitted",
+        example=43.700110
+    )
+    city: Optional[str] = Field(
+        default=None, description="City name; taken from the nearest known city if omitted", example="vancouver"
+    )
+    state: Optional[str] = Field(
+        default=None, description="State abbreviation; taken from the nearest known city if omitted", example="BC"
+    )
+    postal_code: Optional[str] = Field(
+        default=None, description="Postal code or its first characters, used to look up coordinates", example="V6B"
+    )
     building_type: str = Field(..., description="Type of building", example="highrise")
     bedrooms: int = Field(..., ge=0, description="Number of bedrooms", example=2)
     bathrooms: int = Field(..., ge=0, description="Number of bathrooms", example=2)
@@ -43,12 +63,58 @@ class RentalPredictionRequest(BaseModel):
                 "rental_type": "long_term"
             }
         }
+    
+    @field_validator("longitude", "latitude", "city", "state", "postal_code", mode="before")
+    @classmethod
+    def empty_as_missing(cls, value: Any) -> Any:
+        """Treat empty values (e.g. blank CSV cells) as omitted"""
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+    
+    @model_validator(mode="after")
+    def resolve_location(self) -> "RentalPredictionRequest":
+        """Fill in coordinates or city and state from the gazetteer"""
+        if (self.longitude is None) != (self.latitude is None):
+            raise ValueError("longitude and latitude must be given together")
+        if (self.city is None) != (self.state is None):
+            raise ValueError("city and state must be given together")
+        
+        if self.longitude is None:
+            place = find_place(self.city, self.state, self.postal_code)
+            if place is None:
+                raise ValueError(
+                    "Location not found in the gazetteer; send longitude and latitude, "
+                    "a known city and state, or a known postal code"
+                )
+            self.longitude, self.latitude = place.longitude, place.latitude
+            if self.city is None:
+                self.city, self.state = place.city, place.state
+        elif self.city is None:
+            place = find_nearest_place(self.longitude, self.latitude)
+            if place is None:
+                raise ValueError("No known city near the coordinates; send city and state")
+            self.city, self.state = place.city, place.state
+        
+        return self
+
+
+class PredictionInterval(BaseModel):
+    """Spread of the forest's per-tree predictions for one property"""
+    mean: float = Field(..., description="Mean of the per-tree predictions (the predicted price)")
+    std: float = Field(..., description="Standard deviation of the per-tree predictions")
+    quantiles: Dict[str, float] = Field(..., description="Quantiles of the per-tree predictions, keyed by quantile")
 
 
 class RentalPredictionResponse(BaseModel):
     """Response model for rental price prediction"""
     predicted_price: float = Field(..., description="Predicted rental price")
-    input_data: Dict[str, Any] = Field(..., description="Processed input data used for prediction")
+    input_data: Optional[Dict[str, Any]] = Field(
+        None, description="Processed input data used for prediction (left out with include_input=false)"
+    )
+    trees_used: Optional[int] = Field(None, description="Trees averaged before the deadline (only with deadline_ms)")
+    trees_total: Optional[int] = Field(None, description="Trees in the model (only with deadline_ms)")
+    interval: Optional[PredictionInterval] = Field(None, description="Per-tree prediction spread (only with intervals)")
     
     class Config:
         json_schema_extra = {
@@ -74,15 +140,200 @@ class RentalPredictionResponse(BaseModel):
         }
 
 
+class BatchPredictionRequest(BaseModel):
+    """Request model for batch rental price prediction"""
+    # Items are validated one by one, so a malformed item (even one that is
+    # not an object) is reported on its own instead of rejecting the batch
+    items: List[Any] = Field(
+        ...,
+        min_length=1,
+        description="Properties to predict, each with the same fields as a single prediction request"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    RentalPredictionRequest.model_config["json_schema_extra"]["example"],
+                    {
+                        **RentalPredictionRequest.model_config["json_schema_extra"]["example"],
+                        "bedrooms": 1,
+                        "size": 450
+                    }
+                ]
+            }
+        }
+
+
+class BatchPredictionItem(BaseModel):
+    """Prediction result for a single item of a batch"""
+    index: int = Field(..., description="Position of the item in the request")
+    predicted_price: Optional[float] = Field(default=None, description="Predicted rental price, if the item was valid")
+    errors: Optional[List[Dict[str, Any]]] = Field(default=None, description="Validation errors, if the item was invalid")
+    interval: Optional[PredictionInterval] = Field(
+        default=None, description="Per-tree prediction spread, if the item was valid and intervals were requested"
+    )
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response model for batch rental price prediction"""
+    predictions: List[BatchPredictionItem] = Field(..., description="Results in input order")
+    total: int = Field(..., description="Number of items received")
+    succeeded: int = Field(..., description="Number of items predicted")
+    failed: int = Field(..., description="Number of items rejected by validation")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "predictions": [
+                    {"index": 0, "predicted_price": 2500.50, "errors": None},
+                    {
+                        "index": 1,
+                        "predicted_price": None,
+                        "errors": [
+                            {
+                                "loc": ["bedrooms"],
+                                "msg": "Input should be greater than or equal to 0",
+                                "type": "greater_than_equal"
+                            }
+                        ]
+                    }
+                ],
+                "total": 2,
+                "succeeded": 1,
+                "failed": 1
+            }
+        }
+
+
+class ComparableListing(BaseModel):
+    """A reference listing similar to the requested property"""
+    id: int = Field(..., description="Listing identifier in the reference dataset")
+    longitude: float = Field(..., description="Longitude coordinate")
+    latitude: float = Field(..., description="Latitude coordinate")
+    size: float = Field(..., description="Property size in square meters")
+    bedrooms: int = Field(..., description="Number of bedrooms")
+    bathrooms: int = Field(..., description="Number of bathrooms")
+    price: float = Field(..., description="Rental price of the listing")
+    distance: float = Field(..., description="Dissimilarity to the requested property (km-equivalent)")
+
+
+class ComparablesResponse(BaseModel):
+    """Response model for comparable listings"""
+    comparables: List[ComparableListing] = Field(..., description="Most similar listings, closest first")
+
+
+class BatchComparablesItem(BaseModel):
+    """Comparable listings for one item of a batch"""
+    index: int = Field(..., description="Position of the item in the request")
+    comparables: Optional[List[ComparableListing]] = Field(
+        default=None, description="Most similar listings, closest first, if the item was valid"
+    )
+    errors: Optional[List[Dict[str, Any]]] = Field(
+        default=None, description="Validation errors, if the item was invalid"
+    )
+
+
+class BatchComparablesResponse(BaseModel):
+    """Response model for batch comparable listings"""
+    results: List[BatchComparablesItem] = Field(..., description="Per-item results, in input order")
+    total: int = Field(..., description="Number of items received")
+    succeeded: int = Field(..., description="Number of valid items")
+    failed: int = Field(..., description="Number of invalid items")
+
+
 class HealthResponse(BaseModel):
     """Health check response model"""
     status: str = Field(..., description="API status")
     model_loaded: bool = Field(..., description="Whether the ML model is loaded")
+    model_version: Optional[str] = Field(default=None, description="Version of the model serving predictions")
+    
+    class Config:
+        protected_namespaces = ()
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response model"""
+    status: str = Field(..., description="'ready' or 'not_ready'")
+    model_loaded: bool = Field(..., description="Whether the ML model is loaded")
+    warmed_up: bool = Field(..., description="Whether the startup warm-up predictions completed")
+    model_version: Optional[str] = Field(default=None, description="Version of the model serving predictions")
+    warmup: Optional[Dict[str, Any]] = Field(
+        default=None, description="Warm-up progress and timings, once warm-up started"
+    )
     
     class Config:
         protected_namespaces = ()
 
 
+class ServiceStatsResponse(BaseModel):
+    """Runtime statistics response model"""
+    model_load: Optional[Dict[str, Any]] = Field(
+        default=None, description="Model load time and resident memory, once a model is loaded"
+    )
+    warmup: Optional[Dict[str, Any]] = Field(
+        default=None, description="Startup warm-up of the serving path, once it started"
+    )
+    startup: Optional[Dict[str, Any]] = Field(
+        default=None, description="Duration of each startup phase and time until the service was ready"
+    )
+    comparables: Optional[Dict[str, Any]] = Field(
+        default=None, description="Reference listings used for comparables, if loaded"
+    )
+    engine: str = Field(..., description="Inference engine in use")
+    executor: Dict[str, Any] = Field(..., description="Inference executor configuration and load")
+    cache: Dict[str, Any] = Field(..., description="Prediction cache configuration and counters")
+    micro_batching: Optional[Dict[str, Any]] = Field(
+        default=None, description="Micro-batching statistics, if micro-batching is enabled"
+    )
+    admission: Optional[Dict[str, Any]] = Field(
+        default=None, description="Admission control limits and counters, if admission control is enabled"
+    )
+    
+    class Config:
+        protected_namespaces = ()
+
+
+class ModelReloadRequest(BaseModel):
+    """Request model for reloading the prediction model"""
+    model_path: Optional[str] = Field(
+        default=None,
+        description="Model file to load, relative to the model directory; defaults to the current model file"
+    )
+    
+    class Config:
+        protected_namespaces = ()
+        json_schema_extra = {
+            "example": {
+                "model_path": "random_forest_rental_price_model_v1_32.pkl"
+            }
+        }
+
+
+class ModelReloadResponse(BaseModel):
+    """Response model for a completed model reload"""
+    previous_version: Optional[str] = Field(default=None, description="Version that was serving before the reload")
+    model_version: str = Field(..., description="Version now serving predictions")
+    model_generation: int = Field(..., description="Number of models activated since startup")
+    path: str = Field(..., description="Loaded model file")
+    load_seconds: float = Field(..., description="Time taken to load the model")
+    warmup_seconds: float = Field(..., description="Time taken to warm up the model")
+    
+    class Config:
+        protected_namespaces = ()
+
+
+class ProfileSummary(BaseModel):
+    """Stored request profile summary model"""
+    id: str = Field(..., description="Profile id, as returned in the X-Profile-Id header")
+    created_at: str = Field(..., description="When the profile was recorded (ISO 8601)")
+    method: str = Field(..., description="HTTP method of the profiled request")
+    path: str = Field(..., description="Path of the profiled request")
+    status_code: int = Field(..., description="Response status code")
+    duration_ms: float = Field(..., description="Request duration while profiled, in milliseconds")
+    profiler: str = Field(..., description="Profiler used: pyinstrument or cprofile")
+
+
 class ApiInfoResponse(BaseModel):
     """API information response model"""
     message: str = Field(..., description="API name")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Offline parallel batch scoring of rental listings
+
+Reads a CSV or Parquet file in chunks, scores the chunks on a process pool
+with the same preprocessing and model as the API (MLService), and appends the
+predictions to a CSV file as chunks complete, in input order. Progress is
+checkpointed after every chunk, so an interrupted run can be continued with
+--resume.
+
+Usage:
+    python scripts/batch_score.py listings.csv predictions.csv [--workers 4] [--resume]
+
+Parquet input requires pyarrow (pip install pyarrow).
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import MODEL_PATH, MODEL_MMAP_MODE
+from services.batch_service import CSV_OUTPUT_COLUMNS, format_result, score_chunk_sync
+from services.ml_service import ml_service
+
+
+def iter_chunks(input_path: Path, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read the input file in chunks of records.
+
+    CSV values are read as strings and converted by request validation, the
+    same way /predict/stream handles CSV uploads.
+    """
+    if input_path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Reading Parquet files requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+    else:
+        import pandas as pd
+        reader = pd.read_csv(input_path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+        for frame in reader:
+            yield frame.to_dict("records")
+
+
+def _init_worker(model_path: str, mmap_mode: Optional[str]) -> None:
+    """Load the model in a pool process unless it was inherited from the parent"""
+    if not ml_service.is_loaded and not ml_service.load_model(Path(model_path), mmap_mode):
+        raise RuntimeError(f"Could not load model from {model_path}")
+
+
+def _score(chunk_index: int, start_index: int, records: List[Dict[str, Any]]) -> Tuple[int, str, int]:
+    """Score a chunk in a pool process and return it formatted as CSV lines"""
+    # Every row is scored once, so caching would only fill the cache
+    predict_batch = functools.partial(ml_service.predict_batch, use_cache=False)
+    results = score_chunk_sync(records, start_index, predict_batch)
+    failed = sum(1 for result in results if result["errors"])
+    return chunk_index, "".join(format_result(result, "csv") for result in results), failed
+
+
+class Checkpoint:
+    """Progress of a scoring run, stored next to the output file"""
+
+    def __init__(self, path: Path, input_path: Path, chunk_size: int):
+        self.path = path
+        self.input_path = str(input_path.resolve())
+        self.chunk_size = chunk_size
+        self.chunks_done = 0
+        self.rows_done = 0
+        self.failed_rows = 0
+        self.output_bytes = 0
+
+    def load(self) -> bool:
+        """Restore progress from disk; returns False if there is nothing to resume"""
+        if not self.path.exists():
+            return False
+        state = json.loads(self.path.read_text())
+        if state["input_path"] != self.input_path or state["chunk_size"] != self.chunk_size:
+            sys.exit(
+                f"Checkpoint {self.path} was written for {state['input_path']} with "
+                f"chunk size {state['chunk_size']}; use the same input and --chunk-size to resume"
+            )
+        self.chunks_done = state["chunks_done"]
+        self.rows_done = state["rows_done"]
+        self.failed_rows = state["failed_rows"]
+        self.output_bytes = state["output_bytes"]
+        return True
+
+    def save(self) -> None:
+        """Atomically write progress to disk"""
+        temporary_path = self.path.with_suffix(".tmp")
+        temporary_path.write_text(json.dumps({
+            "input_path": self.input_path,
+            "chunk_size": self.chunk_size,
+            "chunks_done": self.chunks_done,
+            "rows_done": self.rows_done,
+            "failed_rows": self.failed_rows,
+            "output_bytes": self.output_bytes
+        }))
+        os.replace(temporary_path, self.path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline parallel batch scoring of rental listings")
+    parser.add_argument("input", type=Path, help="CSV or Parquet file with one listing per row")
+    parser.add_argument("output", type=Path, help="CSV file to write predictions to")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per chunk (default: 10000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes")
+    parser.add_argument("--model-path", type=Path, default=MODEL_PATH, help="Model file to use")
+    parser.add_argument("--mmap-mode", default=MODEL_MMAP_MODE, help="Memory-map mode for loading the model")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run")
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint(args.output.with_name(args.output.name + ".checkpoint"), args.input, args.chunk_size)
+    resuming = args.resume and checkpoint.load()
+    if resuming:
+        print(f"Resuming after {checkpoint.chunks_done} chunks ({checkpoint.rows_done} rows)")
+
+    # Load once in the parent: with fork, pool processes share the loaded model
+    # copy-on-write instead of each loading their own
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in start_methods else None)
+    if not ml_service.load_model(args.model_path, args.mmap_mode):
+        sys.exit(f"Could not load model from {args.model_path}")
+
+    output = open(args.output, "r+b" if resuming else "wb")
+    if resuming:
+        # Drop anything written after the last checkpoint
+        output.truncate(checkpoint.output_bytes)
+        output.seek(checkpoint.output_bytes)
+    else:
+        output.write((",".join(CSV_OUTPUT_COLUMNS) + "\n").encode("utf-8"))
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    max_pending = 2 * args.workers
+    pending = {}
+    next_to_write = checkpoint.chunks_done
+
+    def write_ready() -> None:
+        """Write completed chunks in input order and checkpoint after each one"""
+        nonlocal next_to_write, rows_this_run
+        while next_to_write in pending and pending[next_to_write][0].done():
+            future, n_rows = pending.pop(next_to_write)
+            _, lines, failed = future.result()
+            output.write(lines.encode("utf-8"))
+            output.flush()
+            checkpoint.chunks_done += 1
+            checkpoint.rows_done += n_rows
+            checkpoint.failed_rows += failed
+            checkpoint.output_bytes = output.tell()
+            checkpoint.save()
+            next_to_write += 1
+            rows_this_run += n_rows
+
+            elapsed = time.perf_counter() - started
+            print(
+                f"\r{checkpoint.rows_done} rows scored "
+                f"({rows_this_run / elapsed:,.0f} rows/s, {checkpoint.failed_rows} invalid)",
+                end="", file=sys.stderr, flush=True
+            )
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(str(args.model_path), args.mmap_mode)
+    ) as pool:
+        skip_chunks = checkpoint.chunks_done
+        start_index = 0
+        for chunk_index, records in enumerate(iter_chunks(args.input, args.chunk_size)):
+            if chunk_index < skip_chunks:
+                start_index += len(records)
+                continue
+
+            pending[chunk_index] = (pool.submit(_score, chunk_index, start_index, records), len(records))
+            start_index += len(records)
+
+            # Keep a bounded number of chunks in memory
+            while len(pending) >= max_pending:
+                pending[next_to_write][0].result()
+                write_ready()
+            write_ready()
+
+        while pending:
+            pending[next_to_write][0].result()
+            write_ready()
+
+    output.close()
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+    print(
+        f"Scored {rows_this_run} rows in {elapsed:.2f}s "
+        f"({rows_this_run / elapsed if elapsed else 0.0:,.0f} rows/s); "
+        f"{checkpoint.rows_done} rows total, {checkpoint.failed_rows} invalid. "
+        f"Predictions written to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
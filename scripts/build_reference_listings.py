@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Build the reference listings file used by the /comparables endpoint
+
+Reads listings from a CSV or Parquet file and writes them as a structured
+numpy array (.npy), which the API memory-maps on startup. Rows with missing
+or invalid values are skipped.
+
+Usage:
+    python scripts/build_reference_listings.py listings.csv [--output data/reference_listings.npy]
+
+Column names default to those of the training data and can be changed with
+the --*-column options. Without --id-column, listings are numbered by row.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import REFERENCE_LISTINGS_PATH
+from services.comparables_service import ComparablesIndex, build_listings
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    """Read a CSV or Parquet file"""
+    if path.suffix.lower() in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", type=Path, help="Listings file (.csv or .parquet)")
+    parser.add_argument("--output", type=Path, default=REFERENCE_LISTINGS_PATH, help="Destination .npy file")
+    parser.add_argument("--id-column", default=None, help="Listing identifier column (default: row number)")
+    parser.add_argument("--longitude-column", default="longitude")
+    parser.add_argument("--latitude-column", default="latitude")
+    parser.add_argument("--size-column", default="size")
+    parser.add_argument("--bedrooms-column", default="total_rooms")
+    parser.add_argument("--bathrooms-column", default="total_bathrooms")
+    parser.add_argument("--price-column", default="price")
+    args = parser.parse_args()
+
+    columns = {
+        "longitude": args.longitude_column,
+        "latitude": args.latitude_column,
+        "size": args.size_column,
+        "bedrooms": args.bedrooms_column,
+        "bathrooms": args.bathrooms_column,
+        "price": args.price_column,
+    }
+    if args.id_column:
+        columns["id"] = args.id_column
+
+    data = read_table(args.input)
+    missing = [column for column in columns.values() if column not in data.columns]
+    if missing:
+        parser.error(f"Columns not found in {args.input}: {', '.join(missing)}")
+
+    values = data[list(columns.values())].rename(columns={v: k for k, v in columns.items()})
+    values = values.apply(pd.to_numeric, errors="coerce").replace([np.inf, -np.inf], np.nan).dropna()
+    values = values[(values["size"] > 0) & (values["bedrooms"] >= 0) & (values["bathrooms"] >= 0)]
+
+    listings = build_listings(
+        values["longitude"].to_numpy(),
+        values["latitude"].to_numpy(),
+        values["size"].to_numpy(),
+        values["bedrooms"].to_numpy(),
+        values["bathrooms"].to_numpy(),
+        values["price"].to_numpy(),
+        ids=values["id"].to_numpy() if "id" in values else None
+    )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    np.save(args.output, listings)
+
+    # Check that the file loads and indexes as the API will do it
+    index = ComparablesIndex.load(args.output)
+    print(f"Read {len(data)} rows, kept {len(listings)} listings")
+    print(f"Wrote {args.output} ({args.output.stat().st_size / (1024 * 1024):.1f} MB, {len(index)} listings indexed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Build reduced-footprint variants of the trained model and report their accuracy
+
+Each variant keeps k of the forest's trees, chosen either as the first k
+("first") or by greedy forward selection of the trees whose average best
+tracks the full model ("greedy"). Its nodes are then pruned (splits made
+unreachable by the splits above them or by features that are constant in
+every request, and splits between two identical leaves) and stored with
+float32 thresholds and leaf values. The report compares every variant with
+the full model on sampled requests: error, memory and latency.
+
+Usage:
+    python scripts/compact_model.py [--source PATH] [--trees 10 25 50] [--selection first greedy]
+    python scripts/compact_model.py --save 25:greedy [--output DIR]
+
+Then start the API with MODEL_PATH pointing at the saved directory. Trees are
+selected on one half of the sampled requests and errors are measured on the
+other half. Requests are sampled around the gazetteer's cities unless a JSON
+lines file of request payloads is given with --requests.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import MODEL_PATH, EXPECTED_FEATURES
+from core.utils import get_gazetteer
+from services.feature_encoder import FeatureEncoder
+from services.forest_engine import FlatForest
+from services.ml_service import WARMUP_REQUEST
+
+SELECTION_METHODS = ("first", "greedy")
+
+
+def sample_requests(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Varied request payloads spread around the gazetteer's cities"""
+    rng = random.Random(seed)
+    places = get_gazetteer().places
+    requests = []
+    for _ in range(n):
+        place = rng.choice(places)
+        requests.append({
+            **WARMUP_REQUEST,
+            "longitude": place.longitude + rng.uniform(-0.1, 0.1),
+            "latitude": place.latitude + rng.uniform(-0.1, 0.1),
+            "city": place.city,
+            "state": place.state,
+            "size": rng.randint(250, 2500),
+            "bedrooms": rng.randint(0, 5),
+            "bathrooms": rng.randint(1, 3),
+            "allow_pets": rng.randint(0, 1),
+            "allow_smoking": rng.randint(0, 1),
+            "furnished": rng.randint(0, 1),
+            "count_private_parking": rng.randint(0, 2)
+        })
+    return requests
+
+
+def read_requests(path: Path) -> List[Dict[str, Any]]:
+    """Read request payloads from a JSON lines file"""
+    with open(path, encoding="utf-8") as f:
+        return [{**WARMUP_REQUEST, **json.loads(line)} for line in f if line.strip()]
+
+
+def select_trees(per_tree: np.ndarray, k: int, method: str) -> List[int]:
+    """
+    Choose k trees.
+
+    Args:
+        per_tree: Per-tree predictions on the selection rows, shape (n_trees, n_rows)
+        k: Number of trees to keep
+        method: "first" keeps the first k trees; "greedy" repeatedly adds the
+            tree that brings the running average closest to the full model
+
+    Returns:
+        Indices of the selected trees, in selection order
+    """
+    if method == "first":
+        return list(range(k))
+
+    target = per_tree.mean(axis=0)
+    selected: List[int] = []
+    remaining = np.ones(len(per_tree), dtype=bool)
+    total = np.zeros(per_tree.shape[1])
+    for step in range(1, k + 1):
+        candidates = np.flatnonzero(remaining)
+        errors = (((total + per_tree[candidates]) / step - target) ** 2).mean(axis=1)
+        best = int(candidates[np.argmin(errors)])
+        selected.append(best)
+        remaining[best] = False
+        total += per_tree[best]
+    return selected
+
+
+def compact(
+    forest: FlatForest,
+    trees: Sequence[int],
+    constant_features: Optional[Dict[int, float]],
+    float32: bool
+) -> FlatForest:
+    """Keep the given trees, prune them and optionally narrow them to float32"""
+    variant = forest.subset(trees)
+    if constant_features is not None:
+        variant = variant.prune(constant_features)
+    if float32:
+        variant = variant.to_float32()
+    return variant
+
+
+def time_predict(forest: FlatForest, X: np.ndarray, min_seconds: float = 0.2) -> float:
+    """Return the mean microseconds per predict call over at least min_seconds"""
+    forest.predict(X)
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        forest.predict(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls * 1e6
+
+
+def evaluate(
+    name: str,
+    variant: FlatForest,
+    X: np.ndarray,
+    reference: np.ndarray,
+    batch_size: int
+) -> Dict[str, Any]:
+    """Error against the full model, memory and latency of a variant"""
+    error = np.abs(variant.predict(X) - reference)
+    return {
+        "variant": name,
+        "trees": variant.n_trees,
+        "nodes": variant.n_nodes,
+        "max_depth": variant.max_depth,
+        "memory_mb": variant.nbytes / (1024 * 1024),
+        "mae": float(error.mean()),
+        "max_error": float(error.max()),
+        "mean_relative_error": float((error / np.maximum(np.abs(reference), 1e-9)).mean()),
+        "single_row_us": time_predict(variant, X[:1]),
+        "batch_us_per_row": time_predict(variant, X[:batch_size]) / min(batch_size, len(X))
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """Print the variants as a table"""
+    print(
+        f"{'variant':<16} {'trees':>5} {'nodes':>9} {'MB':>8} {'MAE':>10} "
+        f"{'max err':>10} {'rel err':>8} {'1 row us':>9} {'row us (batch)':>14}"
+    )
+    for result in results:
+        print(
+            f"{result['variant']:<16} {result['trees']:>5} {result['nodes']:>9} "
+            f"{result['memory_mb']:>8.2f} {result['mae']:>10.3f} {result['max_error']:>10.3f} "
+            f"{result['mean_relative_error']:>8.2%} {result['single_row_us']:>9.1f} "
+            f"{result['batch_us_per_row']:>14.2f}"
+        )
+
+
+def parse_variant(value: str) -> Any:
+    """Parse K:METHOD, e.g. 25:greedy"""
+    k, _, method = value.partition(":")
+    method = method or "first"
+    if not k.isdigit() or int(k) < 1 or method not in SELECTION_METHODS:
+        raise argparse.ArgumentTypeError(f"Expected K:METHOD with METHOD in {SELECTION_METHODS}, got {value!r}")
+    return int(k), method
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", type=Path, default=MODEL_PATH, help="Trained model file")
+    parser.add_argument("--trees", type=int, nargs="+", default=[10, 25, 50], help="Tree counts to try")
+    parser.add_argument("--selection", nargs="+", choices=SELECTION_METHODS, default=list(SELECTION_METHODS))
+    parser.add_argument("--requests", type=Path, default=None, help="JSON lines file of request payloads")
+    parser.add_argument("--rows", type=int, default=4000, help="Requests sampled when --requests is not given")
+    parser.add_argument("--batch-size", type=int, default=256, help="Rows per call for the batch latency")
+    parser.add_argument("--no-prune", action="store_true", help="Keep all nodes")
+    parser.add_argument("--no-float32", action="store_true", help="Keep float64 thresholds and values")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", type=Path, default=None, help="Also write the report as JSON")
+    parser.add_argument("--save", type=parse_variant, default=None, metavar="K:METHOD", help="Variant to save")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Directory for the saved variant (default: <source>_<k><method> next to the source)"
+    )
+    args = parser.parse_args()
+
+    print(f"Loading {args.source}...")
+    forest = FlatForest.from_model(joblib.load(args.source))
+    encoder = FeatureEncoder.compile(EXPECTED_FEATURES)
+    constant_features = None if args.no_prune else encoder.constant_features()
+
+    requests = read_requests(args.requests) if args.requests else sample_requests(args.rows, args.seed)
+    X = encoder.encode_many(requests)
+    X_select, X_eval = X[::2], X[1::2]
+    per_tree = forest.predict_per_tree(X_select)
+    reference = forest.predict(X_eval)
+    print(f"Full model: {forest.n_trees} trees, {forest.n_nodes} nodes; {len(X_eval)} evaluation rows")
+
+    results = [evaluate("full", forest, X_eval, reference, args.batch_size)]
+    all_trees = list(range(forest.n_trees))
+    results.append(evaluate(
+        "full compacted", compact(forest, all_trees, constant_features, not args.no_float32),
+        X_eval, reference, args.batch_size
+    ))
+    for k in sorted(set(k for k in args.trees if k < forest.n_trees)):
+        for method in args.selection:
+            variant = compact(forest, select_trees(per_tree, k, method), constant_features, not args.no_float32)
+            results.append(evaluate(f"{k} {method}", variant, X_eval, reference, args.batch_size))
+
+    print_report(results)
+    if args.report:
+        args.report.write_text(json.dumps(results, indent=2))
+        print(f"Wrote {args.report}")
+
+    if args.save:
+        k, method = args.save
+        trees = select_trees(per_tree, min(k, forest.n_trees), method)
+        variant = compact(forest, trees, constant_features, not args.no_float32)
+        output = args.output or args.source.with_name(f"{args.source.stem}_{len(trees)}{method}")
+        summary = evaluate("saved", variant, X_eval, reference, args.batch_size)
+        variant.save(output, metadata={
+            "source": str(args.source),
+            "selection": method,
+            "trees": trees,
+            "pruned": constant_features is not None,
+            "float32": not args.no_float32,
+            "mae": summary["mae"],
+            "max_error": summary["max_error"]
+        })
+        print(f"Saved {len(trees)}-tree variant to {output} ({variant.nbytes / (1024 * 1024):.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
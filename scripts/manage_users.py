@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Manage the users of the API's user store
+
+Passwords are hashed with bcrypt before they are stored. With the default
+in-memory store changes only last for this process, so set USER_STORE=sqlite
+(and optionally USER_DB_PATH) to manage the persisted users.
+
+Usage:
+    USER_STORE=sqlite python scripts/manage_users.py add alice
+    USER_STORE=sqlite python scripts/manage_users.py deactivate alice
+"""
+
+import argparse
+import getpass
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import USER_STORE
+from models.models import User
+from services.auth_service import AuthService, user_store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the users of the API's user store")
+    parser.add_argument("action", choices=("add", "deactivate", "activate"), help="What to do")
+    parser.add_argument("username", help="User to change")
+    args = parser.parse_args()
+
+    if USER_STORE != "sqlite":
+        print("Warning: USER_STORE is not 'sqlite', changes will not be persisted", file=sys.stderr)
+
+    if args.action == "add":
+        password = getpass.getpass(f"Password for {args.username}: ")
+        if password != getpass.getpass("Repeat password: "):
+            sys.exit("Passwords do not match")
+        user_store.add_user(User(username=args.username, hashed_password=AuthService.get_password_hash(password)))
+        print(f"User {args.username} saved")
+    elif not user_store.set_active(args.username, args.action == "activate"):
+        sys.exit(f"Unknown user {args.username}")
+    else:
+        print(f"User {args.username} {args.action}d")
+    user_store.close()
+
+
+if __name__ == "__main__":
+    main()
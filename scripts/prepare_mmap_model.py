@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Re-save a trained model uncompressed so it can be memory-mapped on load
+
+Usage:
+    python scripts/prepare_mmap_model.py [--source PATH] [--output PATH]
+
+Then start the API with MODEL_PATH pointing at the output file (or overwrite
+the original) and MODEL_MMAP_MODE=r. sklearn copies each tree's node arrays
+when a forest is unpickled, so this does not keep the model out of the heap or
+share it between workers; a compacted model directory (scripts/compact_model.py)
+does.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import MODEL_PATH
+
+
+def time_load(path: Path, mmap_mode=None) -> float:
+    """Return the seconds taken to load a model file"""
+    start = time.perf_counter()
+    joblib.load(path, mmap_mode=mmap_mode)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", type=Path, default=MODEL_PATH, help="Model file to convert")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Destination file (default: <source>.mmap.joblib next to the source)"
+    )
+    args = parser.parse_args()
+
+    output = args.output or args.source.with_suffix(".mmap.joblib")
+
+    print(f"Loading {args.source}...")
+    model = joblib.load(args.source)
+
+    print(f"Saving uncompressed copy to {output}...")
+    joblib.dump(model, output, compress=0)
+
+    print(f"Source size:  {args.source.stat().st_size / (1024 * 1024):.1f} MB")
+    print(f"Output size:  {output.stat().st_size / (1024 * 1024):.1f} MB")
+    print(f"Load time (source):           {time_load(args.source):.3f}s")
+    print(f"Load time (output, no mmap):  {time_load(output):.3f}s")
+    print(f"Load time (output, mmap 'r'): {time_load(output, mmap_mode='r'):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,72 +2,206 @@
 Authentication service for the Rental Price Prediction API
 """
 
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Dict, Optional, Tuple
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models.models import User, LoginRequest
+from core.config import (
+    ADMIN_USERS, TOKEN_CACHE_SIZE, USER_STORE, USER_DB_PATH, USER_DB_POOL_SIZE, USER_INDEX_TTL_SECONDS,
+    PASSWORD_HASH_WORKERS, PASSWORD_VERIFY_MAX_PER_USER, PASSWORD_VERIFY_MAX_PENDING
+)
+from core.metrics import mark, register_cache_metrics, stage_timer
+from services.token_cache import TokenCache
+from services.user_store import UserStore, create_user_store
 
 # Configuration
 SECRET_KEY = "your-secret-key-change-this-in-production"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Security scheme
 security = HTTPBearer()
 
-# Hardcoded user for now (ready for database implementation)
-# Using a simple approach to avoid bcrypt initialization issues
+# Verified tokens, so repeat calls with the same token skip JWT verification
+token_cache = TokenCache(max_size=TOKEN_CACHE_SIZE)
+
+# Default users, seeded into an empty user store
 HARDCODED_USERS = {
     "fiap": User(
         username="fiap",
-        hashed_password="fiap123",  # Simple password for now - will be properly hashed in production
+        hashed_password="$2b$12$6DyItscjgSBrqwvv5ewP/OKS2OmU92GGA49m9fbycMRzEZb/CZNt.",  # bcrypt of "fiap123"
         is_active=True
     )
 }
 
+# Where users are looked up
+user_store: UserStore = create_user_store(
+    USER_STORE, USER_DB_PATH, USER_DB_POOL_SIZE, HARDCODED_USERS, USER_INDEX_TTL_SECONDS
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_password_context():
+    """
+    Password hashing context, created on first use.
+    
+    passlib and python-jose are imported lazily, so importing this module
+    (and the app) stays fast; load_auth_backends() imports both up front.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def load_auth_backends() -> None:
+    """Import the JWT and password hashing libraries, e.g. on startup before the first request"""
+    import jose.jwt  # noqa: F401
+    get_password_context()
+
+
+class VerifierBusyError(RuntimeError):
+    """Raised when too many password verifications are already pending"""
+
+
+class PasswordVerifier:
+    """
+    Verify passwords off the event loop.
+    
+    bcrypt takes tens to hundreds of milliseconds of CPU per verification, so
+    it runs on a dedicated thread pool (bcrypt releases the GIL) and logins
+    never stall prediction traffic. At most max_per_user verifications of the
+    same username run at once; further attempts wait their turn, which also
+    slows down password guessing against a single account. At most
+    max_pending verifications wait or run overall, so a flood of logins for
+    many usernames is shed instead of queueing unbounded bcrypt work.
+    """
+    
+    def __init__(self, workers: int = 2, max_per_user: int = 2, max_pending: Optional[int] = None):
+        self.workers = max(workers, 1)
+        self.max_per_user = max(max_per_user, 1)
+        self.max_pending = max(max_pending or 16 * self.workers, 1)
+        self.pending = 0
+        self.rejected = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per username: limiter and number of callers holding or awaiting it
+        self._limits: Dict[str, Tuple[asyncio.Semaphore, int]] = {}
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._pool
+    
+    def _acquire_limit(self, username: str) -> asyncio.Semaphore:
+        """Register a caller for a username and return its limiter"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._limits = {}
+        semaphore, callers = self._limits.get(username, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_user)
+        self._limits[username] = (semaphore, callers + 1)
+        return semaphore
+    
+    def _release_limit(self, username: str) -> None:
+        """Unregister a caller, dropping the limiter once nobody uses it"""
+        semaphore, callers = self._limits[username]
+        if callers == 1:
+            del self._limits[username]
+        else:
+            self._limits[username] = (semaphore, callers - 1)
+    
+    async def verify(self, username: str, plain_password: str, hashed_password: Optional[str]) -> bool:
+        """
+        Verify a password against its hash on the worker pool.
+        
+        Args:
+            username: User the password belongs to, for the concurrency limit
+            plain_password: Password as sent by the client
+            hashed_password: Stored hash, or None for unknown users; a dummy
+                verification then takes about as long as a real one
+        
+        Returns:
+            True if the password matches
+        
+        Raises:
+            VerifierBusyError: If max_pending verifications are already pending
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise VerifierBusyError("Too many logins in progress, please retry later")
+        self.pending += 1
+        semaphore = self._acquire_limit(username)
+        try:
+            async with semaphore:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._get_pool(), AuthService.verify_password, plain_password, hashed_password
+                )
+        finally:
+            self._release_limit(username)
+            self.pending -= 1
+    
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+password_verifier = PasswordVerifier(PASSWORD_HASH_WORKERS, PASSWORD_VERIFY_MAX_PER_USER, PASSWORD_VERIFY_MAX_PENDING)
+
 
 class AuthService:
     """Authentication service class"""
     
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+    def verify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
+        """Verify a password against its hash (None or an invalid hash never matches)"""
+        if hashed_password is None:
+            get_password_context().dummy_verify()
+            return False
+        try:
+            return get_password_context().verify(plain_password, hashed_password)
+        except ValueError:
+            return False
     
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        return get_password_context().hash(password)
     
     @staticmethod
     def get_user(username: str) -> Optional[User]:
-        """
-        Get user by username
-        
-        TODO: Replace with database query when implementing database storage
-        """
-        return HARDCODED_USERS.get(username)
+        """Get user by username"""
+        return user_store.get_user(username)
     
     @staticmethod
     def authenticate_user(username: str, password: str) -> Optional[User]:
         """Authenticate a user with username and password"""
         user = AuthService.get_user(username)
-        if not user:
+        if not AuthService.verify_password(password, user.hashed_password if user else None):
             return None
-        # Simple password comparison for now (in production, use proper hashing)
-        if password != user.hashed_password:
+        return user
+    
+    @staticmethod
+    async def authenticate_user_async(username: str, password: str) -> Optional[User]:
+        """Authenticate a user without blocking the event loop on password hashing"""
+        user = AuthService.get_user(username)
+        hashed_password = user.hashed_password if user else None
+        if not await password_verifier.verify(username, password, hashed_password):
             return None
         return user
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         """Create a JWT access token"""
+        from jose import jwt
+        
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + expires_delta
@@ -78,16 +212,72 @@ class AuthService:
         return encoded_jwt
     
     @staticmethod
-    def verify_token(token: str) -> Optional[str]:
-        """Verify and decode a JWT token"""
+    def decode_token(token: str) -> Optional[dict]:
+        """Verify a JWT token and return its claims"""
+        from jose import JWTError, jwt
+        
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
-                return None
-            return username
+            with stage_timer("jwt_decode"):
+                return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         except JWTError:
             return None
+    
+    @staticmethod
+    def verify_token(token: str) -> Optional[str]:
+        """Verify and decode a JWT token"""
+        payload = AuthService.decode_token(token)
+        if payload is None:
+            return None
+        username: str = payload.get("sub")
+        if username is None:
+            return None
+        return username
+    
+    @staticmethod
+    def resolve_token(token: str) -> Optional[User]:
+        """
+        Get the user a JWT token was issued to
+        
+        Tokens are verified once and then served from the token cache until
+        their expiry, skipping signature verification. The user is still
+        looked up on every call (an in-memory index hit), so deactivations
+        and deleted users apply to cached tokens too, including changes made
+        by another process such as scripts/manage_users.py.
+        """
+        cached = token_cache.get(token)
+        if cached is not None:
+            with stage_timer("user_lookup"):
+                user = AuthService.get_user(cached.username)
+            if user is None:
+                token_cache.invalidate_user(cached.username)
+            return user
+        
+        payload = AuthService.decode_token(token)
+        if payload is None or payload.get("sub") is None:
+            return None
+        
+        with stage_timer("user_lookup"):
+            user = AuthService.get_user(payload["sub"])
+        if user is None:
+            return None
+        
+        # Tokens without an expiry are verified on every call
+        if payload.get("exp") is not None:
+            token_cache.set(token, user, float(payload["exp"]))
+        return user
+    
+    @staticmethod
+    def deactivate_user(username: str) -> bool:
+        """
+        Deactivate a user and revoke the cached verification of their tokens
+        
+        Returns:
+            True if the user exists, False otherwise
+        """
+        if not user_store.set_active(username, False):
+            return False
+        token_cache.invalidate_user(username)
+        return True
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
@@ -98,11 +288,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    username = AuthService.verify_token(credentials.credentials)
-    if username is None:
-        raise credentials_exception
-    
-    user = AuthService.get_user(username)
+    user = AuthService.resolve_token(credentials.credentials)
     if user is None:
         raise credentials_exception
     
@@ -113,8 +299,20 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     """Get the current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    mark("auth_end")
+    return current_user
+
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    """Get the current user, who must be listed in ADMIN_USERS"""
+    if current_user.username not in ADMIN_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator privileges required"
+        )
     return current_user
 
 
 # Create auth service instance
 auth_service = AuthService()
+register_cache_metrics("token_cache", token_cache, "Verified token cache")
@@ -0,0 +1,298 @@
+"""
+Batch validation and streaming bulk scoring for rental price prediction
+"""
+
+import csv
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from models.models import RentalPredictionRequest
+
+# Supported streaming formats and their media types
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Header of CSV streaming output
+CSV_OUTPUT_COLUMNS = ["index", "predicted_price", "errors"]
+
+
+def validate_records(
+    items: List[Any]
+) -> Tuple[List[int], List[Dict[str, Any]], Dict[int, List[Dict[str, Any]]]]:
+    """
+    Validate items one by one so a bad item does not reject the whole batch.
+
+    Args:
+        items: Raw request items
+
+    Returns:
+        Tuple of (valid item indices, validated item data, errors by item index)
+    """
+    valid_indices: List[int] = []
+    valid_records: List[Dict[str, Any]] = []
+    errors: Dict[int, List[Dict[str, Any]]] = {}
+
+    for index, item in enumerate(items):
+        try:
+            valid_records.append(RentalPredictionRequest.model_validate(item).model_dump())
+            valid_indices.append(index)
+        except ValidationError as e:
+            errors[index] = [
+                {"loc": list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+                for error in e.errors()
+            ]
+
+    return valid_indices, valid_records, errors
+
+
+def stream_format(content_type: Optional[str]) -> Optional[str]:
+    """
+    Map a request content type to a streaming format.
+
+    Returns:
+        "ndjson", "csv", or None if the content type is not supported
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-seq"):
+        return "ndjson"
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+
+class ParseFailure:
+    """Placeholder for a streamed row that could not be parsed"""
+
+    def __init__(self, msg: str, error_type: str):
+        self.errors = [{"loc": [], "msg": msg, "type": error_type}]
+
+
+def decode_line(line: bytes) -> Union[str, ParseFailure]:
+    """Decode one input line, or return a ParseFailure if it is not valid UTF-8"""
+    try:
+        return line.rstrip(b"\r").decode("utf-8")
+    except UnicodeDecodeError as e:
+        return ParseFailure(f"Invalid UTF-8: {str(e)}", "utf8_invalid")
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int
+) -> AsyncIterator[Union[str, ParseFailure]]:
+    """
+    Split a byte stream into decoded lines without buffering the whole body.
+
+    Lines that are not valid UTF-8 or longer than max_line_bytes are yielded
+    as a ParseFailure, so the rest of the stream is still scored. The bytes
+    of an over-long line are discarded as they arrive.
+
+    Args:
+        chunks: Body chunks as they arrive
+        max_line_bytes: Longest accepted line, bounding the buffer size
+    """
+    too_long = f"Line exceeds the maximum of {max_line_bytes} bytes"
+    buffer = b""
+    # Inside an over-long line: discard bytes up to its end
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping or len(line) > max_line_bytes:
+                skipping = False
+                yield ParseFailure(too_long, "line_too_long")
+            else:
+                yield decode_line(line)
+        if len(buffer) > max_line_bytes:
+            skipping = True
+            buffer = b""
+    if skipping:
+        yield ParseFailure(too_long, "line_too_long")
+    elif buffer:
+        yield decode_line(buffer)
+
+
+async def iter_records(lines: AsyncIterator[Union[str, ParseFailure]], fmt: str) -> AsyncIterator[Any]:
+    """
+    Parse NDJSON or CSV lines into records.
+
+    Yields the decoded value of each data row, or a ParseFailure for rows
+    that cannot be read or parsed. Blank lines are skipped; for CSV the
+    first line is the header.
+    """
+    header: Optional[List[str]] = None
+    async for line in lines:
+        if isinstance(line, ParseFailure):
+            yield line
+            continue
+        if not line.strip():
+            continue
+
+        if fmt == "ndjson":
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield ParseFailure(f"Invalid JSON: {str(e)}", "json_invalid")
+            continue
+
+        row = next(csv.reader([line]))
+        if header is None:
+            header = [column.strip() for column in row]
+        elif len(row) != len(header):
+            yield ParseFailure(
+                f"Expected {len(header)} columns, got {len(row)}", "csv_column_count"
+            )
+        else:
+            yield dict(zip(header, row))
+
+
+def split_chunk(
+    records: List[Any]
+) -> Tuple[List[int], List[Dict[str, Any]], Dict[int, List[Dict[str, Any]]]]:
+    """
+    Separate the valid records of a chunk from unparseable and invalid ones.
+
+    Args:
+        records: Parsed records, or ParseFailure for unparseable rows
+
+    Returns:
+        Tuple of (positions of valid records, validated record data, errors by position)
+    """
+    parse_errors = {
+        i: record.errors for i, record in enumerate(records) if isinstance(record, ParseFailure)
+    }
+    parsed = [record for record in records if not isinstance(record, ParseFailure)]
+    parsed_positions = [i for i in range(len(records)) if i not in parse_errors]
+
+    valid_indices, valid_records, errors = validate_records(parsed)
+
+    errors = {parsed_positions[i]: item_errors for i, item_errors in errors.items()}
+    errors.update(parse_errors)
+    return [parsed_positions[i] for i in valid_indices], valid_records, errors
+
+
+def build_results(
+    n_records: int,
+    start_index: int,
+    valid_positions: List[int],
+    predicted_prices: List[float],
+    errors: Dict[int, List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Assemble the result rows of a chunk in input order"""
+    prices = dict(zip(valid_positions, predicted_prices))
+    return [
+        {
+            "index": start_index + position,
+            "predicted_price": prices.get(position),
+            "errors": errors.get(position)
+        }
+        for position in range(n_records)
+    ]
+
+
+def score_chunk_sync(
+    records: List[Any],
+    start_index: int,
+    predict_batch: Callable[[List[Dict[str, Any]]], List[float]]
+) -> List[Dict[str, Any]]:
+    """
+    Validate and score one chunk of parsed records with a single model call.
+
+    Args:
+        records: Parsed records, or ParseFailure for unparseable rows
+        start_index: Row number of the first record in the input
+        predict_batch: Batch prediction function
+
+    Returns:
+        Result rows in input order
+    """
+    valid_positions, valid_records, errors = split_chunk(records)
+    predicted_prices = predict_batch(valid_records)
+    return build_results(len(records), start_index, valid_positions, predicted_prices, errors)
+
+
+async def score_chunk(
+    records: List[Any],
+    start_index: int,
+    predict_batch: Callable[[List[Dict[str, Any]]], Awaitable[List[float]]]
+) -> List[Dict[str, Any]]:
+    """
+    Validate and score one chunk of parsed records with a single async model call.
+
+    Args:
+        records: Parsed records, or ParseFailure for unparseable rows
+        start_index: Row number of the first record in the stream
+        predict_batch: Async batch prediction function
+
+    Returns:
+        Result rows in input order
+    """
+    valid_positions, valid_records, errors = split_chunk(records)
+    predicted_prices = await predict_batch(valid_records)
+    return build_results(len(records), start_index, valid_positions, predicted_prices, errors)
+
+
+def format_result(result: Dict[str, Any], fmt: str) -> str:
+    """Serialize one result row as an NDJSON or CSV line"""
+    if fmt == "ndjson":
+        return json.dumps(result) + "\n"
+
+    errors = result["errors"]
+    price = result["predicted_price"]
+    return ",".join([
+        str(result["index"]),
+        "" if price is None else repr(price),
+        "" if not errors else '"' + "; ".join(e["msg"] for e in errors).replace('"', '""') + '"'
+    ]) + "\n"
+
+
+async def stream_predictions(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    predict_batch: Callable[[List[Dict[str, Any]]], Awaitable[List[float]]],
+    chunk_size: int,
+    max_line_bytes: int
+) -> AsyncIterator[str]:
+    """
+    Score an NDJSON or CSV body chunk by chunk, yielding one output line per row.
+
+    At most chunk_size rows are held in memory at a time, whatever the size
+    of the input.
+    """
+    if fmt == "csv":
+        yield ",".join(CSV_OUTPUT_COLUMNS) + "\n"
+
+    pending: List[Any] = []
+    next_index = 0
+    async for record in iter_records(iter_lines(chunks, max_line_bytes), fmt):
+        pending.append(record)
+        if len(pending) >= chunk_size:
+            for result in await score_chunk(pending, next_index, predict_batch):
+                yield format_result(result, fmt)
+            next_index += len(pending)
+            pending = []
+
+    if pending:
+        for result in await score_chunk(pending, next_index, predict_batch):
+            yield format_result(result, fmt)
+
+
+class RequestBodyStreamingResponse(StreamingResponse):
+    """
+    Streaming response whose content is produced while the request body is read.
+
+    StreamingResponse listens for client disconnects by calling receive(),
+    which would consume request body messages the content generator still
+    needs. This response only streams, leaving receive() to the generator.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,227 @@
+"""
+Comparable listings service
+
+Finds the reference listings most similar to a property by location, size
+and number of bedrooms. The reference listings are a structured numpy array
+stored in a .npy file (see scripts/build_reference_listings.py), which is
+memory-mapped on load; only the KD-tree over the search features is built
+in memory.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.config import (
+    REFERENCE_LISTINGS_PATH, REFERENCE_LISTINGS_MMAP_MODE,
+    COMPARABLES_SIZE_SCALE_M2, COMPARABLES_BEDROOM_KM
+)
+from core.gazetteer import KM_PER_DEGREE
+from core.metrics import stage_timer
+
+# Record layout of the reference listings file
+LISTING_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("longitude", "<f8"),
+    ("latitude", "<f8"),
+    ("size", "<f8"),
+    ("bedrooms", "<i2"),
+    ("bathrooms", "<i2"),
+    ("price", "<f8"),
+])
+
+# Listing fields returned for each comparable, followed by its distance
+COMPARABLE_FIELDS = ("id", "longitude", "latitude", "size", "bedrooms", "bathrooms", "price")
+COMPARABLE_KEYS = COMPARABLE_FIELDS + ("distance",)
+
+
+def build_listings(
+    longitude: Any,
+    latitude: Any,
+    size: Any,
+    bedrooms: Any,
+    bathrooms: Any,
+    price: Any,
+    ids: Optional[Any] = None
+) -> np.ndarray:
+    """
+    Pack listing columns into the reference listings record layout.
+
+    Args:
+        longitude, latitude, size, bedrooms, bathrooms, price: Equal-length columns
+        ids: Listing identifiers; defaults to the row number
+
+    Returns:
+        Structured array with LISTING_DTYPE
+    """
+    listings = np.zeros(len(longitude), dtype=LISTING_DTYPE)
+    listings["id"] = np.arange(len(longitude)) if ids is None else ids
+    listings["longitude"] = longitude
+    listings["latitude"] = latitude
+    listings["size"] = size
+    listings["bedrooms"] = bedrooms
+    listings["bathrooms"] = bathrooms
+    listings["price"] = price
+    return listings
+
+
+class ComparablesIndex:
+    """
+    KD-tree over reference listings.
+
+    Listings are compared in a four-dimensional space measured in kilometres:
+    position (longitude scaled by the cosine of the latitude, so east-west and
+    north-south distances are comparable), size divided by size_scale_m2 and
+    bedrooms multiplied by bedroom_km. With the defaults, 50 m² of size
+    difference or one bedroom weighs as much as 1 km of distance.
+    """
+
+    def __init__(
+        self,
+        listings: np.ndarray,
+        size_scale_m2: float = COMPARABLES_SIZE_SCALE_M2,
+        bedroom_km: float = COMPARABLES_BEDROOM_KM,
+        leaf_size: int = 40
+    ):
+        from sklearn.neighbors import KDTree
+
+        missing = set(LISTING_DTYPE.names) - set(listings.dtype.names or ())
+        if missing:
+            raise ValueError(f"Reference listings are missing the fields {sorted(missing)}")
+        if len(listings) == 0:
+            raise ValueError("Reference listings are empty")
+
+        self.listings = listings
+        self.size_scale_m2 = size_scale_m2
+        self.bedroom_km = bedroom_km
+        self.tree = KDTree(
+            self.features(listings["longitude"], listings["latitude"], listings["size"], listings["bedrooms"]),
+            leaf_size=leaf_size
+        )
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: Optional[str] = "r", **kwargs: Any) -> "ComparablesIndex":
+        """
+        Load reference listings from a .npy file and index them.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If the file does not hold reference listings
+        """
+        if not path.exists():
+            raise FileNotFoundError(f"Reference listings not found at {path}")
+        return cls(np.load(path, mmap_mode=mmap_mode), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def features(self, longitude: Any, latitude: Any, size: Any, bedrooms: Any) -> np.ndarray:
+        """Search-space coordinates of properties, one row each"""
+        latitude = np.asarray(latitude, dtype=np.float64)
+        return np.column_stack((
+            np.asarray(longitude, dtype=np.float64) * np.cos(np.radians(latitude)) * KM_PER_DEGREE,
+            latitude * KM_PER_DEGREE,
+            np.asarray(size, dtype=np.float64) / self.size_scale_m2,
+            np.asarray(bedrooms, dtype=np.float64) * self.bedroom_km,
+        ))
+
+    def query(self, records: List[Dict[str, Any]], k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Find the k most similar listings for each property with one tree query.
+
+        Args:
+            records: Validated request data with longitude, latitude, size and bedrooms
+            k: Number of listings per property (capped at the number of listings)
+
+        Returns:
+            For each property, its comparables ordered by increasing distance
+        """
+        if not records:
+            return []
+
+        features = self.features(
+            [record["longitude"] for record in records],
+            [record["latitude"] for record in records],
+            [record["size"] for record in records],
+            [record["bedrooms"] for record in records],
+        )
+        distances, indices = self.tree.query(features, k=min(k, len(self.listings)))
+
+        # Gather the selected listings field by field, in one pass for the whole batch
+        selected = self.listings[indices]
+        fields = [selected[name].tolist() for name in COMPARABLE_FIELDS]
+        return [
+            [dict(zip(COMPARABLE_KEYS, values)) for values in zip(*(field[row] for field in fields), row_distances)]
+            for row, row_distances in enumerate(distances.tolist())
+        ]
+
+
+class ComparablesService:
+    """Serves comparable listings from the configured reference dataset"""
+
+    def __init__(self):
+        self.index: Optional[ComparablesIndex] = None
+        self.load_stats: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.index is not None
+
+    def load(
+        self,
+        path: Path = REFERENCE_LISTINGS_PATH,
+        mmap_mode: Optional[str] = REFERENCE_LISTINGS_MMAP_MODE
+    ) -> bool:
+        """
+        Load and index the reference listings.
+
+        Returns:
+            True if the listings were loaded, False otherwise
+        """
+        start = time.perf_counter()
+        try:
+            index = ComparablesIndex.load(path, mmap_mode)
+        except FileNotFoundError as e:
+            print(f"Comparable listings disabled: {str(e)}")
+            return False
+        except Exception as e:
+            print(f"Error loading reference listings: {str(e)}")
+            return False
+
+        self.index = index
+        self.load_stats = {
+            "path": str(path),
+            "listings": len(index),
+            "mmap_mode": mmap_mode,
+            "load_seconds": time.perf_counter() - start
+        }
+        print(f"Reference listings loaded: {len(index)} listings in {self.load_stats['load_seconds']:.3f}s")
+        return True
+
+    def find(self, records: List[Dict[str, Any]], k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Find the k most similar reference listings for each property.
+
+        Raises:
+            RuntimeError: If no reference listings are loaded
+        """
+        index = self.index
+        if index is None:
+            raise RuntimeError("Reference listings not loaded")
+        with stage_timer("comparables"):
+            return index.query(records, k)
+
+    async def find_async(self, records: List[Dict[str, Any]], k: int) -> List[List[Dict[str, Any]]]:
+        """Find comparables for a batch on a worker thread, keeping the event loop free"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.find, records, k)
+
+    def get_stats(self) -> Optional[Dict[str, Any]]:
+        """Return the reference listings load statistics, or None if not loaded"""
+        return self.load_stats
+
+
+# Global comparables service instance
+comparables_service = ComparablesService()
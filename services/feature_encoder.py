@@ -0,0 +1,140 @@
+"""
+Compiled feature encoder for rental price prediction
+"""
+
+import numpy as np
+from typing import Dict, Any, List, Sequence
+
+from core.config import (
+    EXPECTED_FEATURES, DEFAULT_VALUES,
+    CATEGORICAL_COLUMNS, ORIGINAL_TRAINING_COLUMNS
+)
+
+# Request fields feeding numeric training columns (request field -> training column)
+NUMERIC_REQUEST_FIELDS = {
+    'longitude': 'longitude',
+    'latitude': 'latitude',
+    'bedrooms': 'total_rooms',
+    'bathrooms': 'total_bathrooms',
+    'size': 'size',
+    'allow_pets': 'allow_pets',
+    'allow_smoking': 'allow_smoking',
+    'furnished': 'furnished',
+    'count_private_parking': 'count_private_parking',
+}
+
+# Request fields feeding categorical training columns (request field -> training column)
+CATEGORICAL_REQUEST_FIELDS = {
+    'city': 'city',
+    'state': 'state',
+    'building_type': 'building_type_txt_id',
+    'lease_type': 'lease_type',
+    'rental_type': 'rental_type',
+}
+
+
+class FeatureEncoder:
+    """
+    Encode request data straight into the model feature vector.
+
+    The layout mirrors the pandas preprocessing path in MLService: numeric
+    columns keep their training order, followed by one dummy column per
+    categorical column and zero padding up to the expected feature count.
+    A single-row one-hot encoding always yields a 1 for the present category,
+    so every feature except the numeric request fields is constant and lives
+    in a precomputed template.
+    """
+
+    def __init__(self, n_features: int, template: np.ndarray, slots: Dict[str, int]):
+        self.n_features = n_features
+        self._template = template
+        self._slots = slots
+        self._slot_items = tuple(slots.items())
+
+    @classmethod
+    def compile(cls, n_features: int = EXPECTED_FEATURES) -> "FeatureEncoder":
+        """
+        Build the feature layout from the training column configuration.
+
+        Args:
+            n_features: Number of features expected by the model
+
+        Returns:
+            Compiled encoder
+        """
+        numeric_sources = {column: field for field, column in NUMERIC_REQUEST_FIELDS.items()}
+        categorical_sources = set(CATEGORICAL_REQUEST_FIELDS.values())
+
+        # Numeric columns first, in training order, then one dummy per categorical column
+        layout: List[Any] = []
+        for column in ORIGINAL_TRAINING_COLUMNS:
+            if column in CATEGORICAL_COLUMNS:
+                continue
+            if column in numeric_sources:
+                layout.append(('field', numeric_sources[column]))
+            else:
+                value = DEFAULT_VALUES.get(column)
+                layout.append(('constant', 0.0 if value is None else float(value)))
+
+        for column in CATEGORICAL_COLUMNS:
+            if column not in ORIGINAL_TRAINING_COLUMNS:
+                continue
+            # Missing categories produce no dummy column at all
+            if column in categorical_sources or DEFAULT_VALUES.get(column) is not None:
+                layout.append(('constant', 1.0))
+
+        template = np.zeros(n_features, dtype=np.float64)
+        slots: Dict[str, int] = {}
+        for index, (kind, value) in enumerate(layout[:n_features]):
+            if kind == 'field':
+                slots[value] = index
+            else:
+                template[index] = value
+
+        return cls(n_features, template, slots)
+
+    def encode(self, request_data: Dict[str, Any]) -> np.ndarray:
+        """
+        Encode a single request.
+
+        Args:
+            request_data: Input data from API request
+
+        Returns:
+            Feature matrix with shape (1, n_features)
+        """
+        vector = self._template.copy()
+        for field, index in self._slot_items:
+            vector[index] = float(request_data[field])
+        return vector.reshape(1, -1)
+
+    def encode_many(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """
+        Encode several requests into one feature matrix.
+
+        Args:
+            records: Input data from API requests
+
+        Returns:
+            Feature matrix with shape (len(records), n_features)
+        """
+        matrix = np.tile(self._template, (len(records), 1))
+        for field, index in self._slot_items:
+            matrix[:, index] = np.fromiter(
+                (float(record[field]) for record in records),
+                dtype=np.float64,
+                count=len(records)
+            )
+        return matrix
+
+    def constant_features(self) -> Dict[int, float]:
+        """
+        Features that have the same value for every request.
+
+        Returns:
+            Feature index -> value, for every feature not fed by a request field
+        """
+        fields = set(self._slots.values())
+        return {
+            index: float(value) for index, value in enumerate(self._template) if index not in fields
+        }
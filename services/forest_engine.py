@@ -0,0 +1,459 @@
+"""
+Flat array-based inference engine for random forest regressors
+"""
+
+import json
+import time
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Rows evaluated together; bounds the (n_trees, n_rows) node index matrix
+ROW_CHUNK_SIZE = 4096
+
+# Trees evaluated before checking a deadline for the first time
+ANYTIME_FIRST_BLOCK = 8
+
+# Node arrays of a saved forest, one .npy file each, next to forest.json
+FOREST_ARRAYS = ("feature", "threshold", "children_left", "children_right", "value", "roots")
+FOREST_METADATA_FILE = "forest.json"
+
+# One tree as (feature, threshold, children_left, children_right, value), with
+# child indices local to the tree and the root as its first node
+TreeArrays = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+class FlatForest:
+    """
+    Random forest packed into contiguous node arrays.
+
+    The nodes of all trees are concatenated into one set of arrays (split
+    feature, threshold, left and right child, leaf value), with child indices
+    rebased to global positions and each tree starting at roots[t]. Leaves
+    point to themselves, so every tree can be walked for every row in lockstep
+    with a fixed number of vectorized steps.
+
+    Inputs are compared as float32 against float64 thresholds and per-tree
+    outputs are summed in estimator order, exactly like scikit-learn, so the
+    predictions match model.predict.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children_left: np.ndarray,
+        children_right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+
+    @property
+    def n_trees(self) -> int:
+        """Number of trees in the forest"""
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        """Total number of nodes over all trees"""
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the node arrays"""
+        return sum(
+            array.nbytes for array in (
+                self.feature, self.threshold, self.children_left,
+                self.children_right, self.value, self.roots
+            )
+        )
+
+    @classmethod
+    def from_model(cls, model: Any) -> "FlatForest":
+        """
+        Pack a fitted scikit-learn forest regressor.
+
+        Args:
+            model: Fitted RandomForestRegressor or ExtraTreesRegressor
+
+        Returns:
+            Packed forest
+
+        Raises:
+            ValueError: If the model is not a supported single-output forest regressor
+        """
+        from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+
+        if not isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+            raise ValueError(f"Unsupported model type {type(model).__name__} for the flat engine")
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("The flat engine only supports single-output forests")
+
+        trees = []
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+            trees.append((
+                np.where(is_leaf, 0, tree.feature).astype(np.intp),
+                np.where(is_leaf, np.inf, tree.threshold).astype(np.float64),
+                np.where(is_leaf, node_ids, tree.children_left).astype(np.intp),
+                np.where(is_leaf, node_ids, tree.children_right).astype(np.intp),
+                tree.value[:, 0, 0].astype(np.float64)
+            ))
+
+        return cls._concatenate(trees, model.n_features_in_)
+
+    @classmethod
+    def _concatenate(cls, trees: List[TreeArrays], n_features: int) -> "FlatForest":
+        """Pack trees with tree-local child indices into one forest"""
+        columns: List[List[np.ndarray]] = [[], [], [], [], []]
+        roots = []
+        offset = 0
+        for feature, threshold, left, right, value in trees:
+            for column, array in zip(columns, (feature, threshold, left + offset, right + offset, value)):
+                column.append(array)
+            roots.append(offset)
+            offset += len(feature)
+
+        feature, threshold, left, right, value = (np.concatenate(column) for column in columns)
+        roots = np.asarray(roots, dtype=left.dtype)
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            children_left=left,
+            children_right=right,
+            value=value,
+            roots=roots,
+            max_depth=cls._depth(left, right, roots),
+            n_features=n_features
+        )
+
+    @staticmethod
+    def _depth(children_left: np.ndarray, children_right: np.ndarray, roots: np.ndarray) -> int:
+        """Depth of the deepest tree, found by walking all trees level by level"""
+        depth = 0
+        level = roots
+        while True:
+            level = level[children_left[level] != level]
+            if level.size == 0:
+                return depth
+            level = np.concatenate((children_left[level], children_right[level]))
+            depth += 1
+
+    def _tree_arrays(self, tree: int) -> TreeArrays:
+        """Node arrays of one tree with tree-local child indices"""
+        # Trees are stored one after the other, each starting with its root
+        start = int(self.roots[tree])
+        stop = int(self.roots[tree + 1]) if tree + 1 < self.n_trees else self.n_nodes
+        return (
+            self.feature[start:stop],
+            self.threshold[start:stop],
+            self.children_left[start:stop] - start,
+            self.children_right[start:stop] - start,
+            self.value[start:stop]
+        )
+
+    def subset(self, trees: Sequence[int]) -> "FlatForest":
+        """
+        Forest made of some of the trees.
+
+        Args:
+            trees: Indices of the trees to keep, in the order to evaluate them
+
+        Returns:
+            New forest averaging only the selected trees
+        """
+        return self._concatenate([self._tree_arrays(tree) for tree in trees], self.n_features)
+
+    def prune(self, constant_features: Optional[Dict[int, float]] = None) -> "FlatForest":
+        """
+        Remove nodes that cannot change a prediction.
+
+        A split whose outcome is already decided by the splits above it (a
+        threshold outside the range of values that reach it), or by a
+        feature known to be constant, is replaced by the branch that is
+        always taken. A split whose two children are leaves with the same
+        value is replaced by that leaf. Predictions are unchanged for every
+        input that has the given constant feature values.
+
+        Args:
+            constant_features: Feature index -> value of features that are
+                constant for all inputs, e.g. the feature encoder's template
+
+        Returns:
+            New, pruned forest
+        """
+        constants = {
+            feature: np.float32(value) for feature, value in (constant_features or {}).items()
+        }
+        return self._concatenate(
+            [self._prune_tree(self._tree_arrays(tree), constants) for tree in range(self.n_trees)],
+            self.n_features
+        )
+
+    @staticmethod
+    def _prune_tree(tree: TreeArrays, constants: Dict[int, np.float32]) -> TreeArrays:
+        """Rebuild one tree without undecidable or redundant splits, children before parents"""
+        feature, threshold, left, right, value = tree
+        feature_list = feature.tolist()
+        threshold_list = threshold.tolist()
+        left_list = left.tolist()
+        right_list = right.tolist()
+        new_nodes: List[Tuple[int, float, int, int, Any]] = []
+
+        def visit(node: int, bounds: Dict[int, Tuple[float, float]]) -> int:
+            # Follow splits whose outcome is already known
+            while left_list[node] != node:
+                split_feature = feature_list[node]
+                split_threshold = threshold_list[node]
+                if split_feature in constants:
+                    node = left_list[node] if constants[split_feature] <= split_threshold else right_list[node]
+                    continue
+                low, high = bounds.get(split_feature, (-np.inf, np.inf))
+                if high <= split_threshold:
+                    node = left_list[node]
+                elif low >= split_threshold:
+                    node = right_list[node]
+                else:
+                    break
+
+            if left_list[node] == node:
+                new_nodes.append((0, np.inf, -1, -1, value[node]))
+                return len(new_nodes) - 1
+
+            split_feature = feature_list[node]
+            split_threshold = threshold_list[node]
+            low, high = bounds.get(split_feature, (-np.inf, np.inf))
+            new_left = visit(left_list[node], {**bounds, split_feature: (low, min(high, split_threshold))})
+            new_right = visit(right_list[node], {**bounds, split_feature: (max(low, split_threshold), high)})
+
+            # Two leaves with the same value: the split makes no difference
+            if (
+                new_nodes[new_left][2] == -1 and new_nodes[new_right][2] == -1
+                and new_nodes[new_left][4] == new_nodes[new_right][4]
+            ):
+                leaf_value = new_nodes[new_left][4]
+                del new_nodes[new_left:]
+                new_nodes.append((0, np.inf, -1, -1, leaf_value))
+                return len(new_nodes) - 1
+
+            new_nodes.append((split_feature, split_threshold, new_left, new_right, None))
+            return len(new_nodes) - 1
+
+        visit(0, {})
+
+        # Reverse the order so the root, built last, comes first
+        last = len(new_nodes) - 1
+        new_nodes.reverse()
+        node_ids = np.arange(len(new_nodes))
+        is_leaf = np.array([node[2] == -1 for node in new_nodes])
+        return (
+            np.array([node[0] for node in new_nodes], dtype=feature.dtype),
+            np.array([node[1] for node in new_nodes], dtype=threshold.dtype),
+            np.where(is_leaf, node_ids, [last - node[2] for node in new_nodes]).astype(left.dtype),
+            np.where(is_leaf, node_ids, [last - node[3] for node in new_nodes]).astype(right.dtype),
+            np.array([0 if node[4] is None else node[4] for node in new_nodes], dtype=value.dtype)
+        )
+
+    def to_float32(self) -> "FlatForest":
+        """
+        Copy with float32 thresholds and leaf values and 32-bit node indices.
+
+        Thresholds are rounded down to the nearest float32, which keeps every
+        split identical for the float32 inputs the engine compares, so only
+        the leaf values lose precision.
+        """
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        index_dtype = np.int32 if self.n_nodes < np.iinfo(np.int32).max else np.intp
+        return FlatForest(
+            feature=self.feature.astype(np.int16 if self.n_features <= np.iinfo(np.int16).max else np.int32),
+            threshold=threshold,
+            children_left=self.children_left.astype(index_dtype),
+            children_right=self.children_right.astype(index_dtype),
+            value=self.value.astype(np.float32),
+            roots=self.roots.astype(index_dtype),
+            max_depth=self.max_depth,
+            n_features=self.n_features
+        )
+
+    def save(self, directory: Path, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save the node arrays as uncompressed .npy files, which load() can memory-map.
+
+        Args:
+            directory: Destination directory, created if missing
+            metadata: Extra JSON-serializable information stored in forest.json
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in FOREST_ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        (directory / FOREST_METADATA_FILE).write_text(json.dumps({
+            **(metadata or {}),
+            "n_trees": self.n_trees,
+            "n_nodes": self.n_nodes,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features
+        }, indent=2))
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode: Optional[str] = None) -> "FlatForest":
+        """
+        Load a forest saved with save().
+
+        Args:
+            directory: Directory written by save()
+            mmap_mode: numpy memory-map mode ("r", "r+" or "c"), or None to read into memory
+
+        Raises:
+            FileNotFoundError: If the directory does not hold a saved forest
+        """
+        metadata_path = directory / FOREST_METADATA_FILE
+        if not metadata_path.exists():
+            raise FileNotFoundError(f"No saved forest in {directory} ({FOREST_METADATA_FILE} missing)")
+        metadata = json.loads(metadata_path.read_text())
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in FOREST_ARRAYS}
+        return cls(**arrays, max_depth=metadata["max_depth"], n_features=metadata["n_features"])
+
+    def _leaves(self, X: np.ndarray, roots: np.ndarray) -> np.ndarray:
+        """Return the leaf reached by every row in every tree, shape (n_trees, n_rows)"""
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        rows = np.arange(n_rows)
+        nodes = np.repeat(roots[:, np.newaxis], n_rows, axis=1)
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def predict_per_tree(self, X: np.ndarray, n_trees: Optional[int] = None, first_tree: int = 0) -> np.ndarray:
+        """
+        Evaluate the trees for every row.
+
+        Args:
+            X: Feature matrix with shape (n_rows, n_features)
+            n_trees: Only evaluate n_trees trees (default: all remaining)
+            first_tree: Index of the first tree to evaluate
+
+        Returns:
+            Per-tree predictions with shape (n_trees, n_rows)
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has shape {X.shape}, expected (n_rows, {self.n_features})"
+            )
+
+        stop = None if n_trees is None else first_tree + n_trees
+        roots = self.roots[first_tree:stop]
+        outputs = np.empty((len(roots), X.shape[0]), dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_CHUNK_SIZE):
+            stop = start + ROW_CHUNK_SIZE
+            outputs[:, start:stop] = self.value[self._leaves(X[start:stop], roots)]
+        return outputs
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict by averaging all trees.
+
+        Args:
+            X: Feature matrix with shape (n_rows, n_features)
+
+        Returns:
+            Predictions with shape (n_rows,)
+        """
+        return self._average(self.predict_per_tree(X))
+
+    @staticmethod
+    def _average(per_tree: np.ndarray) -> np.ndarray:
+        """Mean over trees of per-tree predictions"""
+        # Accumulate in estimator order like scikit-learn to get identical sums
+        prediction = np.zeros(per_tree.shape[1], dtype=np.float64)
+        for tree_prediction in per_tree:
+            prediction += tree_prediction
+        prediction /= len(per_tree)
+        return prediction
+
+    def predict_distribution(
+        self,
+        X: np.ndarray,
+        quantiles: Sequence[float] = ()
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Summarize the per-tree predictions of every row from one evaluation of the trees.
+
+        Args:
+            X: Feature matrix with shape (n_rows, n_features)
+            quantiles: Quantiles to compute, between 0 and 1
+
+        Returns:
+            Tuple of (mean, standard deviation, quantiles) of the per-tree
+            predictions, with shapes (n_rows,), (n_rows,) and
+            (len(quantiles), n_rows); the mean equals predict()
+        """
+        per_tree = self.predict_per_tree(X)
+        mean = self._average(per_tree)
+        deviations = per_tree - mean
+        std = np.sqrt(np.einsum("ij,ij->j", deviations, deviations) / len(per_tree))
+
+        # Linear interpolation between order statistics, as np.quantile does
+        # by default, without its per-call overhead
+        ordered = np.sort(per_tree, axis=0)
+        positions = np.asarray(quantiles, dtype=np.float64) * (len(per_tree) - 1)
+        lower = np.floor(positions).astype(np.intp)
+        upper = np.minimum(lower + 1, len(per_tree) - 1)
+        fraction = (positions - lower)[:, np.newaxis]
+        quantile_values = ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+        return mean, std, quantile_values
+
+    def predict_until(
+        self,
+        X: np.ndarray,
+        deadline: float,
+        first_block: int = ANYTIME_FIRST_BLOCK
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Average as many trees as can be evaluated before a deadline.
+
+        Trees are evaluated in order, in blocks. The first block is always
+        evaluated; after each block, the next one is at most twice as large
+        and only as large as the time measured so far per tree says fits
+        before the deadline. Per-tree cost falls as blocks grow, so the
+        estimate errs on the safe side. With enough time all trees are used
+        and the result equals predict().
+
+        Args:
+            X: Feature matrix with shape (n_rows, n_features)
+            deadline: time.perf_counter() value by which to stop
+            first_block: Number of trees in the first block
+
+        Returns:
+            Tuple of (predictions with shape (n_rows,), number of trees averaged)
+        """
+        prediction = np.zeros(np.asarray(X).shape[0], dtype=np.float64)
+        used = 0
+        block = min(first_block, self.n_trees)
+        while block > 0:
+            start = time.perf_counter()
+            for tree_prediction in self.predict_per_tree(X, n_trees=block, first_tree=used):
+                prediction += tree_prediction
+            used += block
+            now = time.perf_counter()
+            seconds_per_tree = (now - start) / block
+            block = min(2 * block, self.n_trees - used, int((deadline - now) / max(seconds_per_tree, 1e-9)))
+
+        prediction /= used
+        return prediction, used
@@ -0,0 +1,174 @@
+"""
+Bounded executor for CPU-bound inference
+"""
+
+import asyncio
+import contextvars
+import os
+import numpy as np
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from core.metrics import stage_timer
+from core.profiling import profiling_request
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+def _init_process_worker(model_path: Optional[str] = None) -> None:
+    """Load the model in a pool process unless it was inherited from the parent"""
+    from services.ml_service import ml_service
+    if not ml_service.is_loaded:
+        if model_path is None:
+            ml_service.load_model()
+        else:
+            ml_service.load_model(Path(model_path))
+
+
+def _process_predict_matrix(features: np.ndarray) -> np.ndarray:
+    """Run the pool process' model on an encoded feature matrix"""
+    from services.ml_service import ml_service
+    return ml_service.predict_matrix(features)
+
+
+class InferenceExecutor:
+    """
+    Run model calls off the event loop with a bounded number in flight.
+
+    In "thread" mode the given predict function runs on a thread pool; the
+    forest traversal releases the GIL, so threads use several cores. In
+    "process" mode each pool process holds its own copy of the model and only
+    feature matrices and predictions cross the process boundary. "inline" runs
+    on the event loop thread, as before.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        kind: str = "thread",
+        workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None
+    ):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind '{kind}', expected one of {EXECUTOR_KINDS}")
+        self.predict_fn = predict_fn
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.in_flight = 0
+        self.waiting = 0
+        self._pool: Optional[Executor] = None
+        # Model file loaded by pool processes not forked with a model
+        self._model_path: Optional[str] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_pool(self) -> Executor:
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_process_worker,
+                    initargs=(self._model_path,)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="inference"
+                )
+        return self._pool
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the in-flight limiter bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._semaphore is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a function on the pool once an in-flight slot is available.
+
+        In "process" mode the function and its arguments must be picklable.
+        Requests being profiled run the function inline, so the profiler
+        sees it.
+
+        Args:
+            fn: Function to run
+            *args: Positional arguments for the function
+
+        Returns:
+            The function's return value
+        """
+        if self.kind == "inline" or profiling_request.get():
+            return fn(*args)
+
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            with stage_timer("executor_wait"):
+                await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.kind == "process":
+                return await loop.run_in_executor(self._get_pool(), fn, *args)
+            # Threads see the caller's context, so stage timings reach its request
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._get_pool(), context.run, fn, *args)
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def predict_matrix(self, features: np.ndarray, *args: Any) -> np.ndarray:
+        """
+        Run the model on an encoded feature matrix off the event loop.
+
+        Args:
+            features: Feature matrix with shape (n_rows, n_features)
+            *args: Further arguments for the predict function; not used in
+                "process" mode, where pool processes use their own model
+
+        Returns:
+            Predictions, one per row
+        """
+        if self.kind == "process":
+            # Metrics recorded in pool processes are not visible here
+            with stage_timer("inference"):
+                return await self.run(_process_predict_matrix, features)
+        return await self.run(self.predict_fn, features, *args)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the executor configuration and current load"""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting
+        }
+
+    def recycle(self, model_path: Optional[str] = None) -> None:
+        """
+        Replace the worker pool after the model changed.
+
+        Calls already submitted finish on the old pool; the next call starts
+        a new one, whose processes load model_path unless they are forked
+        from a parent that already holds the new model.
+        """
+        self._model_path = model_path
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,185 @@
+"""
+Dynamic micro-batching of concurrent prediction calls
+"""
+
+import asyncio
+import contextvars
+import time
+import numpy as np
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from core.metrics import registry
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+BATCH_SIZE = registry.histogram(
+    "micro_batch_size",
+    "Rows per model call formed by the micro-batcher",
+    buckets=BATCH_SIZE_BUCKETS
+)
+QUEUE_WAIT = registry.histogram(
+    "micro_batch_queue_wait_seconds",
+    "Time a row waited in the micro-batcher queue before its batch was dispatched"
+)
+
+
+class BatchingStats:
+    """Counters describing the batches formed by a MicroBatcher"""
+
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.batch_size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.batch_size_histogram_overflow = 0
+
+    def record(self, batch_size: int, queue_waits: List[float]) -> None:
+        """Record a dispatched batch and the time each row spent queued"""
+        self.batches += 1
+        self.rows += batch_size
+        self.largest_batch = max(self.largest_batch, batch_size)
+        self.total_queue_wait += sum(queue_waits)
+        self.max_queue_wait = max(self.max_queue_wait, max(queue_waits))
+
+        BATCH_SIZE.observe(batch_size)
+        for queue_wait in queue_waits:
+            QUEUE_WAIT.observe(queue_wait)
+
+        for bucket in BATCH_SIZE_BUCKETS:
+            if batch_size <= bucket:
+                self.batch_size_histogram[bucket] += 1
+                break
+        else:
+            self.batch_size_histogram_overflow += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the counters as a JSON-serializable dict"""
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "mean_queue_wait_ms": 1000.0 * self.total_queue_wait / self.rows if self.rows else 0.0,
+            "max_queue_wait_ms": 1000.0 * self.max_queue_wait,
+            "batch_size_histogram": {
+                **{f"le_{bucket}": count for bucket, count in self.batch_size_histogram.items()},
+                "overflow": self.batch_size_histogram_overflow
+            }
+        }
+
+
+class MicroBatcher:
+    """
+    Collect concurrent single-row predictions into one model call.
+
+    The first queued row opens a window of window_ms milliseconds; the batch is
+    dispatched when the window closes or max_batch_size rows are queued,
+    whichever comes first. Each caller awaits its own future. Batches are
+    dispatched as separate tasks, so a new batch can form while earlier ones
+    are still being predicted.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], Awaitable[np.ndarray]],
+        window_ms: float = 2.0,
+        max_batch_size: int = 64
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max_batch_size
+        self.stats = BatchingStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        """Start the collector task on the running event loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._batch_full = asyncio.Event()
+            # Run the collector in an empty context, so batches are not
+            # attributed to the request that happened to start it
+            self._worker = contextvars.Context().run(loop.create_task, self._run(self._queue))
+        return self._queue
+
+    async def submit(self, features: np.ndarray) -> float:
+        """
+        Queue a single feature row and wait for its prediction.
+
+        Args:
+            features: Feature vector with shape (n_features,)
+
+        Returns:
+            Predicted value for the row
+        """
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((features, future, time.perf_counter()))
+        # The collector holds the first row of a batch outside the queue
+        if queue.qsize() + 1 >= self.max_batch_size:
+            self._batch_full.set()
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[np.ndarray, asyncio.Future, float]]:
+        """Wait for the first row, then gather rows until the window closes or the batch is full"""
+        batch = [await queue.get()]
+
+        if self.window > 0 and queue.qsize() + 1 < self.max_batch_size:
+            # Rows are only taken with get_nowait, so closing the window early
+            # can never drop a row that was already handed to a waiter
+            self._batch_full.clear()
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+
+        while len(batch) < self.max_batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        return batch
+
+    async def _dispatch(self, batch: List[Tuple[np.ndarray, asyncio.Future, float]]) -> None:
+        """Run one model call for the batch and resolve every caller's future"""
+        dispatched_at = time.perf_counter()
+        self.stats.record(len(batch), [dispatched_at - queued_at for _, _, queued_at in batch])
+
+        try:
+            predictions = await self.predict_fn(np.vstack([features for features, _, _ in batch]))
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(float(prediction))
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        """Collector loop: form batches and dispatch them until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(queue)
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def close(self) -> None:
+        """Stop the collector task"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+            self._worker = None
@@ -2,57 +2,422 @@
 Machine Learning service for rental price prediction
 """
 
-import joblib
-import pandas as pd
+import asyncio
+import threading
+import time
 import numpy as np
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Callable, Optional, Dict, Any, List, Tuple
 from pathlib import Path
 
 from core.config import (
-    MODEL_PATH, EXPECTED_FEATURES, DEFAULT_VALUES, 
-    CATEGORICAL_COLUMNS, ORIGINAL_TRAINING_COLUMNS
+    MODEL_PATH, MODEL_MMAP_MODE, EXPECTED_FEATURES, DEFAULT_VALUES, 
+    CATEGORICAL_COLUMNS, ORIGINAL_TRAINING_COLUMNS,
+    MICRO_BATCH_ENABLED, MICRO_BATCH_WINDOW_MS, MICRO_BATCH_MAX_SIZE,
+    INFERENCE_ENGINE, INFERENCE_EXECUTOR, INFERENCE_WORKERS, INFERENCE_MAX_IN_FLIGHT,
+    PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS, PER_TREE_PREDICTIONS_ENABLED
 )
+from core.metrics import register_cache_metrics, registry, stage_timer
+from core.utils import get_resident_memory_mb
+from models.models import RentalPredictionRequest
+from services.feature_encoder import FeatureEncoder
+from services.forest_engine import FlatForest
+from services.inference_executor import InferenceExecutor
+from services.micro_batcher import MicroBatcher
+from services.prediction_cache import PredictionCache, make_cache_key
+
+if TYPE_CHECKING:
+    # pandas is only needed by the reference preprocessing pipeline and is
+    # imported on first use, keeping it out of process startup
+    import pandas as pd
+
+# Representative request that synthetic warm-up rows are derived from
+WARMUP_REQUEST = RentalPredictionRequest.model_config["json_schema_extra"]["example"]
+
+
+def synthetic_requests(n: int) -> List[Dict[str, Any]]:
+    """Distinct, valid request payloads for warming up a model"""
+    return [
+        {
+            **WARMUP_REQUEST,
+            "size": 300 + (i * 37) % 1500,
+            "bedrooms": i % 5,
+            "bathrooms": 1 + i % 3,
+            "latitude": WARMUP_REQUEST["latitude"] + (i % 50) * 1e-3
+        }
+        for i in range(n)
+    ]
+
+
+def _process_call(method: str, *args: Any) -> Any:
+    """Call a method of a pool process' service, which serves its own copy of the model"""
+    return getattr(ml_service, method)(*args)
+
+
+class ModelBundle:
+    """
+    A loaded model version and everything needed to serve it.
+    
+    The service replaces its bundle as a whole when a new model is activated,
+    so a request that picked up a bundle keeps using it until it finishes.
+    """
+    
+    def __init__(
+        self,
+        model: Any,
+        forest: Optional[FlatForest] = None,
+        version: str = "unknown",
+        load_stats: Optional[Dict[str, Any]] = None
+    ):
+        self.model = model
+        # Packed copy of the model used when the flat engine is enabled
+        self.forest = forest
+        self.version = version
+        self.load_stats = load_stats
+        # Assigned on activation; invalidates cached predictions of older models
+        self.generation = 0
+        # Packed for per-tree evaluation when the sklearn engine is used,
+        # normally on load (see MLService.load_bundle)
+        self.packed_forest: Optional[FlatForest] = None
+        self._packed_forest_lock = threading.Lock()
+    
+    @property
+    def n_trees(self) -> int:
+        """Number of trees in the model"""
+        if self.forest is not None:
+            return self.forest.n_trees
+        return len(getattr(self.model, "estimators_", ()))
+    
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Run the model on an encoded feature matrix"""
+        if self.forest is not None:
+            return self.forest.predict(features)
+        return self.model.predict(features)
+    
+    def per_tree_forest(self) -> FlatForest:
+        """
+        Return the packed forest used for per-tree evaluation, packing the
+        model if the sklearn engine is serving it and it was not packed on
+        load. Concurrent first callers wait for a single packed copy.
+        
+        Raises:
+            ValueError: If the model is not a supported forest regressor
+        """
+        if self.forest is not None:
+            return self.forest
+        if self.packed_forest is None:
+            with self._packed_forest_lock:
+                if self.packed_forest is None:
+                    self.packed_forest = FlatForest.from_model(self.model)
+        return self.packed_forest
 
 
 class MLService:
     """Machine Learning service for handling model operations"""
     
-    def __init__(self):
-        self.model: Optional[Any] = None
-        self.is_loaded = False
+    def __init__(
+        self,
+        micro_batching: bool = MICRO_BATCH_ENABLED,
+        executor_kind: str = INFERENCE_EXECUTOR,
+        cache_size: int = PREDICTION_CACHE_SIZE,
+        engine: str = INFERENCE_ENGINE,
+        per_tree: bool = PER_TREE_PREDICTIONS_ENABLED
+    ):
+        self.encoder: Optional[FeatureEncoder] = None
+        self.engine = engine
+        # Whether intervals and deadlines are served (per-tree evaluation)
+        self.per_tree = per_tree
+        # Model currently serving predictions, swapped atomically on activation
+        self.bundle: Optional[ModelBundle] = None
+        self._activations = 0
+        self.cache = PredictionCache(
+            max_size=cache_size,
+            ttl_seconds=PREDICTION_CACHE_TTL_SECONDS
+        )
+        self.executor = InferenceExecutor(
+            self.predict_matrix,
+            kind=executor_kind,
+            workers=INFERENCE_WORKERS,
+            max_in_flight=INFERENCE_MAX_IN_FLIGHT
+        )
+        # Startup warm-up through the request path, see warm_up_serving()
+        self.warmup_stats: Optional[Dict[str, Any]] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+        # Arguments and event loop of the requested warm-up, repeated on
+        # activation until one completes
+        self._warmup_request: Optional[Tuple[int, Optional[Callable[[Dict[str, Any]], None]]]] = None
+        self._warmup_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batcher: Optional[MicroBatcher] = None
+        if micro_batching:
+            self.batcher = MicroBatcher(
+                self.executor.predict_matrix,
+                window_ms=MICRO_BATCH_WINDOW_MS,
+                max_batch_size=MICRO_BATCH_MAX_SIZE
+            )
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self.bundle is not None
+    
+    @property
+    def is_ready(self) -> bool:
+        """Whether a model is loaded and the serving path has been warmed up"""
+        return self.is_loaded and self.warmup_stats is not None and self.warmup_stats["completed"]
+    
+    @property
+    def model(self) -> Optional[Any]:
+        return self.bundle.model if self.bundle is not None else None
+    
+    @property
+    def forest(self) -> Optional[FlatForest]:
+        return self.bundle.forest if self.bundle is not None else None
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.bundle.version if self.bundle is not None else None
+    
+    @property
+    def model_generation(self) -> int:
+        return self.bundle.generation if self.bundle is not None else 0
     
-    def load_model(self) -> bool:
+    @property
+    def load_stats(self) -> Optional[Dict[str, Any]]:
+        return self.bundle.load_stats if self.bundle is not None else None
+    
+    def load_model(
+        self,
+        model_path: Path = MODEL_PATH,
+        mmap_mode: Optional[str] = MODEL_MMAP_MODE
+    ) -> bool:
         """
-        Load the trained machine learning model.
+        Load the trained machine learning model and start serving it.
         
+        Args:
+            model_path: Path to the joblib model file
+            mmap_mode: numpy memory-map mode ("r", "r+" or "c"), or None
+            
         Returns:
             True if model loaded successfully, False otherwise
         """
         try:
-            if not MODEL_PATH.exists():
-                print(f"Model file not found at {MODEL_PATH}")
-                return False
-            
-            self.model = joblib.load(MODEL_PATH)
-            self.is_loaded = True
-            print("Model loaded successfully!")
-            return True
-            
+            bundle = self.load_bundle(model_path, mmap_mode)
         except Exception as e:
             print(f"Error loading model: {str(e)}")
-            self.is_loaded = False
             return False
+        
+        self.activate(bundle)
+        return True
+    
+    def load_bundle(
+        self,
+        model_path: Path = MODEL_PATH,
+        mmap_mode: Optional[str] = MODEL_MMAP_MODE,
+        warmup_rows: int = 0
+    ) -> ModelBundle:
+        """
+        Load a model without activating it.
+        
+        With mmap_mode set, numpy arrays stored in an uncompressed joblib file
+        are memory-mapped, but this saves little for sklearn forests: each
+        tree copies its node arrays into the heap when it is unpickled, so
+        the model still ends up in private memory and nothing is shared
+        between workers. Compressed files are loaded normally. Safe to run
+        in a background thread while the current model keeps serving.
+        
+        A directory is read as a compacted forest saved by
+        scripts/compact_model.py and always served by the flat engine; with
+        mmap_mode set its node arrays are served straight from the mapped
+        files, so worker processes share their pages. Use this format to
+        keep one copy of the model per machine.
+        
+        Args:
+            model_path: Path to the joblib model file or compacted model directory
+            mmap_mode: numpy memory-map mode ("r", "r+" or "c"), or None
+            warmup_rows: Number of synthetic rows to predict before returning
+            
+        Returns:
+            The loaded model bundle
+            
+        Raises:
+            FileNotFoundError: If the model file does not exist
+            Exception: If the model cannot be loaded or warmed up
+        """
+        if not model_path.exists():
+            raise FileNotFoundError(f"Model file not found at {model_path}")
+        
+        rss_before = get_resident_memory_mb()
+        start = time.perf_counter()
+        
+        if model_path.is_dir():
+            forest = FlatForest.load(model_path, mmap_mode=mmap_mode)
+            bundle = ModelBundle(forest, forest, version=model_path.name)
+            file_size = sum(path.stat().st_size for path in model_path.iterdir() if path.is_file())
+        else:
+            import joblib
+            
+            model = joblib.load(model_path, mmap_mode=mmap_mode)
+            bundle = ModelBundle(model, self._build_forest(model), version=model_path.stem)
+            file_size = model_path.stat().st_size
+        self._pack_per_tree_forest(bundle)
+        self._get_encoder()
+        load_seconds = time.perf_counter() - start
+        
+        bundle.load_stats = {
+            "version": bundle.version,
+            "path": str(model_path),
+            "mmap_mode": mmap_mode,
+            "file_size_mb": file_size / (1024 * 1024),
+            "load_seconds": load_seconds,
+            "per_tree_forest_mb": bundle.packed_forest.nbytes / (1024 * 1024) if bundle.packed_forest else 0.0,
+            "warmup_seconds": self.warm_up(bundle, warmup_rows),
+            "resident_memory_before_mb": rss_before,
+            "resident_memory_after_mb": get_resident_memory_mb()
+        }
+        print(
+            f"Model {bundle.version} loaded successfully in {load_seconds:.3f}s "
+            f"(mmap_mode={mmap_mode}, resident memory "
+            f"{bundle.load_stats['resident_memory_before_mb']:.1f} MB -> "
+            f"{bundle.load_stats['resident_memory_after_mb']:.1f} MB)"
+        )
+        return bundle
+    
+    def warm_up(self, bundle: ModelBundle, n_rows: int) -> float:
+        """
+        Predict synthetic rows with a bundle, so lazy initialization and cold
+        caches are paid for before it serves requests.
+        
+        Returns:
+            Time taken in seconds
+        """
+        start = time.perf_counter()
+        if n_rows > 0:
+            features = self._get_encoder().encode_many(synthetic_requests(n_rows))
+            bundle.predict(features)
+            if bundle.packed_forest is not None:
+                bundle.packed_forest.predict(features)
+        return time.perf_counter() - start
+    
+    def activate(self, bundle: ModelBundle) -> None:
+        """
+        Start serving a loaded model.
+        
+        The swap is a single reference assignment: requests already running
+        finish on the previous model, new requests use this one. Inference
+        processes, which hold their own copy of the model, are replaced.
+        """
+        self._activations += 1
+        bundle.generation = self._activations
+        self.bundle = bundle
+        
+        if bundle.load_stats is not None:
+            MODEL_LOAD_SECONDS.set(bundle.load_stats["load_seconds"])
+        if self.executor.kind == "process":
+            self.executor.recycle(bundle.load_stats["path"] if bundle.load_stats else None)
+        
+        # A model activated while the service is not ready, e.g. the first one
+        # reloaded after a failed startup load, gets the startup warm-up
+        loop = self._warmup_loop
+        if not self.is_ready and loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._retry_warm_up)
     
-    def preprocess_data(self, request_data: Dict[str, Any]) -> pd.DataFrame:
+    def install_model(self, model: Any, version: str = "in-memory") -> ModelBundle:
+        """
+        Serve an already loaded model object, e.g. in tests and benchmarks.
+        
+        Returns:
+            The activated model bundle
+        """
+        forest = model if isinstance(model, FlatForest) else self._build_forest(model)
+        bundle = ModelBundle(model, forest, version=version)
+        self._pack_per_tree_forest(bundle)
+        self.activate(bundle)
+        return bundle
+    
+    def _current_bundle(self) -> ModelBundle:
+        """
+        Return the model serving new requests.
+        
+        Raises:
+            RuntimeError: If model is not loaded
+        """
+        bundle = self.bundle
+        if bundle is None:
+            raise RuntimeError("Model not loaded")
+        return bundle
+    
+    def _pack_per_tree_forest(self, bundle: ModelBundle) -> None:
+        """
+        Pack a bundle served by the sklearn engine for per-tree evaluation
+        up front, so the first request with intervals or a deadline does not
+        pay for it. Unsupported models are left unpacked; such requests are
+        rejected when they arrive.
+        """
+        if not self.per_tree or bundle.forest is not None:
+            return
+        try:
+            bundle.per_tree_forest()
+        except ValueError as e:
+            print(f"Per-tree predictions unavailable for model {bundle.version}: {str(e)}")
+    
+    def _per_tree_forest(self, bundle: ModelBundle) -> FlatForest:
+        """
+        Return a bundle's forest for per-tree evaluation.
+        
+        Raises:
+            ValueError: If per-tree predictions are disabled or unsupported by the model
+        """
+        if not self.per_tree:
+            raise ValueError("per-tree predictions are disabled (PER_TREE_PREDICTIONS_ENABLED=false)")
+        return bundle.per_tree_forest()
+    
+    def _build_forest(self, model: Any) -> Optional[FlatForest]:
+        """Pack the model for the flat engine, falling back to sklearn if unsupported"""
+        if self.engine != "flat":
+            return None
+        try:
+            forest = FlatForest.from_model(model)
+        except ValueError as e:
+            print(f"Flat inference engine unavailable, using model.predict: {str(e)}")
+            return None
+        print(
+            f"Flat inference engine ready: {forest.n_trees} trees, "
+            f"{forest.n_nodes} nodes, {forest.nbytes / (1024 * 1024):.1f} MB"
+        )
+        return forest
+    
+    def _get_encoder(self) -> FeatureEncoder:
+        """Return the compiled feature encoder, compiling it on first use"""
+        if self.encoder is None:
+            self.encoder = FeatureEncoder.compile(EXPECTED_FEATURES)
+        return self.encoder
+    
+    def preprocess_data(self, request_data: Dict[str, Any]) -> np.ndarray:
         """
         Preprocess input data for prediction.
         
+        Args:
+            request_data: Input data from API request
+            
+        Returns:
+            Feature matrix with shape (1, EXPECTED_FEATURES) ready for prediction
+        """
+        with stage_timer("encode"):
+            return self._get_encoder().encode(request_data)
+    
+    def preprocess_dataframe(self, request_data: Dict[str, Any]) -> "pd.DataFrame":
+        """
+        Preprocess input data with the reference pandas pipeline.
+        
+        Produces the same features as preprocess_data, but is considerably
+        slower. Kept as the reference implementation for the compiled encoder.
+        
         Args:
             request_data: Input data from API request
             
         Returns:
             Preprocessed DataFrame ready for prediction
         """
+        import pandas as pd
+        
         # Use provided coordinates directly
         longitude = request_data['longitude']
         latitude = request_data['latitude']
@@ -90,7 +455,7 @@ class MLService:
         
         return new_data_sample_prepared
     
-    def _apply_preprocessing(self, data: pd.DataFrame) -> pd.DataFrame:
+    def _apply_preprocessing(self, data: "pd.DataFrame") -> "pd.DataFrame":
         """
         Apply preprocessing transformations to the data.
         
@@ -100,6 +465,8 @@ class MLService:
         Returns:
             Preprocessed DataFrame with expected number of features
         """
+        import pandas as pd
+        
         # Create a copy for preprocessing
         processed_data = data.copy()
         
@@ -123,7 +490,7 @@ class MLService:
         
         return processed_data
     
-    def _adjust_feature_count(self, data: pd.DataFrame) -> pd.DataFrame:
+    def _adjust_feature_count(self, data: "pd.DataFrame") -> "pd.DataFrame":
         """
         Adjust the number of features to match the expected count.
         
@@ -133,6 +500,8 @@ class MLService:
         Returns:
             DataFrame with adjusted feature count
         """
+        import pandas as pd
+        
         current_features = data.shape[1]
         
         if current_features < EXPECTED_FEATURES:
@@ -151,6 +520,25 @@ class MLService:
         
         return data
     
+    def predict_matrix(self, features: np.ndarray, bundle: Optional[ModelBundle] = None) -> np.ndarray:
+        """
+        Run the model on an already encoded feature matrix.
+        
+        Args:
+            features: Feature matrix with shape (n_rows, EXPECTED_FEATURES)
+            bundle: Model to use; defaults to the current model
+            
+        Returns:
+            Predicted rental prices, one per row
+            
+        Raises:
+            RuntimeError: If model is not loaded
+        """
+        bundle = bundle or self._current_bundle()
+        
+        with stage_timer("inference"):
+            return bundle.predict(features)
+    
     def predict(self, request_data: Dict[str, Any]) -> float:
         """
         Make a price prediction for the given input data.
@@ -165,17 +553,470 @@ class MLService:
             RuntimeError: If model is not loaded
             Exception: If prediction fails
         """
-        if not self.is_loaded or self.model is None:
-            raise RuntimeError("Model not loaded")
+        bundle = self._current_bundle()
+        
+        generation = bundle.generation
+        cache_key = make_cache_key(request_data)
+        cached_price = self.cache.get(cache_key, generation)
+        if cached_price is not None:
+            return cached_price
         
         # Preprocess the data
         processed_data = self.preprocess_data(request_data)
         
         # Make prediction
-        predicted_price = self.model.predict(processed_data)
+        predicted_price = float(self.predict_matrix(processed_data, bundle)[0])
+        
+        self.cache.set(cache_key, predicted_price, generation)
+        return predicted_price
+    
+    async def predict_async(self, request_data: Dict[str, Any]) -> float:
+        """
+        Make a price prediction without blocking the event loop.
+        
+        The model runs on the inference executor, sharing a model call with
+        concurrent requests when micro-batching is enabled.
+        
+        Args:
+            request_data: Input data from API request
+            
+        Returns:
+            Predicted rental price
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            Exception: If prediction fails
+        """
+        bundle = self._current_bundle()
+        
+        generation = bundle.generation
+        cache_key = make_cache_key(request_data)
+        cached_price = self.cache.get(cache_key, generation)
+        if cached_price is not None:
+            return cached_price
+        
+        processed_data = self.preprocess_data(request_data)
+        predicted_price = await self._predict_row_async(processed_data, bundle)
+        
+        self.cache.set(cache_key, predicted_price, generation)
+        return predicted_price
+    
+    async def _predict_row_async(self, processed_data: np.ndarray, bundle: ModelBundle) -> float:
+        """Run the model on one encoded row via the micro-batcher or the inference executor"""
+        if self.batcher is not None:
+            # Batches run on the model current when they are dispatched
+            return await self.batcher.submit(processed_data[0])
+        return float((await self.executor.predict_matrix(processed_data, bundle))[0])
+    
+    async def _run_model_call(self, method: str, *args: Any, bundle: ModelBundle) -> Any:
+        """
+        Run a model method of this service on the inference executor.
         
-        return float(predicted_price[0])
+        Pool processes run the method on their own service and model, so the
+        bundle is only passed to thread and inline executors.
+        """
+        if self.executor.kind == "process":
+            with stage_timer("inference"):
+                return await self.executor.run(_process_call, method, *args)
+        return await self.executor.run(getattr(self, method), *args, bundle)
+    
+    def predict_matrix_distribution(
+        self,
+        features: np.ndarray,
+        quantiles: Tuple[float, ...],
+        bundle: Optional[ModelBundle] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Mean, standard deviation and quantiles of the per-tree predictions.
+        
+        Args:
+            features: Feature matrix with shape (n_rows, EXPECTED_FEATURES)
+            quantiles: Quantiles to compute, between 0 and 1
+            bundle: Model to use; defaults to the current model
+            
+        Returns:
+            Tuple of (means, standard deviations, quantiles with shape (len(quantiles), n_rows))
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            ValueError: If the model cannot be evaluated tree by tree
+        """
+        bundle = bundle or self._current_bundle()
+        forest = self._per_tree_forest(bundle)
+        
+        with stage_timer("inference"):
+            return forest.predict_distribution(features, quantiles)
+    
+    async def predict_intervals_async(
+        self,
+        records: List[Dict[str, Any]],
+        quantiles: Tuple[float, ...],
+        bundle: Optional[ModelBundle] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Predict prices together with the spread of the forest's per-tree predictions.
+        
+        All trees are evaluated once for the whole batch, in a single model
+        call, and the mean is the same price the other prediction methods
+        return. The cache and the micro-batcher only handle plain prices, so
+        these predictions bypass both.
+        
+        Args:
+            records: Input data from API requests
+            quantiles: Quantiles to compute, between 0 and 1
+            bundle: Model to use; defaults to the current model
+            
+        Returns:
+            For each record, in input order, a dict with the mean, standard
+            deviation and quantiles (keyed by quantile) of the per-tree predictions
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            ValueError: If the model cannot be evaluated tree by tree
+        """
+        bundle = bundle or self._current_bundle()
+        
+        if not records:
+            return []
+        
+        with stage_timer("encode"):
+            processed_data = self._get_encoder().encode_many(records)
+        means, stds, quantile_values = await self._run_model_call(
+            "predict_matrix_distribution", processed_data, tuple(quantiles), bundle=bundle
+        )
+        
+        keys = [f"{quantile:g}" for quantile in quantiles]
+        return [
+            {"mean": mean, "std": std, "quantiles": dict(zip(keys, row_quantiles))}
+            for mean, std, row_quantiles in zip(means.tolist(), stds.tolist(), quantile_values.T.tolist())
+        ]
+    
+    def predict_matrix_until(
+        self,
+        features: np.ndarray,
+        deadline: float,
+        bundle: Optional[ModelBundle] = None
+    ) -> Tuple[np.ndarray, int, int]:
+        """
+        Average as many trees as can be evaluated before a deadline.
+        
+        Args:
+            features: Feature matrix with shape (n_rows, EXPECTED_FEATURES)
+            deadline: time.perf_counter() value by which to stop (the clock is
+                system-wide on Linux, so pool processes can use it too)
+            bundle: Model to use; defaults to the current model
+            
+        Returns:
+            Tuple of (predictions, trees averaged, trees in the model)
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            ValueError: If the model cannot be evaluated tree by tree
+        """
+        bundle = bundle or self._current_bundle()
+        forest = self._per_tree_forest(bundle)
+        
+        with stage_timer("inference"):
+            predictions, trees_used = forest.predict_until(features, deadline)
+        return predictions, trees_used, forest.n_trees
+    
+    async def predict_until_async(self, request_data: Dict[str, Any], deadline: float) -> Tuple[float, int, int]:
+        """
+        Make a price prediction that stops evaluating trees at a deadline.
+        
+        Bypasses the micro-batcher, so the request does not wait for a batch
+        window. A cached prediction is always complete; partial predictions
+        are not cached.
+        
+        Args:
+            request_data: Input data from API request
+            deadline: time.perf_counter() value by which inference must stop
+            
+        Returns:
+            Tuple of (predicted price, trees averaged, trees in the model)
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            ValueError: If the model cannot be evaluated tree by tree
+        """
+        bundle = self._current_bundle()
+        
+        generation = bundle.generation
+        cache_key = make_cache_key(request_data)
+        cached_price = self.cache.get(cache_key, generation)
+        if cached_price is not None:
+            return cached_price, bundle.n_trees, bundle.n_trees
+        
+        processed_data = self.preprocess_data(request_data)
+        predictions, trees_used, trees_total = await self._run_model_call(
+            "predict_matrix_until", processed_data, deadline, bundle=bundle
+        )
+        predicted_price = float(predictions[0])
+        
+        if trees_used == trees_total:
+            self.cache.set(cache_key, predicted_price, generation)
+        return predicted_price, trees_used, trees_total
+    
+    async def warm_up_serving(self, n_predictions: int) -> Dict[str, Any]:
+        """
+        Send synthetic requests through the full prediction path.
+        
+        Each request is encoded with preprocess_data and predicted one at a
+        time on the inference executor (or micro-batcher), bypassing the
+        prediction cache, so that worker pools, pool processes and lazily
+        initialized model state exist before the service reports ready.
+        
+        Args:
+            n_predictions: Number of warm-up predictions; 0 only requires a loaded model
+            
+        Returns:
+            Warm-up statistics, also kept in warmup_stats
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            Exception: If a warm-up prediction fails; the service stays not ready
+        """
+        bundle = self._current_bundle()
+        self.warmup_stats = {"predictions": n_predictions, "completed": False}
+        
+        start = time.perf_counter()
+        latencies_ms = []
+        for request_data in synthetic_requests(n_predictions):
+            request_start = time.perf_counter()
+            await self._predict_row_async(self.preprocess_data(request_data), bundle)
+            latencies_ms.append(1000.0 * (time.perf_counter() - request_start))
+        
+        self.warmup_stats = {
+            "predictions": n_predictions,
+            "completed": True,
+            "model_version": bundle.version,
+            "seconds": time.perf_counter() - start,
+            "first_prediction_ms": latencies_ms[0] if latencies_ms else None,
+            "last_prediction_ms": latencies_ms[-1] if latencies_ms else None
+        }
+        print(
+            f"Serving path warmed up with {n_predictions} predictions in "
+            f"{self.warmup_stats['seconds']:.3f}s"
+        )
+        return self.warmup_stats
+    
+    def start_warm_up(
+        self,
+        n_predictions: int,
+        on_complete: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> None:
+        """
+        Warm up the serving path in the background; the service is ready once done.
+        
+        Without a loaded model, or if the warm-up fails, it runs again when a
+        model is next activated (by a reload or the model file watcher).
+        
+        Args:
+            n_predictions: Number of warm-up predictions
+            on_complete: Called with the warm-up statistics after a successful warm-up
+        """
+        self._warmup_request = (n_predictions, on_complete)
+        self._warmup_loop = asyncio.get_running_loop()
+        if not self.is_loaded:
+            self.warmup_stats = {"predictions": n_predictions, "completed": False, "error": "Model not loaded"}
+            return
+        
+        async def run() -> None:
+            try:
+                stats = await self.warm_up_serving(n_predictions)
+            except Exception as e:
+                self.warmup_stats = {"predictions": n_predictions, "completed": False, "error": str(e)}
+                print(f"Warm-up failed, service stays not ready: {str(e)}")
+                return
+            if on_complete is not None:
+                on_complete(stats)
+        
+        self._warmup_task = self._warmup_loop.create_task(run())
+    
+    def _retry_warm_up(self) -> None:
+        """Run the requested warm-up again if the service is still not ready"""
+        if self._warmup_request is not None and not self.is_ready and not self.is_warming_up:
+            self.start_warm_up(*self._warmup_request)
+    
+    @property
+    def is_warming_up(self) -> bool:
+        """Whether a background warm-up is running"""
+        return self._warmup_task is not None and not self._warmup_task.done()
+    
+    async def stop_warm_up(self) -> None:
+        """Cancel a background warm-up that is still running"""
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except asyncio.CancelledError:
+                pass
+            self._warmup_task = None
+    
+    def predict_batch(self, records: List[Dict[str, Any]], use_cache: bool = True) -> List[float]:
+        """
+        Make price predictions for several inputs with a single model call.
+        
+        Args:
+            records: Input data from API requests
+            use_cache: Read and fill the prediction cache; bulk scoring turns
+                this off so its rows do not evict the interactive entries
+            
+        Returns:
+            Predicted rental prices, in input order
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            Exception: If prediction fails
+        """
+        bundle = self._current_bundle()
+        
+        if not records:
+            return []
+        
+        generation = bundle.generation
+        cache_keys, predicted_prices, misses = self._lookup_cached(records, generation, use_cache)
+        
+        if misses:
+            # Encode all uncached inputs as one feature matrix
+            processed_data = self._encode_misses(records, misses)
+            
+            # Make predictions
+            self._store_predictions(
+                self.predict_matrix(processed_data, bundle), misses, cache_keys, predicted_prices, generation
+            )
+        
+        return predicted_prices
+    
+    async def predict_batch_async(
+        self,
+        records: List[Dict[str, Any]],
+        bundle: Optional[ModelBundle] = None,
+        use_cache: bool = True
+    ) -> List[float]:
+        """
+        Make price predictions for several inputs without blocking the event loop.
+        
+        Args:
+            records: Input data from API requests
+            bundle: Model to use, e.g. to score a whole stream with one model;
+                defaults to the current model
+            use_cache: Read and fill the prediction cache; bulk scoring turns
+                this off so its rows do not evict the interactive entries
+            
+        Returns:
+            Predicted rental prices, in input order
+            
+        Raises:
+            RuntimeError: If model is not loaded
+            Exception: If prediction fails
+        """
+        bundle = bundle or self._current_bundle()
+        
+        if not records:
+            return []
+        
+        generation = bundle.generation
+        cache_keys, predicted_prices, misses = self._lookup_cached(records, generation, use_cache)
+        
+        if misses:
+            processed_data = self._encode_misses(records, misses)
+            self._store_predictions(
+                await self.executor.predict_matrix(processed_data, bundle),
+                misses, cache_keys, predicted_prices, generation
+            )
+        
+        return predicted_prices
+    
+    def _lookup_cached(self, records: List[Dict[str, Any]], generation: int, use_cache: bool = True):
+        """
+        Look up cached predictions for a batch.
+        
+        Returns:
+            Tuple of (cache keys, predictions with None for misses, indices of misses);
+            without use_cache every input is a miss and the cache keys are None
+        """
+        if not use_cache:
+            return None, [None] * len(records), list(range(len(records)))
+        
+        cache_keys = [make_cache_key(record) for record in records]
+        predicted_prices = [self.cache.get(key, generation) for key in cache_keys]
+        misses = [i for i, price in enumerate(predicted_prices) if price is None]
+        return cache_keys, predicted_prices, misses
+    
+    def _encode_misses(self, records: List[Dict[str, Any]], misses: List[int]) -> np.ndarray:
+        """Encode the uncached inputs of a batch as one feature matrix"""
+        with stage_timer("encode"):
+            return self._get_encoder().encode_many([records[i] for i in misses])
+    
+    def _store_predictions(
+        self,
+        new_prices: np.ndarray,
+        misses: List[int],
+        cache_keys: Optional[List[Any]],
+        predicted_prices: List[Optional[float]],
+        generation: int
+    ) -> None:
+        """Fill in and cache the predictions computed for the cache misses of a batch"""
+        for index, price in zip(misses, new_prices):
+            predicted_prices[index] = float(price)
+            if cache_keys is not None:
+                self.cache.set(cache_keys[index], float(price), generation)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get runtime statistics of the service.
+        
+        Returns:
+            Dict with the model load, warm-up, engine, executor, cache and
+            micro-batching statistics (model load and warm-up are None before
+            they ran and micro-batching is None when disabled)
+        """
+        return {
+            "model_load": self.load_stats,
+            "warmup": self.warmup_stats,
+            "engine": "flat" if self.forest is not None else "sklearn",
+            "executor": self.executor.get_stats(),
+            "cache": {"model_generation": self.model_generation, **self.cache.get_stats()},
+            "micro_batching": None if self.batcher is None else {
+                "window_ms": 1000.0 * self.batcher.window,
+                "max_batch_size": self.batcher.max_batch_size,
+                **self.batcher.stats.snapshot()
+            }
+        }
+
 
+def register_service_metrics(service: MLService) -> None:
+    """Expose the service's model, executor, cache and micro-batching state as metrics"""
+    registry.gauge(
+        "model_loaded", "Whether a model is loaded (1) or not (0)",
+        callback=lambda: float(service.is_loaded)
+    )
+    registry.gauge(
+        "model_ready", "Whether the service is ready to serve predictions (1) or not (0)",
+        callback=lambda: float(service.is_ready)
+    )
+    registry.gauge(
+        "model_generation", "Number of models loaded since startup",
+        callback=lambda: service.model_generation
+    )
+    registry.gauge(
+        "inference_executor_in_flight", "Model calls running on the inference executor",
+        callback=lambda: service.executor.in_flight
+    )
+    registry.gauge(
+        "inference_executor_waiting", "Model calls waiting for an inference executor slot",
+        callback=lambda: service.executor.waiting
+    )
+    register_cache_metrics("prediction_cache", service.cache, "Prediction cache")
+
+
+# Time taken by the last successful model load
+MODEL_LOAD_SECONDS = registry.gauge(
+    "model_load_duration_seconds",
+    "Time taken by the last successful model load"
+)
 
 # Global ML service instance
 ml_service = MLService()
+register_service_metrics(ml_service)
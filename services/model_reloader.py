@@ -0,0 +1,171 @@
+"""
+Zero-downtime model reloading
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import MODEL_PATH, MODEL_MMAP_MODE, MODEL_WARMUP_ROWS, MODEL_WATCH_INTERVAL_SECONDS
+from services.forest_engine import FOREST_METADATA_FILE
+from services.ml_service import MLService, ml_service
+
+
+class ReloadInProgressError(RuntimeError):
+    """Raised when a reload is requested while another one is running"""
+
+
+class ModelReloader:
+    """
+    Load new model versions in the background and swap them into the service.
+
+    The model file is loaded and warmed up with synthetic rows on a worker
+    thread while the current model keeps serving; only then is the new model
+    activated. A failed load leaves the current model in place. Optionally,
+    the model file is polled for changes and reloaded when it changes.
+    """
+
+    def __init__(
+        self,
+        service: MLService,
+        model_path: Path,
+        mmap_mode: Optional[str] = None,
+        warmup_rows: int = 64,
+        watch_interval: float = 0.0
+    ):
+        self.service = service
+        self.model_path = model_path
+        self.mmap_mode = mmap_mode
+        self.warmup_rows = warmup_rows
+        self.watch_interval = watch_interval
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._reloading = False
+        self._watcher: Optional[asyncio.Task] = None
+        # Signature of the model file when it was last loaded
+        self._loaded_signature = self._file_signature()
+
+    async def reload(self, model_path: Optional[Path] = None) -> Dict[str, Any]:
+        """
+        Load, warm up and activate a model.
+
+        Args:
+            model_path: Model file to load; defaults to the current model file
+
+        Returns:
+            Previous and new model version with load and warm-up timings
+
+        Raises:
+            ReloadInProgressError: If another reload is running
+            Exception: If the model cannot be loaded; the current model stays active
+        """
+        if self._reloading:
+            raise ReloadInProgressError("A model reload is already in progress")
+
+        model_path = model_path or self.model_path
+        self._reloading = True
+        try:
+            bundle = await asyncio.get_running_loop().run_in_executor(
+                None, self.service.load_bundle, model_path, self.mmap_mode, self.warmup_rows
+            )
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self._reloading = False
+
+        previous_version = self.service.model_version
+        self.service.activate(bundle)
+        self.model_path = model_path
+        self._loaded_signature = self._file_signature()
+        self.reloads += 1
+        self.last_error = None
+        print(f"Model reloaded: {previous_version} -> {bundle.version}")
+
+        return {
+            "previous_version": previous_version,
+            "model_version": bundle.version,
+            "model_generation": bundle.generation,
+            "path": str(model_path),
+            "load_seconds": bundle.load_stats["load_seconds"],
+            "warmup_seconds": bundle.load_stats["warmup_seconds"]
+        }
+
+    def resolve_path(self, model_path: Optional[str]) -> Path:
+        """
+        Resolve a requested model file within the model directory.
+
+        Model files are unpickled on load, so only files next to the
+        configured model are accepted.
+
+        Args:
+            model_path: File name or path relative to the model directory, or
+                None for the current model file
+
+        Returns:
+            Absolute path of the model file
+
+        Raises:
+            ValueError: If the path points outside the model directory
+        """
+        if model_path is None:
+            return self.model_path
+        model_dir = self.model_path.parent.resolve()
+        resolved = (model_dir / model_path).resolve()
+        if resolved.parent != model_dir:
+            raise ValueError(f"Model files must be in the model directory {model_dir}")
+        return resolved
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        """Modification time and size of the model file, or None if it is missing"""
+        # A compacted model directory is complete once its metadata file is written
+        path = self.model_path
+        if path.is_dir():
+            path = path / FOREST_METADATA_FILE
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def _watch(self) -> None:
+        """Reload whenever the model file changes and has stopped changing"""
+        seen = self._loaded_signature
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            current = self._file_signature()
+            # Wait for one unchanged poll, so a file still being copied is not loaded
+            if current is not None and current != self._loaded_signature and current == seen and not self._reloading:
+                try:
+                    await self.reload()
+                except Exception as e:
+                    # Do not retry the same broken file on every poll
+                    self._loaded_signature = current
+                    print(f"Model reload after file change failed, keeping current model: {str(e)}")
+            seen = current
+
+    def start_watching(self) -> None:
+        """Start polling the model file if a watch interval is configured"""
+        if self.watch_interval > 0 and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop_watching(self) -> None:
+        """Stop polling the model file"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+            self._watcher = None
+
+
+# Global model reloader for the global ML service
+model_reloader = ModelReloader(
+    ml_service,
+    MODEL_PATH,
+    mmap_mode=MODEL_MMAP_MODE,
+    warmup_rows=MODEL_WARMUP_ROWS,
+    watch_interval=MODEL_WATCH_INTERVAL_SECONDS
+)
@@ -0,0 +1,165 @@
+"""
+In-process LRU+TTL cache for predictions
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from services.feature_encoder import NUMERIC_REQUEST_FIELDS, CATEGORICAL_REQUEST_FIELDS
+
+# Request fields making up a cache key, in key order
+KEY_FIELDS = tuple(NUMERIC_REQUEST_FIELDS) + tuple(CATEGORICAL_REQUEST_FIELDS)
+
+
+def make_cache_key(request_data: Dict[str, Any]) -> Tuple[Hashable, ...]:
+    """
+    Build the canonical cache key of a request.
+
+    City and state are normalized the same way preprocessing normalizes them
+    and numeric fields are compared as floats, so equivalent requests share
+    an entry.
+
+    Args:
+        request_data: Input data from API request
+
+    Returns:
+        Hashable key
+    """
+    key = []
+    for field in KEY_FIELDS:
+        value = request_data.get(field)
+        if field == 'city' and isinstance(value, str):
+            value = value.lower()
+        elif field == 'state' and isinstance(value, str):
+            value = value.upper()
+        elif field in NUMERIC_REQUEST_FIELDS and value is not None:
+            value = float(value)
+        key.append(value)
+    return tuple(key)
+
+
+class PredictionCache:
+    """
+    Bounded cache of predictions with least-recently-used and age-based eviction.
+
+    Entries are tagged with the model generation they were computed with; a
+    lookup or insert with a newer generation drops every entry, so a newly
+    loaded model never serves stale predictions. Lookups and inserts of
+    requests still running on an older model bypass the cache.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all"""
+        return self.max_size > 0
+
+    def _check_generation(self, generation: int) -> bool:
+        """
+        Drop all entries if a newer model generation is seen (lock must be held).
+
+        Returns:
+            False if the generation is older than the cached one
+        """
+        if self._generation is not None and generation < self._generation:
+            return False
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+        return True
+
+    def get(self, key: Hashable, generation: int) -> Optional[float]:
+        """
+        Look up a cached prediction.
+
+        Args:
+            key: Cache key built with make_cache_key
+            generation: Generation of the currently loaded model
+
+        Returns:
+            Cached prediction, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key) if self._check_generation(generation) else None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self._clock() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: float, generation: int) -> None:
+        """
+        Store a prediction, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key built with make_cache_key
+            value: Prediction to store
+            generation: Generation of the model that produced the prediction
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if not self._check_generation(generation):
+                return
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the cache configuration and counters"""
+        lookups = self.hits + self.misses
+        return {
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
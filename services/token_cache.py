@@ -0,0 +1,122 @@
+"""
+In-process cache of verified access tokens
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from models.models import User
+
+
+class TokenCache:
+    """
+    Bounded cache mapping already verified JWTs to the user they resolved to.
+
+    Entries expire at the token's own "exp" claim, so a cached token is never
+    accepted after it would have failed verification. The least recently used
+    entry is evicted when the cache is full, and all entries of a user can be
+    dropped at once, e.g. when the user is deactivated.
+    """
+
+    def __init__(self, max_size: int = 1024, clock: Callable[[], float] = time.time):
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all"""
+        return self.max_size > 0
+
+    def get(self, token: str) -> Optional[User]:
+        """
+        Look up a verified token.
+
+        Args:
+            token: Encoded JWT as sent by the client
+
+        Returns:
+            The user the token was issued to, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            user, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[token]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def set(self, token: str, user: User, expires_at: float) -> None:
+        """
+        Store a verified token, evicting the least recently used entry when full.
+
+        Args:
+            token: Encoded JWT as sent by the client
+            user: User the token resolved to
+            expires_at: The token's "exp" claim, in seconds since the epoch
+        """
+        if not self.enabled or self._clock() >= expires_at:
+            return
+
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, username: str) -> int:
+        """
+        Drop every cached token of a user.
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            tokens = [token for token, (user, _) in self._entries.items() if user.username == username]
+            for token in tokens:
+                del self._entries[token]
+            self.invalidations += len(tokens)
+        return len(tokens)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the cache configuration and counters"""
+        lookups = self.hits + self.misses
+        return {
+            "max_size": self.max_size,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,223 @@
+"""
+User storage for authentication
+
+Users are looked up on every authenticated request, so both stores answer
+lookups from an in-memory index. The SQLite store persists users in a local
+database file and re-reads indexed users once their entry is a few seconds
+old, so changes made by other processes (scripts/manage_users.py, other
+workers) take effect without a restart.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from models.models import User
+
+
+class UserStore:
+    """Interface of a user store"""
+
+    def get_user(self, username: str) -> Optional[User]:
+        """Return the user with the given username, or None if unknown"""
+        raise NotImplementedError
+
+    def add_user(self, user: User) -> None:
+        """Create or replace a user"""
+        raise NotImplementedError
+
+    def set_active(self, username: str, is_active: bool) -> bool:
+        """
+        Activate or deactivate a user.
+
+        Returns:
+            True if the user exists, False otherwise
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release the store's resources"""
+
+
+class InMemoryUserStore(UserStore):
+    """Users held in a dict, e.g. for development and tests"""
+
+    def __init__(self, users: Optional[Dict[str, User]] = None):
+        # Copies, so changes in one store never reach the seed users or other stores
+        self._users = {name: user.model_copy() for name, user in (users or {}).items()}
+
+    def get_user(self, username: str) -> Optional[User]:
+        return self._users.get(username)
+
+    def add_user(self, user: User) -> None:
+        self._users[user.username] = user.model_copy()
+
+    def set_active(self, username: str, is_active: bool) -> bool:
+        user = self._users.get(username)
+        if user is None:
+            return False
+        user.is_active = is_active
+        return True
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared between threads"""
+
+    def __init__(self, path: Path, size: int = 4):
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(max(size, 1)):
+            connection = sqlite3.connect(str(path), check_same_thread=False, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._connections.put(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; the block runs in a transaction"""
+        connection = self._connections.get()
+        try:
+            with connection:
+                yield connection
+        finally:
+            self._connections.put(connection)
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class SQLiteUserStore(UserStore):
+    """
+    Users persisted in a local SQLite file, indexed in memory.
+
+    All users are read into a dict when the store is opened and lookups are
+    served from it. A lookup that misses the index, or finds an entry older
+    than index_ttl seconds, reads the user from the database, so users added,
+    deactivated or given a new password by another process are picked up
+    within index_ttl. Writes go to the database first and then to the index.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        pool_size: int = 4,
+        seed_users: Iterable[User] = (),
+        index_ttl: float = 5.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            path: Database file, created if missing
+            pool_size: Number of pooled connections
+            seed_users: Users added when the database is empty
+            index_ttl: Seconds an indexed user is served before it is read again
+            clock: Monotonic time source
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.index_ttl = index_ttl
+        self._clock = clock
+        self._pool = ConnectionPool(path, pool_size)
+        # Per username: the user and when it was read from the database
+        self._index: Dict[str, Tuple[User, float]] = {}
+        self._lock = threading.Lock()
+
+        with self._pool.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, "
+                "hashed_password TEXT NOT NULL, "
+                "is_active INTEGER NOT NULL DEFAULT 1)"
+            )
+            is_empty = connection.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+        if is_empty:
+            for user in seed_users:
+                self.add_user(user)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Read every user into the in-memory index"""
+        with self._pool.connection() as connection:
+            rows = connection.execute("SELECT username, hashed_password, is_active FROM users").fetchall()
+        now = self._clock()
+        with self._lock:
+            self._index = {row[0]: (self._to_user(row), now) for row in rows}
+
+    @staticmethod
+    def _to_user(row) -> User:
+        username, hashed_password, is_active = row
+        return User(username=username, hashed_password=hashed_password, is_active=bool(is_active))
+
+    def get_user(self, username: str) -> Optional[User]:
+        entry = self._index.get(username)
+        if entry is not None and self._clock() - entry[1] < self.index_ttl:
+            return entry[0]
+
+        with self._pool.connection() as connection:
+            row = connection.execute(
+                "SELECT username, hashed_password, is_active FROM users WHERE username = ?",
+                (username,)
+            ).fetchone()
+        with self._lock:
+            if row is None:
+                self._index.pop(username, None)
+                return None
+            user = self._to_user(row)
+            self._index[username] = (user, self._clock())
+        return user
+
+    def add_user(self, user: User) -> None:
+        with self._pool.connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO users (username, hashed_password, is_active) VALUES (?, ?, ?)",
+                (user.username, user.hashed_password, int(user.is_active))
+            )
+        with self._lock:
+            self._index[user.username] = (user.model_copy(), self._clock())
+
+    def set_active(self, username: str, is_active: bool) -> bool:
+        with self._pool.connection() as connection:
+            updated = connection.execute(
+                "UPDATE users SET is_active = ? WHERE username = ?",
+                (int(is_active), username)
+            ).rowcount
+        if not updated:
+            return False
+        # Read back on the next lookup
+        with self._lock:
+            self._index.pop(username, None)
+        return True
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def create_user_store(
+    kind: str,
+    path: Path,
+    pool_size: int,
+    seed_users: Dict[str, User],
+    index_ttl: float = 5.0
+) -> UserStore:
+    """
+    Create the configured user store.
+
+    Args:
+        kind: "memory" or "sqlite"
+        path: SQLite database file (sqlite only)
+        pool_size: Number of pooled SQLite connections (sqlite only)
+        seed_users: Users to start with; the SQLite store only adds them to an empty database
+        index_ttl: Seconds an indexed user is served before it is read again (sqlite only)
+
+    Returns:
+        The user store
+    """
+    if kind == "sqlite":
+        return SQLiteUserStore(path, pool_size, seed_users.values(), index_ttl)
+    if kind == "memory":
+        return InMemoryUserStore(seed_users)
+    raise ValueError(f"Unknown user store '{kind}', expected 'memory' or 'sqlite'")
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark suite for the Rental Price Prediction API
+
+Times preprocessing, model inference, token verification and full HTTP
+round-trips through the FastAPI app (no server needed) across batch sizes,
+plus cold starts of the app in fresh interpreters, and writes the results as JSON so runs can be compared between commits.
+Uses the trained model when it is available and a synthetic forest otherwise.
+
+Usage:
+    python -m tests.benchmark [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import MODEL_PATH
+from tests.synthetic_model import SAMPLE_REQUEST
+
+BATCH_SIZES = (1, 16, 256)
+INTERVAL_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, float]:
+    """
+    Time repeated calls of a function.
+
+    Returns:
+        Mean, median, 95th percentile, min and max call time in microseconds
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+
+    return summarize(timings)
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Mean, median, 95th percentile, min and max of timings in microseconds"""
+    timings = sorted(timings)
+    return {
+        "iterations": len(timings),
+        "mean_us": statistics.fmean(timings),
+        "median_us": statistics.median(timings),
+        "p95_us": timings[min(len(timings) - 1, int(0.95 * len(timings)))],
+        "min_us": timings[0],
+        "max_us": timings[-1]
+    }
+
+
+def make_requests(n: int) -> List[Dict[str, Any]]:
+    """Distinct request payloads, so no layer can serve repeats from a cache"""
+    return [
+        {**SAMPLE_REQUEST, "size": 100 + i % 1400, "bedrooms": i % 5, "latitude": 43.0 + i * 1e-4}
+        for i in range(n)
+    ]
+
+
+def load_benchmark_model(synthetic: bool) -> Tuple[Any, str]:
+    """Return the trained model if available (and not overridden), else a synthetic forest"""
+    if not synthetic and MODEL_PATH.exists():
+        import joblib
+        return joblib.load(MODEL_PATH), str(MODEL_PATH)
+
+    from tests.synthetic_model import build_synthetic_forest
+    return build_synthetic_forest(n_estimators=100, max_depth=None, n_samples=5000), "synthetic"
+
+
+class BenchmarkSuite:
+    """Collects benchmark cases and their results"""
+
+    def __init__(self, iterations: int, warmup: int, only: Optional[str] = None):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.only = only
+        self.results: List[Dict[str, Any]] = []
+
+    def run(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        batch_size: int = 1,
+        iterations: Optional[int] = None,
+        **extra: Any
+    ) -> None:
+        """Time one case and record it; iterations caps the suite's count for slow cases"""
+        if self.only and self.only not in name:
+            return
+        iterations = min(self.iterations, iterations or self.iterations)
+        self.add(name, measure(fn, iterations, min(self.warmup, iterations)), batch_size, **extra)
+
+    def add(self, name: str, stats: Dict[str, float], batch_size: int = 1, **extra: Any) -> None:
+        """Record timings measured outside of run()"""
+        result = {"name": name, "batch_size": batch_size, **stats, **extra}
+        result["per_row_us"] = stats["mean_us"] / batch_size
+        self.results.append(result)
+        print(
+            f"{name:<40} batch={batch_size:<5} mean={stats['mean_us']:>10.1f}us "
+            f"p95={stats['p95_us']:>10.1f}us per_row={result['per_row_us']:>9.1f}us"
+            + (f" bytes={extra['response_bytes']}" if "response_bytes" in extra else ""),
+            flush=True
+        )
+
+
+def bench_preprocessing(suite: BenchmarkSuite, service: Any) -> None:
+    """Compiled encoder versus the reference pandas pipeline"""
+    for batch_size in BATCH_SIZES:
+        records = make_requests(batch_size)
+        suite.run(
+            "preprocess_data",
+            lambda: [service.preprocess_data(record) for record in records],
+            batch_size
+        )
+        suite.run("encode_many", lambda: service._get_encoder().encode_many(records), batch_size)
+    suite.run("preprocess_dataframe (pandas reference)", lambda: service.preprocess_dataframe(SAMPLE_REQUEST))
+
+
+def bench_inference(suite: BenchmarkSuite, service: Any, model: Any) -> None:
+    """model.predict and the flat engine on encoded matrices, with and without prediction intervals"""
+    from services.forest_engine import FlatForest
+
+    forest = FlatForest.from_model(model)
+    for batch_size in BATCH_SIZES:
+        features = service._get_encoder().encode_many(make_requests(batch_size))
+        suite.run("model.predict [sklearn]", lambda: model.predict(features), batch_size)
+        suite.run("model.predict [flat]", lambda: forest.predict(features), batch_size)
+        # Intervals the naive way: the prediction, then every estimator from Python
+        suite.run(
+            "model.predict + estimators_ loop [sklearn]",
+            lambda: (model.predict(features), [estimator.predict(features) for estimator in model.estimators_]),
+            batch_size
+        )
+        suite.run(
+            "predict_distribution [flat]",
+            lambda: forest.predict_distribution(features, INTERVAL_QUANTILES),
+            batch_size
+        )
+
+
+def bench_serialization(suite: BenchmarkSuite) -> None:
+    """Building and encoding one /predict response, with response_bytes recorded per case"""
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from core.responses import FastJSONResponse
+    from models.models import RentalPredictionRequest, RentalPredictionResponse
+
+    request = RentalPredictionRequest.model_validate(SAMPLE_REQUEST)
+    response_adapter = TypeAdapter(RentalPredictionResponse)
+    price = 2500.5
+
+    def response_model_with_input():
+        # The handler before lean responses: model_dump for the prediction and
+        # again for the echo, then what FastAPI does with a returned model
+        request.model_dump()
+        response = RentalPredictionResponse(predicted_price=price, input_data=request.model_dump())
+        validated = response_adapter.validate_python(response, from_attributes=True)
+        return JSONResponse(response_adapter.dump_python(validated, mode="json")).body
+
+    def dict_with_input():
+        return FastJSONResponse({"predicted_price": price, "input_data": request.model_dump()}).body
+
+    def dict_lean():
+        request.model_dump()
+        return FastJSONResponse({"predicted_price": price}).body
+
+    for name, fn in (
+        ("response: model + JSONResponse, input echo", response_model_with_input),
+        ("response: dict + FastJSONResponse, input echo", dict_with_input),
+        ("response: dict + FastJSONResponse, lean", dict_lean),
+    ):
+        suite.run(name, fn, response_bytes=len(fn()))
+
+
+def bench_comparables(suite: BenchmarkSuite, n_listings: int = 100_000) -> None:
+    """k-nearest comparable listings over synthetic reference listings"""
+    import numpy as np
+    from services.comparables_service import ComparablesIndex, build_listings
+
+    if suite.only and suite.only not in "ComparablesIndex.query":
+        return
+    rng = np.random.default_rng(0)
+    index = ComparablesIndex(build_listings(
+        longitude=rng.uniform(-80.0, -73.0, n_listings),
+        latitude=rng.uniform(43.0, 46.0, n_listings),
+        size=rng.uniform(25, 250, n_listings),
+        bedrooms=rng.integers(0, 6, n_listings),
+        bathrooms=rng.integers(1, 4, n_listings),
+        price=rng.uniform(800, 6000, n_listings)
+    ))
+    for batch_size in BATCH_SIZES:
+        records = make_requests(batch_size)
+        suite.run("ComparablesIndex.query [k=5]", lambda: index.query(records, 5), batch_size, listings=n_listings)
+
+
+def bench_auth(suite: BenchmarkSuite) -> None:
+    """JWT creation and verification, with and without the verified-token cache"""
+    from services.auth_service import AuthService, token_cache
+
+    token = AuthService.create_access_token({"sub": "fiap"})
+    suite.run("AuthService.create_access_token", lambda: AuthService.create_access_token({"sub": "fiap"}))
+    suite.run("AuthService.verify_token", lambda: AuthService.verify_token(token))
+
+    def resolve_uncached():
+        token_cache.clear()
+        AuthService.resolve_token(token)
+
+    suite.run("AuthService.resolve_token [uncached]", resolve_uncached)
+    suite.run("AuthService.resolve_token [cached]", lambda: AuthService.resolve_token(token))
+
+
+def bench_http(suite: BenchmarkSuite, engine: str, include_system: bool = True) -> None:
+    """Full request round-trips through the ASGI app"""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        token = client.post("/login", json={"username": "fiap", "password": "fiap123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        if include_system:
+            suite.run("GET /health", lambda: client.get("/health"))
+            # bcrypt makes every login deliberately slow
+            suite.run(
+                "POST /login",
+                lambda: client.post("/login", json={"username": "fiap", "password": "fiap123"}),
+                iterations=10
+            )
+
+        requests = make_requests(max(BATCH_SIZES))
+        counter = iter(range(10 ** 9))
+
+        def predict_one():
+            response = client.post("/predict", json=requests[next(counter) % len(requests)], headers=headers)
+            assert response.status_code == 200, response.text
+
+        suite.run(
+            f"POST /predict [{engine}]",
+            predict_one,
+            response_bytes=len(client.post("/predict", json=requests[0], headers=headers).content)
+        )
+
+        def predict_one_lean():
+            response = client.post(
+                "/predict?include_input=false", json=requests[next(counter) % len(requests)], headers=headers
+            )
+            assert response.status_code == 200, response.text
+
+        suite.run(
+            f"POST /predict?include_input=false [{engine}]",
+            predict_one_lean,
+            response_bytes=len(client.post("/predict?include_input=false", json=requests[0], headers=headers).content)
+        )
+
+        def predict_one_with_intervals():
+            response = client.post(
+                "/predict?intervals=true", json=requests[next(counter) % len(requests)], headers=headers
+            )
+            assert response.status_code == 200, response.text
+
+        suite.run(f"POST /predict?intervals=true [{engine}]", predict_one_with_intervals)
+
+        for batch_size in BATCH_SIZES:
+            body = {"items": requests[:batch_size]}
+
+            def predict_batch():
+                response = client.post("/predict/batch", json=body, headers=headers)
+                assert response.status_code == 200, response.text
+
+            suite.run(f"POST /predict/batch [{engine}]", predict_batch, batch_size)
+
+            def predict_batch_with_intervals():
+                response = client.post("/predict/batch?intervals=true", json=body, headers=headers)
+                assert response.status_code == 200, response.text
+
+            suite.run(f"POST /predict/batch?intervals=true [{engine}]", predict_batch_with_intervals, batch_size)
+
+
+# Runs in a fresh interpreter: imports the app, starts it, waits for /ready
+# and sends the first prediction, then prints the timings as JSON
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    started = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+    token = client.post("/login", json={"username": "fiap", "password": "fiap123"}).json()["access_token"]
+    predict_start = time.perf_counter()
+    response = client.post("/predict", json=json.loads(sys.argv[1]), headers={"Authorization": "Bearer " + token})
+    assert response.status_code == 200, response.text
+    print(json.dumps({
+        "import main": imported - start,
+        "startup event": started - imported,
+        "time to ready": ready - start,
+        "first POST /predict": time.perf_counter() - predict_start,
+        "report": main.startup_report.as_dict()
+    }))
+"""
+
+
+def bench_startup(suite: BenchmarkSuite, model: Any, model_source: str, runs: int = 3) -> None:
+    """
+    Cold-start timings, each run in a fresh interpreter.
+
+    Measures importing the app, the startup event (model load), the time
+    until /ready reports ready and the latency of the first prediction
+    request.
+    """
+    if suite.only and suite.only not in "startup":
+        return
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = MODEL_PATH
+        if model_source != str(MODEL_PATH):
+            import joblib
+            model_path = Path(tmp) / "benchmark_model.pkl"
+            joblib.dump(model, model_path)
+
+        env = {**os.environ, "MODEL_PATH": str(model_path), "PREDICTION_CACHE_SIZE": "0"}
+        root = Path(__file__).resolve().parent.parent
+        samples: Dict[str, List[float]] = {}
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT, json.dumps(SAMPLE_REQUEST)],
+                capture_output=True, text=True, check=True, cwd=root, env=env
+            ).stdout
+            timings = json.loads(output.strip().splitlines()[-1])
+            timings.pop("report")
+            for name, seconds in timings.items():
+                samples.setdefault(name, []).append(seconds * 1e6)
+
+    for name, timings in samples.items():
+        suite.add(f"startup: {name}", summarize(timings))
+
+
+def prepare_service(service: Any, model: Any, engine: str) -> None:
+    """Install the benchmark model in the global ML service, with caching disabled"""
+    service.engine = engine
+    service.install_model(model, version="benchmark")
+    service.cache.max_size = 0
+
+
+def git_revision() -> Optional[str]:
+    """Current commit, if running from a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent.parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(
+    iterations: int = 200,
+    warmup: int = 20,
+    synthetic: bool = False,
+    only: Optional[str] = None,
+    startup_runs: int = 3
+) -> Dict[str, Any]:
+    """
+    Run every benchmark.
+
+    Returns:
+        Machine-readable results with run metadata
+    """
+    from core.responses import json_encoder_name
+    from services.ml_service import ml_service
+
+    model, model_source = load_benchmark_model(synthetic)
+    suite = BenchmarkSuite(iterations, warmup, only)
+
+    prepare_service(ml_service, model, "sklearn")
+    bench_preprocessing(suite, ml_service)
+    bench_inference(suite, ml_service, model)
+    bench_serialization(suite)
+    bench_comparables(suite)
+    bench_auth(suite)
+    for engine in ("sklearn", "flat"):
+        prepare_service(ml_service, model, engine)
+        bench_http(suite, engine, include_system=engine == "sklearn")
+    if startup_runs > 0:
+        bench_startup(suite, model, model_source, startup_runs)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "model": model_source,
+            "n_estimators": len(getattr(model, "estimators_", [])),
+            "json_encoder": json_encoder_name(),
+            "iterations": iterations,
+            "warmup": warmup
+        },
+        "results": suite.results
+    }
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    """Print the mean time ratio of every case present in both runs"""
+    baseline = {(r["name"], r["batch_size"]): r for r in previous["results"]}
+    print(f"\nComparison with {previous['meta'].get('git_revision')} (ratio < 1 is faster):")
+    for result in current["results"]:
+        before = baseline.get((result["name"], result["batch_size"]))
+        if before:
+            ratio = result["mean_us"] / before["mean_us"]
+            print(f"{result['name']:<40} batch={result['batch_size']:<5} {ratio:>6.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="In-process benchmarks for the Rental Price Prediction API")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per case")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed calls per case")
+    parser.add_argument("--synthetic", action="store_true", help="Use the synthetic forest even if the trained model exists")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Cold starts to time (0 skips them)")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--compare", type=Path, help="Compare with results from a previous run")
+    args = parser.parse_args()
+
+    results = run_suite(args.iterations, args.warmup, args.synthetic, args.only, args.startup_runs)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Asyncio load generator for the Rental Price Prediction API
+
+Drives a running instance (--url) or the ASGI app in-process (--in-process)
+with a fixed number of concurrent clients for a given duration, mixing
+/login, /predict, /predict/batch and /health requests by weight. Reports
+requests per second, latency percentiles and error rates per endpoint, and
+can save the results as JSON to compare runs.
+
+Usage:
+    python -m tests.load_test --url http://localhost:8000 --concurrency 32 --duration 30
+    python -m tests.load_test --in-process --synthetic --mix predict=9,login=1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tests.benchmark import git_revision, make_requests
+
+CREDENTIALS = {"username": "fiap", "password": "fiap123"}
+OPERATIONS = ("predict", "batch", "login", "health")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse a request mix such as "predict=8,login=1,health=1" into weights"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}', expected one of {OPERATIONS}")
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError("The request mix needs at least one positive weight")
+    return weights
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    # Smallest rank covering the fraction; the tolerance absorbs float error (0.07 * 100 = 7.000000000000001)
+    rank = max(1, math.ceil(fraction * len(sorted_values) - 1e-9))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles (ms), throughput and error rate of one operation"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "rps": count / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "mean_ms": sum(latencies) / count if count else 0.0,
+        "status_codes": {str(code): n for code, n in sorted(statuses.items(), key=lambda item: str(item[0]))}
+    }
+
+
+class LoadTest:
+    """Concurrent clients issuing a weighted mix of requests until a deadline"""
+
+    def __init__(self, client: httpx.AsyncClient, weights: Dict[str, float], batch_size: int, seed: int):
+        self.client = client
+        self.operations = [name for name, weight in weights.items() if weight > 0]
+        self.weights = [weights[name] for name in self.operations]
+        self.batch_size = batch_size
+        self.seed = seed
+        self.payloads = make_requests(1000)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    async def login(self) -> Tuple[Optional[str], httpx.Response]:
+        """Authenticate and return the access token"""
+        response = await self.client.post("/login", json=CREDENTIALS)
+        token = response.json().get("access_token") if response.status_code == 200 else None
+        return token, response
+
+    async def send(self, operation: str, headers: Dict[str, str], rng: random.Random) -> httpx.Response:
+        """Issue one request of the given operation"""
+        if operation == "predict":
+            return await self.client.post("/predict", json=rng.choice(self.payloads), headers=headers)
+        if operation == "batch":
+            start = rng.randrange(len(self.payloads) - self.batch_size + 1)
+            body = {"items": self.payloads[start:start + self.batch_size]}
+            return await self.client.post("/predict/batch", json=body, headers=headers)
+        if operation == "login":
+            return await self.client.post("/login", json=CREDENTIALS)
+        return await self.client.get("/health")
+
+    async def worker(self, worker_id: int, token: Optional[str], deadline: float) -> None:
+        """One client: send requests with its access token until the deadline"""
+        rng = random.Random(self.seed + worker_id)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+        while time.perf_counter() < deadline:
+            operation = rng.choices(self.operations, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await self.send(operation, headers, rng)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            self.latencies[operation].append((time.perf_counter() - start) * 1000.0)
+            self.statuses[operation][status] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[operation] += 1
+
+    async def run(self, concurrency: int, duration: float) -> Dict[str, Any]:
+        """Log all clients in, then run them and summarize the results"""
+        logins = await asyncio.gather(*(self.login() for _ in range(concurrency)))
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self.worker(i, token, deadline) for i, (token, _) in enumerate(logins)))
+        elapsed = time.perf_counter() - started
+
+        all_latencies = [latency for values in self.latencies.values() for latency in values]
+        all_statuses = sum(self.statuses.values(), Counter())
+        return {
+            "elapsed_seconds": elapsed,
+            "total": summarize(all_latencies, sum(self.errors.values()), all_statuses, elapsed),
+            "operations": {
+                operation: summarize(self.latencies[operation], self.errors[operation], self.statuses[operation], elapsed)
+                for operation in self.operations
+            }
+        }
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Set up the target, run the load test and return the results"""
+    app = None
+    if args.in_process:
+        import main
+        from services.ml_service import ml_service
+
+        app = main.app
+        await app.router.startup()
+        if args.synthetic or not ml_service.is_loaded:
+            from tests.benchmark import load_benchmark_model, prepare_service
+            model, _ = load_benchmark_model(synthetic=True)
+            prepare_service(ml_service, model, ml_service.engine)
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://load-test"
+    else:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+        base_url = args.url
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+            load_test = LoadTest(client, args.mix, args.batch_size, args.seed)
+            results = await load_test.run(args.concurrency, args.duration)
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+
+    results["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "target": "in-process" if args.in_process else args.url,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "mix": args.mix,
+        "batch_size": args.batch_size
+    }
+    return results
+
+
+def print_report(results: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+    """Print a table of throughput, latency percentiles and error rates"""
+    meta = results["meta"]
+    print(
+        f"\nTarget {meta['target']}, concurrency {meta['concurrency']}, "
+        f"{results['elapsed_seconds']:.1f}s, mix {meta['mix']}"
+    )
+    print(f"{'operation':<10} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>8}")
+    rows = list(results["operations"].items()) + [("total", results["total"])]
+    for name, stats in rows:
+        print(
+            f"{name:<10} {stats['requests']:>9} {stats['rps']:>9.1f} {stats['p50_ms']:>9.2f} "
+            f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f} "
+            f"{100 * stats['error_rate']:>7.2f}%"
+        )
+
+    if previous:
+        print(f"\nChange versus {previous['meta'].get('git_revision')}:")
+        for name, stats in rows:
+            before = previous["total"] if name == "total" else previous["operations"].get(name)
+            if before and before["rps"] and before["p99_ms"]:
+                print(
+                    f"{name:<10} rps {stats['rps'] / before['rps']:>6.2f}x   "
+                    f"p99 {stats['p99_ms'] / before['p99_ms']:>6.2f}x"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Asyncio load generator for the Rental Price Prediction API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://localhost:8000", help="Base URL of a running instance")
+    target.add_argument("--in-process", action="store_true", help="Drive the ASGI app in this process")
+    parser.add_argument("--synthetic", action="store_true", help="In-process: use a synthetic forest")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test duration in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("predict=8,login=1,health=1"),
+                        help="Weighted request mix of predict, batch, login and health")
+    parser.add_argument("--batch-size", type=int, default=16, help="Items per /predict/batch request")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the request mix")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--compare", type=Path, help="Compare with results from a previous run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load_test(args))
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(results, previous)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Small synthetic random forest used when the trained model is not available,
+and a sample request payload shared by the tests
+"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from core.config import EXPECTED_FEATURES
+
+SAMPLE_REQUEST = {
+    "longitude": -79.416300,
+    "latitude": 43.700110,
+    "city": "vancouver",
+    "state": "BC",
+    "building_type": "highrise",
+    "bedrooms": 2,
+    "bathrooms": 2,
+    "size": 700,
+    "allow_pets": True,
+    "allow_smoking": False,
+    "furnished": False,
+    "count_private_parking": 1,
+    "lease_type": "long_term",
+    "rental_type": "long_term"
+}
+
+
+def build_synthetic_forest(
+    n_estimators: int = 20,
+    max_depth: int = 8,
+    n_samples: int = 500,
+    n_features: int = EXPECTED_FEATURES,
+    random_state: int = 42
+) -> RandomForestRegressor:
+    """
+    Fit a random forest on synthetic rental-like data.
+
+    The informative columns sit where the feature encoder writes the request
+    fields (coordinates, rooms, bathrooms, size and amenities), so predictions
+    vary with the request like the real model does.
+    """
+    rng = np.random.default_rng(random_state)
+    X = np.zeros((n_samples, n_features))
+    X[:, 0] = rng.uniform(-130.0, -60.0, n_samples)  # longitude
+    X[:, 1] = rng.uniform(42.0, 60.0, n_samples)     # latitude
+    X[:, 4] = rng.integers(0, 5, n_samples)          # total_rooms
+    X[:, 5] = rng.integers(1, 4, n_samples)          # total_bathrooms
+    X[:, 6] = rng.uniform(20.0, 1500.0, n_samples)   # size
+    X[:, 7:11] = rng.integers(0, 2, (n_samples, 4))  # pets, smoking, furnished, parking
+    y = (
+        800.0
+        + 350.0 * X[:, 4]
+        + 150.0 * X[:, 5]
+        + 1.2 * X[:, 6]
+        + 10.0 * (X[:, 1] - 42.0)
+        + 100.0 * X[:, 9]
+        + rng.normal(0.0, 50.0, n_samples)
+    )
+
+    model = RandomForestRegressor(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        random_state=random_state
+    )
+    model.fit(X, y)
+    return model
@@ -0,0 +1,141 @@
+"""
+Tests for admission control of prediction traffic
+"""
+
+import asyncio
+
+from core.admission import AdmissionController, AdmissionMiddleware
+
+
+def test_user_rate_limit_refills_per_user():
+    """Each user has their own token bucket, refilled at the configured rate"""
+    now = [0.0]
+    controller = AdmissionController(user_rate=2.0, user_burst=2, clock=lambda: now[0])
+
+    assert controller.check_rate("alice") == 0.0
+    assert controller.check_rate("alice") == 0.0
+    assert controller.check_rate("alice") == 0.5
+    assert controller.check_rate("bob") == 0.0
+    assert controller.check_rate(None) == 0.0
+
+    now[0] = 0.5
+    assert controller.check_rate("alice") == 0.0
+    assert controller.rejected["rate_limited"] == 1
+
+
+def test_queue_hands_slots_over_in_order_and_sheds_excess():
+    """Released slots go to waiting requests in arrival order; a full queue or a timeout rejects"""
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=0.05)
+        assert await controller.acquire() == 0.0
+
+        first = asyncio.ensure_future(controller.acquire())
+        second = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.waiting == 2
+        assert await controller.acquire() == controller.retry_after
+
+        controller.release()
+        assert await first == 0.0
+        # Still waiting behind the first, which holds the only slot
+        assert await second == controller.retry_after
+        controller.release()
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0
+    assert stats["waiting"] == 0
+    assert stats["admitted"] == 2
+    assert stats["rejected"] == {"rate_limited": 0, "queue_full": 1, "queue_timeout": 1}
+
+
+def test_middleware_rejects_with_retry_after_and_skips_other_paths():
+    """Limited requests get 429 with Retry-After and unguarded paths pass through"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    controller = AdmissionController(user_rate=1.0, user_burst=1)
+    middleware = AdmissionMiddleware(app, controller, ("/predict",), resolve_user=lambda token: token)
+
+    async def call(path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "path": path, "headers": [(b"authorization", b"Bearer alice")]}
+        await middleware(scope, None, send)
+        return messages[0]["status"], dict(messages[0]["headers"])
+
+    async def scenario():
+        return [await call("/predict"), await call("/predict"), await call("/health")]
+
+    (ok, _), (limited, headers), (health, _) = asyncio.run(scenario())
+    assert (ok, limited, health) == (200, 429, 200)
+    assert headers[b"retry-after"] == b"1"
+    assert controller.in_flight == 0
+
+
+def test_streams_do_not_hold_in_flight_slots():
+    """A long streaming upload leaves the in-flight slots to interactive predictions"""
+    upload_done = None
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/predict/stream":
+            await upload_done.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    middleware = AdmissionMiddleware(
+        app, controller, ("/predict",), resolve_user=lambda token: token, stream_prefixes=("/predict/stream",)
+    )
+
+    async def call(path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "path": path, "headers": [(b"authorization", b"Bearer alice")]}
+        await middleware(scope, None, send)
+        return messages[0]["status"]
+
+    async def scenario():
+        nonlocal upload_done
+        upload_done = asyncio.Event()
+        stream = asyncio.ensure_future(call("/predict/stream"))
+        await asyncio.sleep(0)
+        statuses = [await call("/predict"), await call("/predict")]
+        upload_done.set()
+        return statuses, await stream
+
+    assert asyncio.run(scenario()) == ([200, 200], 200)
+    assert controller.rejected["queue_full"] == 0
+
+
+def test_unauthenticated_requests_are_rejected_before_admission():
+    """Requests without a token that resolves get 401 without taking a slot or a queue place"""
+    async def app(scope, receive, send):
+        raise AssertionError("unauthenticated request reached the app")
+
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    middleware = AdmissionMiddleware(
+        app, controller, ("/predict",), resolve_user=lambda token: "alice" if token == "valid" else None
+    )
+
+    async def call(headers):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await middleware({"type": "http", "path": "/predict", "headers": headers}, None, send)
+        return messages[0]["status"], dict(messages[0]["headers"])
+
+    for headers in ([], [(b"authorization", b"Bearer forged")]):
+        status, response_headers = asyncio.run(call(headers))
+        assert status == 401
+        assert response_headers[b"www-authenticate"] == b"Bearer"
+    assert (controller.in_flight, controller.admitted) == (0, 0)
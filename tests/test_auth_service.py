@@ -0,0 +1,221 @@
+"""
+Tests for token verification and the verified-token cache
+"""
+
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from models.models import User
+from services import auth_service as auth_module
+from services.auth_service import AuthService
+from services.token_cache import TokenCache
+from services.user_store import InMemoryUserStore, SQLiteUserStore
+
+FAST_BCRYPT = auth_module.get_password_context().handler("bcrypt").using(rounds=4)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fresh_token_cache(monkeypatch):
+    """Empty token cache in place of the shared one"""
+    cache = TokenCache(max_size=16)
+    monkeypatch.setattr(auth_module, "token_cache", cache)
+    return cache
+
+
+def test_token_cache_expires_at_exp_and_evicts_lru():
+    """Cached tokens expire at their exp claim and are evicted in LRU order"""
+    clock = FakeClock()
+    cache = TokenCache(max_size=2, clock=clock)
+    alice, bob = User(username="alice", hashed_password="x"), User(username="bob", hashed_password="x")
+
+    cache.set("a", alice, expires_at=1010.0)
+    cache.set("b", bob, expires_at=2000.0)
+    assert cache.get("a") is alice
+    cache.set("c", bob, expires_at=2000.0)
+    assert cache.get("b") is None and cache.evictions == 1
+
+    clock.now = 1010.0
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+    cache.set("expired", alice, expires_at=900.0)
+    assert "expired" not in cache._entries
+
+
+def test_resolve_token_skips_verification_when_cached(fresh_token_cache, monkeypatch):
+    """A cached token is resolved without verifying its signature again"""
+    token = AuthService.create_access_token({"sub": "fiap"}, expires_delta=timedelta(minutes=5))
+    assert AuthService.resolve_token(token).username == "fiap"
+
+    def fail(_token):
+        raise AssertionError("cached token was verified again")
+
+    monkeypatch.setattr(AuthService, "decode_token", staticmethod(fail))
+    assert AuthService.resolve_token(token).username == "fiap"
+    assert fresh_token_cache.hits == 1
+
+
+def test_invalid_token_is_not_cached(fresh_token_cache):
+    """Tokens that fail verification are not cached"""
+    assert AuthService.resolve_token("not.a.token") is None
+    assert len(fresh_token_cache) == 0
+
+
+def test_deactivate_user_purges_cached_tokens(fresh_token_cache, monkeypatch):
+    """Deactivating a user drops their cached tokens"""
+    store = InMemoryUserStore({"temp": User(username="temp", hashed_password="x")})
+    monkeypatch.setattr(auth_module, "user_store", store)
+    token = AuthService.create_access_token({"sub": "temp"})
+    assert AuthService.resolve_token(token).username == "temp"
+
+    assert AuthService.deactivate_user("temp")
+    assert len(fresh_token_cache) == 0
+    assert not store.get_user("temp").is_active
+    assert not AuthService.deactivate_user("nobody")
+
+
+def test_cached_token_sees_deactivation_from_another_process(fresh_token_cache, monkeypatch, tmp_path):
+    """A cached token resolves to the user as currently stored, e.g. after scripts/manage_users.py deactivated them"""
+    path = tmp_path / "users.db"
+    clock = FakeClock()
+    store = SQLiteUserStore(path, seed_users=[User(username="ana", hashed_password="x")], clock=clock)
+    monkeypatch.setattr(auth_module, "user_store", store)
+    token = AuthService.create_access_token({"sub": "ana"})
+    assert AuthService.resolve_token(token).is_active
+
+    script = SQLiteUserStore(path)
+    script.set_active("ana", False)
+    script.close()
+    clock.now += store.index_ttl
+
+    user = AuthService.resolve_token(token)
+    assert fresh_token_cache.hits == 1
+    assert not user.is_active
+    store.close()
+
+
+def test_in_memory_user_store_copies_seed_users():
+    """Deactivating a user in one in-memory store leaves the seed users and other stores alone"""
+    seed = {"fiap": User(username="fiap", hashed_password="x")}
+    first, second = InMemoryUserStore(seed), InMemoryUserStore(seed)
+
+    assert first.set_active("fiap", False)
+    assert not first.get_user("fiap").is_active
+    assert second.get_user("fiap").is_active
+    assert seed["fiap"].is_active
+
+
+def test_sqlite_user_store_seeds_indexes_and_persists(tmp_path):
+    """The SQLite store seeds an empty database and keeps changes across reopening"""
+    path = tmp_path / "users.db"
+    seed = User(username="fiap", hashed_password=FAST_BCRYPT.hash("fiap123"))
+    store = SQLiteUserStore(path, pool_size=2, seed_users=[seed])
+    assert store.get_user("fiap").hashed_password == seed.hashed_password
+    assert store.get_user("nobody") is None
+
+    store.add_user(User(username="ana", hashed_password=FAST_BCRYPT.hash("secret")))
+    assert store.set_active("ana", False)
+    assert not store.set_active("nobody", False)
+    store.close()
+
+    reopened = SQLiteUserStore(path, seed_users=[User(username="ignored", hashed_password="x")])
+    assert reopened.get_user("ana").is_active is False
+    assert reopened.get_user("ignored") is None
+    reopened.close()
+
+
+def test_sqlite_user_store_picks_up_changes_from_other_processes(tmp_path):
+    """Indexed users are read again once their entry is older than the index TTL"""
+    path = tmp_path / "users.db"
+    clock = FakeClock()
+    api = SQLiteUserStore(path, seed_users=[User(username="ana", hashed_password="old")], index_ttl=5.0, clock=clock)
+    assert api.get_user("ana").is_active
+
+    # e.g. scripts/manage_users.py, which opens its own store
+    script = SQLiteUserStore(path)
+    script.set_active("ana", False)
+    script.add_user(User(username="ana", hashed_password="new", is_active=False))
+    script.close()
+
+    assert api.get_user("ana").hashed_password == "old"
+    clock.now += 5.0
+    user = api.get_user("ana")
+    assert (user.hashed_password, user.is_active) == ("new", False)
+    api.close()
+
+
+def test_authenticate_user_async_limits_concurrent_verifications(monkeypatch):
+    """Password checks run off the event loop with a per-username concurrency limit"""
+    user = User(username="ana", hashed_password=FAST_BCRYPT.hash("secret"))
+    monkeypatch.setattr(auth_module, "user_store", InMemoryUserStore({"ana": user}))
+    verifier = auth_module.PasswordVerifier(workers=4, max_per_user=1)
+    monkeypatch.setattr(auth_module, "password_verifier", verifier)
+
+    running, peak, lock = 0, 0, threading.Lock()
+    verify = AuthService.verify_password
+
+    def tracked_verify(plain, hashed):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        try:
+            return verify(plain, hashed)
+        finally:
+            with lock:
+                running -= 1
+
+    monkeypatch.setattr(AuthService, "verify_password", staticmethod(tracked_verify))
+
+    async def attempts():
+        return await asyncio.gather(
+            AuthService.authenticate_user_async("ana", "secret"),
+            AuthService.authenticate_user_async("ana", "wrong"),
+            AuthService.authenticate_user_async("ana", "secret"),
+            AuthService.authenticate_user_async("nobody", "secret")
+        )
+
+    results = asyncio.run(attempts())
+    verifier.shutdown()
+
+    assert [result is not None for result in results] == [True, False, True, False]
+    assert peak <= 2  # one for "ana", one for "nobody"
+    assert verifier._limits == {}
+
+
+def test_password_verifier_sheds_logins_beyond_max_pending(monkeypatch):
+    """Verifications beyond max_pending are rejected instead of queued, whatever the username"""
+    verifier = auth_module.PasswordVerifier(workers=1, max_per_user=1, max_pending=2)
+    release = threading.Event()
+
+    def blocked_verify(plain, hashed):
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(AuthService, "verify_password", staticmethod(blocked_verify))
+
+    async def flood():
+        attempts = [asyncio.ensure_future(verifier.verify(f"user{i}", "secret", "x")) for i in range(4)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*attempts, return_exceptions=True)
+
+    results = asyncio.run(flood())
+    verifier.shutdown()
+
+    assert results[:2] == [True, True]
+    assert all(isinstance(result, auth_module.VerifierBusyError) for result in results[2:])
+    assert (verifier.pending, verifier.rejected) == (0, 2)
@@ -0,0 +1,66 @@
+"""
+Tests for the offline batch scoring script
+"""
+
+import csv
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import pytest
+
+from tests.synthetic_model import SAMPLE_REQUEST, build_synthetic_forest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "batch_score.py"
+
+
+def score_command(tmp_path: Path, output: Path, *extra: str):
+    """Command scoring the test listings one row per chunk on a single worker"""
+    return [
+        sys.executable, str(SCRIPT), str(tmp_path / "listings.csv"), str(output),
+        "--chunk-size", "1", "--workers", "1", "--model-path", str(tmp_path / "model.pkl"), *extra
+    ]
+
+
+@pytest.mark.skipif(not hasattr(os, "killpg"), reason="requires POSIX process groups")
+def test_killed_run_resumes_in_order(tmp_path):
+    """A run killed mid-way resumes from its checkpoint and writes every row once, in input order"""
+    joblib.dump(build_synthetic_forest(n_estimators=5), tmp_path / "model.pkl")
+    with open(tmp_path / "listings.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(SAMPLE_REQUEST))
+        writer.writeheader()
+        for size in range(200):
+            writer.writerow({**SAMPLE_REQUEST, "size": size})
+
+    reference = tmp_path / "reference.csv"
+    subprocess.run(score_command(tmp_path, reference), check=True, capture_output=True)
+    rows = reference.read_text().splitlines()
+    assert [row.split(",")[0] for row in rows[1:]] == [str(i) for i in range(200)]
+
+    output = tmp_path / "predictions.csv"
+    checkpoint = tmp_path / "predictions.csv.checkpoint"
+    run = subprocess.Popen(
+        score_command(tmp_path, output),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + 60
+    while not checkpoint.exists() or json.loads(checkpoint.read_text())["chunks_done"] < 10:
+        assert run.poll() is None and time.monotonic() < deadline
+        time.sleep(0.01)
+    os.killpg(run.pid, signal.SIGKILL)
+    run.wait()
+    assert json.loads(checkpoint.read_text())["chunks_done"] < 200
+
+    # Output written after the last checkpoint is dropped on resume
+    with open(output, "ab") as f:
+        f.write(b"999,1234.5")
+
+    subprocess.run(score_command(tmp_path, output, "--resume"), check=True, capture_output=True)
+    assert output.read_bytes() == reference.read_bytes()
@@ -0,0 +1,107 @@
+"""
+Tests for batch validation and streaming bulk scoring
+"""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from services.batch_service import stream_predictions, validate_records
+from tests.synthetic_model import SAMPLE_REQUEST, build_synthetic_forest
+
+
+async def fake_predict_batch(records):
+    """Predict the size of each property, so results are easy to check"""
+    return [float(record["size"]) for record in records]
+
+
+async def as_chunks(data: bytes, chunk_size: int):
+    """Deliver a body in fixed-size chunks, splitting lines arbitrarily"""
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def run_stream(body: bytes, fmt: str, chunk_size: int = 2, max_line_bytes: int = 4096) -> str:
+    """Collect the streamed output of a body"""
+    async def collect():
+        return "".join([
+            line async for line in stream_predictions(
+                as_chunks(body, 7), fmt, fake_predict_batch, chunk_size=chunk_size, max_line_bytes=max_line_bytes
+            )
+        ])
+    return asyncio.run(collect())
+
+
+def test_validate_records_keeps_positions():
+    """Valid and invalid items keep their input positions"""
+    items = [SAMPLE_REQUEST, {**SAMPLE_REQUEST, "size": 0}, "not an object", SAMPLE_REQUEST]
+
+    valid_indices, valid_records, errors = validate_records(items)
+
+    assert valid_indices == [0, 3]
+    assert len(valid_records) == 2
+    assert sorted(errors) == [1, 2]
+    assert errors[1][0]["loc"] == ["size"]
+
+
+def test_batch_endpoint_reports_non_object_items():
+    """Items that are not objects get per-item errors instead of rejecting the batch"""
+    import main
+    from services.ml_service import ml_service
+
+    with TestClient(main.app) as client:
+        ml_service.install_model(build_synthetic_forest(n_estimators=5), version="batch-test")
+        token = client.post("/login", json={"username": "fiap", "password": "fiap123"}).json()["access_token"]
+        response = client.post(
+            "/predict/batch",
+            json={"items": [SAMPLE_REQUEST, 5, [1, 2]]},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+    assert response.status_code == 200
+    predictions = response.json()["predictions"]
+    assert predictions[0]["predicted_price"] is not None
+    assert [item["errors"][0]["type"] for item in predictions[1:]] == ["model_type", "model_type"]
+    assert response.json()["total"] == 3
+
+
+def test_stream_ndjson_scores_rows_in_order():
+    """NDJSON rows are scored in chunks and returned in input order"""
+    rows = [{**SAMPLE_REQUEST, "size": size} for size in (100, 200, 300)]
+    body = "\n".join(json.dumps(row) for row in rows[:2]) + "\n[1, 2]\n\n{oops\n" + json.dumps(rows[2])
+
+    results = [json.loads(line) for line in run_stream(body.encode(), "ndjson").splitlines()]
+
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert [result["predicted_price"] for result in results] == [100.0, 200.0, None, None, 300.0]
+    assert results[2]["errors"][0]["type"] == "model_type"
+    assert results[3]["errors"][0]["type"] == "json_invalid"
+
+
+def test_stream_reports_undecodable_and_oversized_lines():
+    """Invalid UTF-8 and over-long lines fail on their own and the rest of the stream is scored"""
+    row = json.dumps({**SAMPLE_REQUEST, "size": 100}).encode()
+    body = b"\n".join([row, b'{"city": "\xff"}', b"x" * 1000, row, b"y" * 1000])
+
+    results = [json.loads(line) for line in run_stream(body, "ndjson", max_line_bytes=600).splitlines()]
+
+    assert [result["predicted_price"] for result in results] == [100.0, None, None, 100.0, None]
+    assert [result["errors"][0]["type"] for result in results if result["errors"]] == [
+        "utf8_invalid", "line_too_long", "line_too_long"
+    ]
+
+
+def test_stream_csv_scores_rows_in_order():
+    """CSV rows are matched to the header and results are written as CSV"""
+    columns = list(SAMPLE_REQUEST)
+    lines = [",".join(columns)]
+    for size in (100, 250):
+        lines.append(",".join(str({**SAMPLE_REQUEST, "size": size}[column]) for column in columns))
+    lines.append("1,2")
+
+    output = run_stream(("\r\n".join(lines) + "\r\n").encode(), "csv").splitlines()
+
+    assert output[0] == "index,predicted_price,errors"
+    assert output[1:3] == ["0,100.0,", "1,250.0,"]
+    assert output[3].startswith("2,,")
@@ -0,0 +1,69 @@
+"""
+Smoke tests for the in-process benchmark suite and load generator
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+
+from tests.benchmark import run_suite
+from tests.load_test import parse_mix, percentile, run_load_test
+
+
+def test_benchmark_suite_runs_in_process():
+    """The suite runs without a server and reports machine-readable results"""
+    results = run_suite(iterations=2, warmup=1, synthetic=True, only="predict")
+
+    names = {result["name"] for result in results["results"]}
+    assert "model.predict [flat]" in names
+    assert "POST /predict [sklearn]" in names
+    assert results["meta"]["model"] == "synthetic"
+    for result in results["results"]:
+        assert result["mean_us"] > 0
+        assert result["per_row_us"] == result["mean_us"] / result["batch_size"]
+
+
+def test_app_import_defers_heavy_libraries():
+    """Importing the app leaves pandas, joblib and the auth libraries for later"""
+    output = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print(sorted({'pandas', 'joblib', 'jose', 'passlib'} & set(sys.modules)))"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == "[]"
+
+
+def test_startup_benchmark_times_cold_start():
+    """The startup benchmark times a cold start in a fresh process"""
+    results = run_suite(iterations=1, warmup=0, synthetic=True, only="startup", startup_runs=1)
+
+    names = {result["name"] for result in results["results"]}
+    assert names == {
+        "startup: import main", "startup: startup event", "startup: time to ready", "startup: first POST /predict"
+    }
+
+
+def test_load_test_reports_percentiles_in_process():
+    """The load generator drives the ASGI app and reports latency percentiles"""
+    args = argparse.Namespace(
+        in_process=True, synthetic=True, url=None, concurrency=2, duration=0.3,
+        mix=parse_mix("predict=3,health=1"), batch_size=4, timeout=30.0, seed=0
+    )
+
+    results = asyncio.run(run_load_test(args))
+
+    total = results["total"]
+    assert total["requests"] > 0
+    assert total["errors"] == 0
+    assert total["p50_ms"] <= total["p95_ms"] <= total["p99_ms"] <= total["max_ms"]
+    assert set(results["operations"]) == {"predict", "health"}
+
+
+def test_percentile_uses_nearest_rank():
+    """The p-th percentile is the value at rank ceil(p * n)"""
+    values = [float(i) for i in range(1, 101)]
+
+    assert [percentile(values, q) for q in (0.5, 0.95, 0.99, 1.0, 0.07)] == [50.0, 95.0, 99.0, 100.0, 7.0]
+    assert percentile(values[:10], 0.5) == 5.0
+    assert percentile([3.0], 0.01) == 3.0
+    assert percentile([], 0.5) == 0.0
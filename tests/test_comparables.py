@@ -0,0 +1,77 @@
+"""
+Tests for the comparable listings index and endpoints
+"""
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from services.comparables_service import ComparablesIndex, build_listings
+from tests.synthetic_model import SAMPLE_REQUEST
+
+
+def synthetic_listings(n: int = 2000, seed: int = 0) -> np.ndarray:
+    """Random reference listings around Toronto"""
+    rng = np.random.default_rng(seed)
+    return build_listings(
+        longitude=rng.uniform(-79.6, -79.2, n),
+        latitude=rng.uniform(43.5, 43.9, n),
+        size=rng.uniform(30, 200, n),
+        bedrooms=rng.integers(0, 5, n),
+        bathrooms=rng.integers(1, 4, n),
+        price=rng.uniform(1000, 5000, n),
+        ids=np.arange(1000, 1000 + n)
+    )
+
+
+def test_memory_mapped_index_matches_brute_force(tmp_path):
+    """A memory-mapped index returns the same nearest listings as a brute-force search"""
+    path = tmp_path / "listings.npy"
+    np.save(path, synthetic_listings())
+    index = ComparablesIndex.load(path, mmap_mode="r")
+    assert isinstance(index.listings, np.memmap)
+
+    records = [{**SAMPLE_REQUEST, "size": size, "bedrooms": bedrooms} for size, bedrooms in ((45, 1), (150, 3))]
+    results = index.query(records, k=5)
+
+    all_features = index.features(
+        index.listings["longitude"], index.listings["latitude"], index.listings["size"], index.listings["bedrooms"]
+    )
+    for record, comparables in zip(records, results):
+        query = index.features([record["longitude"]], [record["latitude"]], [record["size"]], [record["bedrooms"]])
+        distances = np.sqrt(((all_features - query) ** 2).sum(axis=1))
+        expected = np.argsort(distances)[:5]
+        assert [c["id"] for c in comparables] == (index.listings["id"][expected]).tolist()
+        assert [c["distance"] for c in comparables] == sorted(c["distance"] for c in comparables)
+        assert np.allclose([c["distance"] for c in comparables], distances[expected])
+
+
+def test_comparables_endpoints(tmp_path):
+    """The endpoints answer 503 without listings and return k comparables once loaded"""
+    import main
+    from services.comparables_service import comparables_service
+
+    np.save(tmp_path / "listings.npy", synthetic_listings(n=200))
+
+    with TestClient(main.app) as client:
+        token = client.post("/login", json={"username": "fiap", "password": "fiap123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        previous_index = comparables_service.index
+        comparables_service.index = None
+        try:
+            assert client.post("/comparables", json=SAMPLE_REQUEST, headers=headers).status_code == 503
+
+            assert comparables_service.load(tmp_path / "listings.npy")
+            response = client.post("/comparables?k=3", json=SAMPLE_REQUEST, headers=headers)
+            assert response.status_code == 200
+            assert len(response.json()["comparables"]) == 3
+
+            body = {"items": [SAMPLE_REQUEST, {"size": -1}]}
+            response = client.post("/comparables/batch?k=2", json=body, headers=headers)
+        finally:
+            comparables_service.index = previous_index
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["succeeded"], result["failed"]) == (1, 1)
+    assert len(result["results"][0]["comparables"]) == 2
+    assert result["results"][1]["errors"]
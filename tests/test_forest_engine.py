@@ -0,0 +1,221 @@
+"""
+Tests for the flat array-based forest inference engine
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestClassifier
+
+from core.config import EXPECTED_FEATURES
+from services.forest_engine import FlatForest
+from services.ml_service import MLService, ModelBundle
+from tests.synthetic_model import SAMPLE_REQUEST, build_synthetic_forest
+
+
+def random_inputs(forest, n_rows=300, seed=0):
+    """Random rows plus rows sitting exactly on split thresholds"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, EXPECTED_FEATURES))
+    X[:, 0] = rng.uniform(-130.0, -60.0, n_rows)
+    X[:, 1] = rng.uniform(42.0, 60.0, n_rows)
+    X[:, 4:6] = rng.integers(0, 5, (n_rows, 2))
+    X[:, 6] = rng.uniform(20.0, 1500.0, n_rows)
+
+    # Exercise the float32 comparison on exact threshold values
+    tree = forest.estimators_[0].tree_
+    for row, node in enumerate(np.flatnonzero(tree.children_left != -1)[:n_rows]):
+        X[row, tree.feature[node]] = tree.threshold[node]
+    return X
+
+
+@pytest.mark.parametrize("max_depth", [3, 8, None])
+def test_flat_forest_matches_sklearn_predict(max_depth):
+    """Flat engine predictions must be identical to model.predict"""
+    model = build_synthetic_forest(n_estimators=15, max_depth=max_depth)
+    forest = FlatForest.from_model(model)
+    X = random_inputs(model)
+
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+
+def test_flat_forest_matches_extra_trees():
+    """Extra trees forests are averaged the same way"""
+    base = build_synthetic_forest(n_estimators=2)
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(200, EXPECTED_FEATURES))
+    y = base.predict(X)
+    model = ExtraTreesRegressor(n_estimators=10, random_state=0).fit(X, y)
+
+    np.testing.assert_array_equal(FlatForest.from_model(model).predict(X), model.predict(X))
+
+
+def test_per_tree_outputs_match_estimators():
+    """Per-tree outputs must match each estimator, in estimator order"""
+    model = build_synthetic_forest(n_estimators=6)
+    forest = FlatForest.from_model(model)
+    X = random_inputs(model, n_rows=50)
+
+    per_tree = forest.predict_per_tree(X)
+    expected = np.vstack([estimator.predict(X.astype(np.float32)) for estimator in model.estimators_])
+
+    assert per_tree.shape == (6, 50)
+    np.testing.assert_array_equal(per_tree, expected)
+    np.testing.assert_array_equal(forest.predict_per_tree(X, n_trees=2), expected[:2])
+
+
+def test_single_row_and_chunked_batches(monkeypatch):
+    """Results do not depend on how rows are chunked"""
+    import services.forest_engine as forest_engine
+
+    model = build_synthetic_forest(n_estimators=5)
+    forest = FlatForest.from_model(model)
+    X = random_inputs(model, n_rows=37)
+    expected = model.predict(X)
+
+    monkeypatch.setattr(forest_engine, "ROW_CHUNK_SIZE", 8)
+    np.testing.assert_array_equal(forest.predict(X), expected)
+    np.testing.assert_array_equal(forest.predict(X[:1]), expected[:1])
+
+
+def test_rejects_unsupported_models():
+    """Only single-output forest regressors can be packed"""
+    rng = np.random.default_rng(0)
+    classifier = RandomForestClassifier(n_estimators=2).fit(rng.normal(size=(20, 3)), [0, 1] * 10)
+
+    with pytest.raises(ValueError):
+        FlatForest.from_model(classifier)
+
+
+def test_ml_service_uses_flat_engine(monkeypatch, tmp_path):
+    """MLService packs the model on load and predicts through the engine"""
+    import joblib
+
+    model = build_synthetic_forest(n_estimators=5)
+    model_path = tmp_path / "model.pkl"
+    joblib.dump(model, model_path)
+
+    service = MLService(engine="flat", cache_size=0)
+    assert service.load_model(model_path)
+    assert service.forest is not None
+
+    X = random_inputs(model, n_rows=20)
+    np.testing.assert_array_equal(service.predict_matrix(X), model.predict(X))
+
+
+def test_compacted_forest_keeps_predictions():
+    """Pruning and float32 storage do not change predictions for matching inputs"""
+    model = build_synthetic_forest(n_estimators=8, max_depth=None)
+    forest = FlatForest.from_model(model)
+    X = random_inputs(model)
+    X[:, 4] = 2.0
+
+    # Pinning a feature makes every split on it decidable
+    pruned = forest.prune({4: 2.0})
+    assert pruned.n_nodes < forest.n_nodes
+    np.testing.assert_array_equal(pruned.predict(X), model.predict(X))
+
+    compacted = pruned.to_float32()
+    assert compacted.nbytes < pruned.nbytes / 1.5
+    np.testing.assert_allclose(compacted.predict(X), model.predict(X), rtol=1e-6)
+    np.testing.assert_array_equal(
+        compacted.predict_per_tree(X), pruned.predict_per_tree(X).astype(np.float32)
+    )
+
+
+def test_forest_subset_and_saved_directory(tmp_path):
+    """A tree subset is served from a saved directory like a model file"""
+    model = build_synthetic_forest(n_estimators=6)
+    forest = FlatForest.from_model(model)
+    X = random_inputs(model, n_rows=40)
+
+    subset = forest.subset([4, 1])
+    np.testing.assert_array_equal(subset.predict_per_tree(X), forest.predict_per_tree(X)[[4, 1]])
+
+    subset.to_float32().save(tmp_path / "model_2first")
+    service = MLService(engine="sklearn", cache_size=0)
+    assert service.load_model(tmp_path / "model_2first")
+    assert service.bundle.version == "model_2first"
+    assert service.get_stats()["engine"] == "flat"
+    np.testing.assert_allclose(service.predict_matrix(X), subset.predict(X), rtol=1e-6)
+
+
+def test_predict_until_deadline():
+    """Anytime prediction averages the first trees evaluated before the deadline"""
+    model = build_synthetic_forest(n_estimators=20)
+    forest = FlatForest.from_model(model)
+    X = random_inputs(model, n_rows=10)
+
+    prediction, trees_used = forest.predict_until(X, time.perf_counter() + 60.0)
+    assert trees_used == 20
+    np.testing.assert_array_equal(prediction, model.predict(X))
+
+    # An expired deadline still evaluates the first block
+    prediction, trees_used = forest.predict_until(X, time.perf_counter() - 1.0, first_block=4)
+    assert trees_used == 4
+    np.testing.assert_allclose(prediction, forest.predict_per_tree(X, n_trees=4).mean(axis=0))
+
+    # The sklearn engine packs the model when it is installed
+    service = MLService(engine="sklearn", cache_size=0, executor_kind="inline")
+    service.install_model(model)
+    price, trees_used, trees_total = asyncio.run(
+        service.predict_until_async(SAMPLE_REQUEST, time.perf_counter() + 60.0)
+    )
+    assert (trees_used, trees_total) == (20, 20)
+    assert price == service.predict(SAMPLE_REQUEST)
+
+
+def test_prediction_intervals_from_per_tree_outputs():
+    """One pass yields the model's prediction plus the spread of the per-tree predictions"""
+    model = build_synthetic_forest(n_estimators=12)
+    forest = FlatForest.from_model(model)
+    X = random_inputs(model, n_rows=30)
+    per_tree = np.vstack([estimator.predict(X.astype(np.float32)) for estimator in model.estimators_])
+
+    mean, std, quantiles = forest.predict_distribution(X, (0.1, 0.5, 0.9))
+    np.testing.assert_array_equal(mean, model.predict(X))
+    np.testing.assert_allclose(std, per_tree.std(axis=0))
+    np.testing.assert_allclose(quantiles, np.quantile(per_tree, [0.1, 0.5, 0.9], axis=0))
+
+    service = MLService(engine="sklearn", cache_size=0, executor_kind="inline")
+    service.install_model(model)
+    records = [SAMPLE_REQUEST, {**SAMPLE_REQUEST, "size": 1200}]
+    intervals = asyncio.run(service.predict_intervals_async(records, (0.05, 0.95)))
+    assert [interval["mean"] for interval in intervals] == service.predict_batch(records)
+    for interval in intervals:
+        assert interval["quantiles"]["0.05"] <= interval["mean"] <= interval["quantiles"]["0.95"]
+        assert interval["std"] >= 0
+
+
+def test_per_tree_forest_is_packed_on_load_once(tmp_path, monkeypatch):
+    """The sklearn engine packs the per-tree forest on load, and concurrent first callers share one copy"""
+    model = build_synthetic_forest(n_estimators=5)
+    joblib.dump(model, tmp_path / "model.pkl")
+    service = MLService(engine="sklearn", cache_size=0, executor_kind="inline")
+    bundle = service.load_bundle(tmp_path / "model.pkl", warmup_rows=2)
+    assert bundle.packed_forest is not None
+    assert bundle.load_stats["per_tree_forest_mb"] > 0
+
+    disabled = MLService(engine="sklearn", cache_size=0, executor_kind="inline", per_tree=False)
+    assert disabled.install_model(model).packed_forest is None
+    with pytest.raises(ValueError):
+        disabled.predict_matrix_distribution(random_inputs(model, n_rows=2), (0.5,))
+
+    from_model = FlatForest.from_model
+    packs = []
+
+    def slow_from_model(model):
+        packs.append(model)
+        time.sleep(0.05)
+        return from_model(model)
+
+    monkeypatch.setattr(FlatForest, "from_model", staticmethod(slow_from_model))
+    unpacked = ModelBundle(model)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        forests = list(pool.map(lambda _: unpacked.per_tree_forest(), range(4)))
+    assert len(packs) == 1
+    assert all(forest is forests[0] for forest in forests)
@@ -0,0 +1,67 @@
+"""
+Tests for the gazetteer and location resolution of prediction requests
+"""
+
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from core.gazetteer import Gazetteer, Place, haversine_km
+from models.models import RentalPredictionRequest
+from tests.synthetic_model import SAMPLE_REQUEST
+
+PLACES = [
+    (Place("Montréal", "QC", -73.5673, 45.5017), ["H1", "H2", "H3"]),
+    (Place("Vancouver", "BC", -123.1207, 49.2827), ["V5K", "V6"]),
+    (Place("Burnaby", "BC", -122.9805, 49.2488), ["V5A", "V5B"]),
+    (Place("Toronto", "ON", -79.3832, 43.6532), ["M"]),
+]
+
+
+def test_name_and_postal_code_lookups():
+    """Cities are found by normalized name and state, and by postal code prefix"""
+    gazetteer = Gazetteer(PLACES)
+
+    assert gazetteer.lookup(" montreal ", "qc").city == "Montréal"
+    assert gazetteer.lookup("Vancouver", "ON") is None
+    assert gazetteer.lookup_postal_code("v6b 1a1").city == "Vancouver"
+    assert gazetteer.lookup_postal_code("V5B-2C3").city == "Burnaby"
+    assert gazetteer.lookup_postal_code("M5V").city == "Toronto"
+    assert gazetteer.lookup_postal_code("K1A") is None
+
+
+def test_nearest_matches_brute_force():
+    """The grid search finds the same nearest place as a brute-force search"""
+    gazetteer = Gazetteer(PLACES, cell_degrees=0.5)
+    rng = random.Random(0)
+
+    for _ in range(500):
+        longitude, latitude = rng.uniform(-130.0, -60.0), rng.uniform(40.0, 60.0)
+        place, distance = gazetteer.nearest(longitude, latitude)
+        expected = min(PLACES, key=lambda p: haversine_km(longitude, latitude, p[0].longitude, p[0].latitude))[0]
+        assert place == expected
+        assert distance == pytest.approx(haversine_km(longitude, latitude, place.longitude, place.latitude))
+
+    assert gazetteer.nearest(-100.0, 55.0, max_distance_km=50.0) is None
+    assert Gazetteer().nearest(-100.0, 55.0) is None
+
+
+def test_request_location_is_resolved_from_the_bundled_gazetteer():
+    """Missing coordinates or city are filled in from the bundled gazetteer"""
+    without_location = {
+        key: value for key, value in SAMPLE_REQUEST.items()
+        if key not in ("longitude", "latitude", "city", "state")
+    }
+
+    by_city = RentalPredictionRequest(**without_location, city="vancouver", state="BC", longitude="")
+    assert (by_city.longitude, by_city.latitude) == (-123.1207, 49.2827)
+
+    by_postal_code = RentalPredictionRequest(**without_location, postal_code="M5V 2T6")
+    assert (by_postal_code.city, by_postal_code.state) == ("Toronto", "ON")
+
+    by_coordinates = RentalPredictionRequest(**without_location, longitude=-123.0, latitude=49.25)
+    assert (by_coordinates.city, by_coordinates.state) == ("Burnaby", "BC")
+
+    with pytest.raises(ValidationError):
+        RentalPredictionRequest(**without_location, city="atlantis", state="XX")
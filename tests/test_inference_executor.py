@@ -0,0 +1,83 @@
+"""
+Tests for the bounded inference executor
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pytest
+
+from core.config import EXPECTED_FEATURES
+from services.inference_executor import InferenceExecutor
+from tests.synthetic_model import build_synthetic_forest
+
+
+def test_in_flight_calls_are_bounded():
+    """No more than max_in_flight calls run at once, the rest wait for a slot"""
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def slow_call(value):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return value
+
+    executor = InferenceExecutor(slow_call, kind="thread", workers=4, max_in_flight=2)
+
+    async def scenario():
+        calls = asyncio.gather(*(executor.run(slow_call, i) for i in range(8)))
+        await asyncio.sleep(0.005)
+        stats = executor.get_stats()
+        return await calls, stats
+
+    results, stats = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert results == list(range(8))
+    assert peak[0] == 2
+    assert (stats["in_flight"], stats["waiting"]) == (2, 6)
+    assert (executor.in_flight, executor.waiting) == (0, 0)
+
+
+def test_inline_and_thread_modes():
+    """Inline calls run on the event loop thread, thread calls on the pool"""
+    def thread_name(features):
+        return threading.current_thread().name
+
+    inline = InferenceExecutor(thread_name, kind="inline")
+    threaded = InferenceExecutor(thread_name, kind="thread", workers=1)
+
+    assert asyncio.run(inline.predict_matrix(np.zeros((1, 1)))) == threading.current_thread().name
+    assert asyncio.run(threaded.predict_matrix(np.zeros((1, 1)))).startswith("inference")
+    threaded.shutdown()
+
+    with pytest.raises(ValueError):
+        InferenceExecutor(thread_name, kind="fiber")
+
+
+def test_process_mode_and_shutdown(tmp_path):
+    """Process calls run in pool processes holding their own model; shutdown stops the pool"""
+    model_path = tmp_path / "model.pkl"
+    joblib.dump(build_synthetic_forest(n_estimators=3), model_path)
+    executor = InferenceExecutor(None, kind="process", workers=1)
+    executor.recycle(str(model_path))
+
+    worker_pid = asyncio.run(executor.run(os.getpid))
+    predictions = asyncio.run(executor.predict_matrix(np.zeros((4, EXPECTED_FEATURES))))
+    assert worker_pid != os.getpid()
+    assert predictions.shape == (4,)
+
+    executor.shutdown()
+    assert executor._pool is None
+    # The next call starts a new pool
+    assert asyncio.run(executor.run(os.getpid)) not in (os.getpid(), worker_pid)
+    executor.shutdown()
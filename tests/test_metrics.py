@@ -0,0 +1,115 @@
+"""
+Tests for the metrics registry and the /metrics endpoint
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from core.metrics import Registry, ServerTimingMiddleware, stage_timer
+from core.profiling import ProfileStore, ProfilingMiddleware
+from models.models import User
+from services import auth_service as auth_module
+from services.auth_service import AuthService
+from services.ml_service import ml_service
+from services.user_store import InMemoryUserStore
+from tests.benchmark import prepare_service
+from tests.synthetic_model import SAMPLE_REQUEST, build_synthetic_forest
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Histograms render cumulative buckets, sum and count with escaped label values"""
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage='en"code')
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{stage="en\\"code",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="en\\"code",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{stage="en\\"code",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{stage="en\\"code"} 3' in text
+    assert histogram.sum(stage='en"code') == 5.55
+
+
+def test_counter_and_callback_gauge():
+    """Counters accumulate per label set and callback gauges are read at render time"""
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests", ["status"])
+    counter.inc(status="200")
+    counter.inc(2, status="200")
+    registry.gauge("queue_depth", "Queue depth", callback=lambda: 7)
+
+    text = registry.render()
+    assert 'requests_total{status="200"} 3.0' in text
+    assert "queue_depth 7.0" in text
+
+
+def test_metrics_endpoint_records_prediction_stages():
+    """A prediction records its request count and every stage duration in /metrics"""
+    with TestClient(main.app) as client:
+        prepare_service(ml_service, build_synthetic_forest(n_estimators=5), "sklearn")
+        token = client.post("/login", json={"username": "fiap", "password": "fiap123"}).json()["access_token"]
+        response = client.post("/predict", json=SAMPLE_REQUEST, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_requests_total{method="POST",route="/predict",status="200"}' in text
+    for stage in ("jwt_decode", "user_lookup", "validation", "encode", "inference", "serialization"):
+        assert f'prediction_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert "model_loaded 1.0" in text
+
+
+def test_server_timing_and_profiling_middleware():
+    """Responses carry Server-Timing and only requests with the right token are profiled"""
+    app = FastAPI()
+    store = ProfileStore(max_size=1)
+
+    @app.get("/work")
+    async def work():
+        with stage_timer("encode"):
+            sum(range(1000))
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, store=store, token="secret")
+    app.add_middleware(ServerTimingMiddleware)
+
+    with TestClient(app) as client:
+        plain = client.get("/work")
+        profiled = client.get("/work", headers={"X-Profile-Token": "secret"})
+        wrong_token = client.get("/work", headers={"X-Profile-Token": "guess"})
+
+    assert plain.headers["server-timing"].startswith("preprocess;dur=")
+    assert "total;dur=" in plain.headers["server-timing"]
+    assert "x-profile-id" not in plain.headers
+    assert "x-profile-id" not in wrong_token.headers
+
+    profile = store.get(profiled.headers["x-profile-id"])
+    assert profile["path"] == "/work" and profile["status_code"] == 200
+    assert "work" in profile["report"]
+    assert [summary["id"] for summary in store.list()] == [profile["id"]]
+
+
+def test_profiles_require_an_administrator(monkeypatch):
+    """Stored profiles are only listed and shown to users in ADMIN_USERS"""
+    store = InMemoryUserStore({
+        "fiap": User(username="fiap", hashed_password="x"),
+        "ana": User(username="ana", hashed_password="x")
+    })
+    monkeypatch.setattr(auth_module, "user_store", store)
+
+    headers = {
+        username: {"Authorization": f"Bearer {AuthService.create_access_token({'sub': username})}"}
+        for username in ("fiap", "ana")
+    }
+
+    with TestClient(main.app) as client:
+        assert client.get("/profiles", headers=headers["ana"]).status_code == 403
+        assert client.get("/profiles/unknown", headers=headers["ana"]).status_code == 403
+        assert client.get("/profiles", headers=headers["fiap"]).status_code == 200
+        assert client.get("/profiles/unknown", headers=headers["fiap"]).status_code == 404
@@ -0,0 +1,178 @@
+"""
+Tests for the ML service preprocessing
+"""
+
+import asyncio
+import numpy as np
+import pytest
+
+from core.config import EXPECTED_FEATURES
+from services.feature_encoder import FeatureEncoder
+from services.ml_service import MLService
+from services.prediction_cache import PredictionCache, make_cache_key
+from tests.synthetic_model import SAMPLE_REQUEST, build_synthetic_forest
+
+
+VARIANT_REQUESTS = [
+    SAMPLE_REQUEST,
+    {**SAMPLE_REQUEST, "city": "Toronto", "state": "on", "allow_pets": False, "furnished": True},
+    {**SAMPLE_REQUEST, "bedrooms": 0, "bathrooms": 0, "size": 1, "count_private_parking": 0},
+    {**SAMPLE_REQUEST, "longitude": 0.0, "latitude": 0.0, "allow_smoking": True, "building_type": ""},
+]
+
+
+@pytest.fixture(scope="module")
+def synthetic_forest():
+    """Small forest standing in for the trained model"""
+    return build_synthetic_forest()
+
+
+@pytest.fixture
+def loaded_service(synthetic_forest):
+    """ML service with the synthetic forest loaded and caching disabled"""
+    service = MLService(cache_size=0)
+    service.install_model(synthetic_forest)
+    return service
+
+
+@pytest.mark.parametrize("request_data", VARIANT_REQUESTS)
+def test_encoder_matches_pandas_preprocessing(request_data):
+    """The compiled encoder must produce the same features as the pandas path"""
+    service = MLService()
+    expected = service.preprocess_dataframe(request_data).to_numpy(dtype=np.float64)
+    encoded = service.preprocess_data(request_data)
+
+    assert encoded.shape == (1, EXPECTED_FEATURES)
+    np.testing.assert_array_equal(encoded, expected)
+
+
+def test_encode_many_matches_single_row_encoding():
+    """Batch encoding must stack the single-row encodings in input order"""
+    encoder = FeatureEncoder.compile()
+    matrix = encoder.encode_many(VARIANT_REQUESTS)
+
+    assert matrix.shape == (len(VARIANT_REQUESTS), EXPECTED_FEATURES)
+    for row, request_data in zip(matrix, VARIANT_REQUESTS):
+        np.testing.assert_array_equal(row, encoder.encode(request_data)[0])
+
+
+def test_encoder_truncates_to_feature_count():
+    """A smaller feature count truncates the layout like the pandas path"""
+    encoder = FeatureEncoder.compile(n_features=5)
+    encoded = encoder.encode(SAMPLE_REQUEST)
+
+    np.testing.assert_array_equal(encoded, [[-79.4163, 43.70011, 0.0, 0.0, 2.0]])
+
+
+def test_predict_batch_matches_single_predictions(loaded_service):
+    """Batch predictions must match single predictions, in input order"""
+    batch = loaded_service.predict_batch(VARIANT_REQUESTS)
+    single = [loaded_service.predict(request_data) for request_data in VARIANT_REQUESTS]
+
+    assert batch == single
+    assert loaded_service.predict_batch([]) == []
+
+
+def test_predict_requires_loaded_model():
+    """Predictions fail fast when no model is loaded"""
+    service = MLService()
+
+    with pytest.raises(RuntimeError):
+        service.predict(SAMPLE_REQUEST)
+    with pytest.raises(RuntimeError):
+        service.predict_batch([SAMPLE_REQUEST])
+
+
+def test_micro_batching_resolves_concurrent_predictions(synthetic_forest):
+    """Concurrent predictions share model calls and keep their own results"""
+    service = MLService(micro_batching=True, cache_size=0)
+    service.install_model(synthetic_forest)
+    service.batcher.window = 0.05
+
+    async def run():
+        results = await asyncio.gather(
+            *(service.predict_async(request_data) for request_data in VARIANT_REQUESTS)
+        )
+        await service.batcher.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == [service.predict(request_data) for request_data in VARIANT_REQUESTS]
+    stats = service.get_stats()["micro_batching"]
+    assert stats["rows"] == len(VARIANT_REQUESTS)
+    assert stats["batches"] < len(VARIANT_REQUESTS)
+
+
+def test_service_is_ready_after_warm_up(synthetic_forest):
+    """Warm-up predictions go through the executor and leave the cache untouched"""
+    service = MLService(executor_kind="thread")
+    assert not service.is_ready
+    service.install_model(synthetic_forest)
+    assert not service.is_ready
+
+    stats = asyncio.run(service.warm_up_serving(5))
+
+    assert service.is_ready
+    assert stats["completed"] and stats["predictions"] == 5
+    assert stats["first_prediction_ms"] > 0
+    assert len(service.cache) == 0
+    assert service.get_stats()["warmup"] == stats
+    service.executor.shutdown()
+
+
+def test_cache_key_is_canonical():
+    """Equivalent requests share a cache key, different ones do not"""
+    key = make_cache_key(SAMPLE_REQUEST)
+
+    assert make_cache_key({**SAMPLE_REQUEST, "city": "VANCOUVER", "state": "bc", "size": 700.0}) == key
+    assert make_cache_key({**SAMPLE_REQUEST, "size": 701}) != key
+
+
+def test_cache_evicts_least_recently_used_and_expired_entries():
+    """Entries are evicted by size in LRU order and by age"""
+    now = [0.0]
+    cache = PredictionCache(max_size=2, ttl_seconds=10.0, clock=lambda: now[0])
+    cache.set("a", 1.0, generation=1)
+    cache.set("b", 2.0, generation=1)
+    assert cache.get("a", generation=1) == 1.0
+
+    cache.set("c", 3.0, generation=1)
+    assert cache.get("b", generation=1) is None
+    assert cache.get("a", generation=1) == 1.0
+
+    now[0] = 11.0
+    assert cache.get("c", generation=1) is None
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]) == (2, 2, 1, 1)
+
+
+def test_bulk_scoring_bypasses_cache(synthetic_forest):
+    """Batches scored without the cache neither read nor fill it"""
+    service = MLService(executor_kind="inline")
+    service.install_model(synthetic_forest)
+    service.predict(SAMPLE_REQUEST)
+
+    bulk = service.predict_batch(VARIANT_REQUESTS, use_cache=False)
+    bulk_async = asyncio.run(service.predict_batch_async(VARIANT_REQUESTS, use_cache=False))
+
+    assert (len(service.cache), service.cache.hits) == (1, 0)
+    assert bulk == bulk_async == service.predict_batch(VARIANT_REQUESTS)
+    service.executor.shutdown()
+
+
+def test_cache_is_invalidated_when_model_changes(synthetic_forest):
+    """A new model generation must not serve predictions of the previous model"""
+    service = MLService()
+    service.install_model(synthetic_forest)
+
+    price = service.predict(SAMPLE_REQUEST)
+    assert service.predict(SAMPLE_REQUEST) == price
+    assert service.cache.hits == 1
+
+    service.install_model(build_synthetic_forest(n_estimators=5, random_state=7))
+
+    assert service.predict(SAMPLE_REQUEST) == service.model.predict(service.preprocess_data(SAMPLE_REQUEST))[0]
+    assert service.cache.hits == 1
+    assert service.predict_batch([SAMPLE_REQUEST, VARIANT_REQUESTS[1]])[0] == service.predict(SAMPLE_REQUEST)
@@ -0,0 +1,102 @@
+"""
+Tests for zero-downtime model reloading
+"""
+
+import asyncio
+import os
+
+import joblib
+import pytest
+
+from services.ml_service import MLService
+from services.model_reloader import ModelReloader, ReloadInProgressError
+from tests.synthetic_model import SAMPLE_REQUEST, build_synthetic_forest
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """Directory with two versions of a small model"""
+    joblib.dump(build_synthetic_forest(n_estimators=5, random_state=1), tmp_path / "model_v1.pkl")
+    joblib.dump(build_synthetic_forest(n_estimators=5, random_state=2), tmp_path / "model_v2.pkl")
+    return tmp_path
+
+
+def test_reload_swaps_model_and_keeps_in_flight_bundle(model_dir):
+    """A reload swaps in the new model while requests holding the old bundle finish on it"""
+    service = MLService(cache_size=0, executor_kind="inline")
+    assert service.load_model(model_dir / "model_v1.pkl")
+    reloader = ModelReloader(service, model_dir / "model_v1.pkl", warmup_rows=8)
+    old_bundle = service.bundle
+    old_price = service.predict(SAMPLE_REQUEST)
+
+    result = asyncio.run(reloader.reload(reloader.resolve_path("model_v2.pkl")))
+
+    assert result["previous_version"] == "model_v1"
+    assert result["model_version"] == service.model_version == "model_v2"
+    assert result["warmup_seconds"] > 0
+    assert service.model_generation == 2
+    assert service.predict(SAMPLE_REQUEST) != old_price
+    # A request that picked up the old model before the swap finishes on it
+    assert asyncio.run(service.predict_batch_async([SAMPLE_REQUEST], old_bundle)) == [old_price]
+
+
+def test_failed_or_concurrent_reload_keeps_current_model(model_dir):
+    """Broken files, paths outside the model directory and concurrent reloads leave the current model serving"""
+    service = MLService(cache_size=0)
+    assert service.load_model(model_dir / "model_v1.pkl")
+    reloader = ModelReloader(service, model_dir / "model_v1.pkl", warmup_rows=0)
+
+    (model_dir / "broken.pkl").write_bytes(b"not a model")
+    with pytest.raises(Exception):
+        asyncio.run(reloader.reload(reloader.resolve_path("broken.pkl")))
+    assert service.model_version == "model_v1"
+    assert reloader.last_error
+
+    with pytest.raises(ValueError):
+        reloader.resolve_path("../model_v1.pkl")
+
+    reloader._reloading = True
+    with pytest.raises(ReloadInProgressError):
+        asyncio.run(reloader.reload())
+
+
+def test_watcher_reloads_changed_model_file(model_dir):
+    """The watcher reloads the model once its file is replaced"""
+    service = MLService(cache_size=0)
+    path = model_dir / "model_v1.pkl"
+    assert service.load_model(path)
+    reloader = ModelReloader(service, path, warmup_rows=0, watch_interval=0.02)
+
+    async def run():
+        reloader.start_watching()
+        os.replace(model_dir / "model_v2.pkl", path)
+        for _ in range(200):
+            await asyncio.sleep(0.02)
+            if reloader.reloads:
+                break
+        await reloader.stop_watching()
+
+    asyncio.run(run())
+    assert reloader.reloads == 1
+    assert service.model_generation == 2
+
+
+def test_service_without_startup_model_becomes_ready_after_reload(model_dir):
+    """A service started without a model warms up and becomes ready once a model is reloaded"""
+    service = MLService(cache_size=0, executor_kind="inline")
+    reloader = ModelReloader(service, model_dir / "model_v1.pkl", warmup_rows=0)
+
+    async def run():
+        service.start_warm_up(3)
+        assert not service.is_ready
+        assert service.warmup_stats["error"] == "Model not loaded"
+
+        await reloader.reload(reloader.resolve_path("model_v2.pkl"))
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if service.is_ready:
+                break
+
+    asyncio.run(run())
+    assert service.is_ready
+    assert service.warmup_stats["model_version"] == "model_v2"
@@ -0,0 +1,36 @@
+"""
+Tests for the fast JSON responses of the prediction endpoints
+"""
+
+import json
+
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from core.responses import FastJSONResponse
+from tests.synthetic_model import SAMPLE_REQUEST, build_synthetic_forest
+
+
+def test_fast_json_response_matches_json_response():
+    """orjson encoding produces the same bytes as FastAPI's JSONResponse"""
+    content = {"predicted_price": 2500.5, "input_data": {"city": "Montréal", "furnished": False, "postal_code": None}}
+    assert FastJSONResponse(content).body == JSONResponse(content).body
+
+
+def test_lean_prediction_response():
+    """include_input=false returns only the price, with the model version in a header"""
+    import main
+    from services.ml_service import ml_service
+
+    with TestClient(main.app) as client:
+        ml_service.install_model(build_synthetic_forest(n_estimators=5), version="lean-test")
+        token = client.post("/login", json={"username": "fiap", "password": "fiap123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        full = client.post("/predict", json=SAMPLE_REQUEST, headers=headers)
+        lean = client.post("/predict?include_input=false", json=SAMPLE_REQUEST, headers=headers)
+
+    assert full.status_code == lean.status_code == 200
+    assert full.headers["X-Model-Version"] == lean.headers["X-Model-Version"] == "lean-test"
+    assert full.json()["input_data"]["size"] == SAMPLE_REQUEST["size"]
+    assert json.loads(lean.content) == {"predicted_price": full.json()["predicted_price"]}